@@ -1,20 +1,62 @@
 from mm_web3.account import PrivateKeyMap as PrivateKeyMap
+from mm_web3.backoff import Backoff as Backoff
+from mm_web3.backoff import ConstantBackoff as ConstantBackoff
+from mm_web3.backoff import ExponentialBackoff as ExponentialBackoff
+from mm_web3.backoff import Jitter as Jitter
+from mm_web3.balance import Balancer as Balancer
+from mm_web3.balance import ConsistentHashBalancer as ConsistentHashBalancer
+from mm_web3.balance import LeastOutstandingBalancer as LeastOutstandingBalancer
+from mm_web3.balance import PowerOfTwoBalancer as PowerOfTwoBalancer
+from mm_web3.balance import RandomBalancer as RandomBalancer
+from mm_web3.balance import RoundRobinBalancer as RoundRobinBalancer
+from mm_web3.batch import JsonRpcBatcher as JsonRpcBatcher
+from mm_web3.budget import RetryBudget as RetryBudget
+from mm_web3.cache import ResponseCache as ResponseCache
+from mm_web3.calcs import CompiledExpression as CompiledExpression
+from mm_web3.calcs import UnitTable as UnitTable
 from mm_web3.calcs import calc_decimal_expression as calc_decimal_expression
 from mm_web3.calcs import calc_expression_with_vars as calc_expression_with_vars
+from mm_web3.calcs import compile_expression as compile_expression
 from mm_web3.calcs import convert_value_with_units as convert_value_with_units
+from mm_web3.circuit import CircuitBreakers as CircuitBreakers
+from mm_web3.circuit import CircuitState as CircuitState
+from mm_web3.classify import ErrorClassifier as ErrorClassifier
+from mm_web3.classify import ErrorKind as ErrorKind
+from mm_web3.concurrency import AdaptiveLimiter as AdaptiveLimiter
 from mm_web3.config import Web3CliConfig as Web3CliConfig
 from mm_web3.log import init_loguru as init_loguru
 from mm_web3.network import Network as Network
 from mm_web3.network import NetworkType as NetworkType
+from mm_web3.node import HeadTracker as HeadTracker
+from mm_web3.node import NodePool as NodePool
 from mm_web3.node import Nodes as Nodes
 from mm_web3.node import random_node as random_node
+from mm_web3.prober import ProxyCheck as ProxyCheck
+from mm_web3.prober import ProxyProber as ProxyProber
 from mm_web3.proxy import Proxies as Proxies
+from mm_web3.proxy import ProxyListCache as ProxyListCache
+from mm_web3.proxy import ProxyPool as ProxyPool
 from mm_web3.proxy import fetch_proxies as fetch_proxies
 from mm_web3.proxy import fetch_proxies_sync as fetch_proxies_sync
+from mm_web3.proxy import fetch_proxy_lists_sync as fetch_proxy_lists_sync
 from mm_web3.proxy import is_valid_proxy_url as is_valid_proxy_url
 from mm_web3.proxy import random_proxy as random_proxy
+from mm_web3.ratelimit import RateLimit as RateLimit
+from mm_web3.ratelimit import RateLimiter as RateLimiter
+from mm_web3.retry import AttemptLog as AttemptLog
+from mm_web3.retry import Hedge as Hedge
+from mm_web3.retry import RetryLogMode as RetryLogMode
+from mm_web3.retry import RetryOptions as RetryOptions
+from mm_web3.retry import SyncRetryOptions as SyncRetryOptions
+from mm_web3.retry import remaining_time as remaining_time
+from mm_web3.retry import retry_as_completed as retry_as_completed
+from mm_web3.retry import retry_map as retry_map
+from mm_web3.retry import retry_map_sync as retry_map_sync
 from mm_web3.retry import retry_with_node_and_proxy as retry_with_node_and_proxy
+from mm_web3.retry import retry_with_node_and_proxy_sync as retry_with_node_and_proxy_sync
 from mm_web3.retry import retry_with_proxy as retry_with_proxy
+from mm_web3.retry import retry_with_proxy_sync as retry_with_proxy_sync
+from mm_web3.singleflight import SingleFlight as SingleFlight
 from mm_web3.utils import read_items_from_file as read_items_from_file
 from mm_web3.utils import read_lines_from_file as read_lines_from_file
 from mm_web3.validators import ConfigValidators as ConfigValidators
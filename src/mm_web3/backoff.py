@@ -0,0 +1,69 @@
+"""Delay policies between retry attempts."""
+
+import random
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from enum import StrEnum, unique
+
+
+@unique
+class Jitter(StrEnum):
+    """Randomization applied to exponential backoff delays."""
+
+    NONE = "none"  # base * 2**n, capped
+    FULL = "full"  # uniform(0, base * 2**n), capped
+    DECORRELATED = "decorrelated"  # uniform(base, previous * 3), capped
+
+
+class Backoff(ABC):
+    """Policy that produces delays between retry attempts."""
+
+    @abstractmethod
+    def delays(self) -> Iterator[float]:
+        """Return a fresh iterator of delays in seconds: the first value is the delay before the second attempt."""
+
+
+class ConstantBackoff(Backoff):
+    """Wait the same delay before every retry."""
+
+    def __init__(self, delay: float) -> None:
+        if delay < 0:
+            raise ValueError(f"delay must be non-negative: {delay}")
+        self.delay = delay
+
+    def delays(self) -> Iterator[float]:
+        while True:
+            yield self.delay
+
+
+class ExponentialBackoff(Backoff):
+    """Exponentially growing delays, capped at `cap`, with optional jitter.
+
+    Full and decorrelated jitter spread retries of concurrent callers over time, so they don't hit a recovering
+    endpoint in synchronized waves.
+    """
+
+    def __init__(self, base: float = 0.1, cap: float = 10.0, jitter: Jitter = Jitter.FULL) -> None:
+        if base <= 0:
+            raise ValueError(f"base must be positive: {base}")
+        if cap < base:
+            raise ValueError(f"cap must be at least base: {cap} < {base}")
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+
+    def delays(self) -> Iterator[float]:
+        attempt = 0
+        previous = self.base
+        while True:
+            ceiling = min(self.cap, self.base * 2**attempt)
+            match self.jitter:
+                case Jitter.NONE:
+                    delay = ceiling
+                case Jitter.FULL:
+                    delay = random.uniform(0, ceiling)
+                case Jitter.DECORRELATED:
+                    delay = min(self.cap, random.uniform(self.base, previous * 3))
+            previous = delay
+            attempt = min(attempt + 1, 64)  # 2**attempt stays a reasonable float
+            yield delay
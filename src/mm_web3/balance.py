@@ -0,0 +1,166 @@
+"""Load-balancing strategies for node and proxy selection."""
+
+import bisect
+import hashlib
+import itertools
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from typing import override
+
+
+class Balancer(ABC):
+    """Strategy that picks one endpoint URL (node or proxy) out of the candidates of an attempt.
+
+    A balancer can be passed per call to the retry helpers, `random_node` and `random_proxy`, or set on a NodePool or
+    ProxyPool. The retry helpers report every attempt: `start` and `finish` around the call, `observe` with the latency
+    of successful ones. These counters are kept here for all strategies, one instance may serve nodes and proxies.
+    """
+
+    def __init__(self, alpha: float = 0.3) -> None:
+        """
+        Args:
+            alpha: EWMA smoothing factor in (0, 1] for observed latencies.
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1]: {alpha}")
+        self.alpha = alpha
+        self._outstanding: dict[str, int] = {}
+        self._latency: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def choose(self, candidates: Sequence[str], key: str | None = None) -> str:
+        """Pick one of the candidates, which is never empty. `key` is a caller-defined affinity key, e.g. an address."""
+
+    def outstanding(self, url: str) -> int:
+        """Number of requests in flight to the endpoint."""
+        return self._outstanding.get(url, 0)
+
+    def latency(self, url: str) -> float | None:
+        """EWMA latency of successful requests to the endpoint, None until the first one."""
+        return self._latency.get(url)
+
+    def start(self, url: str) -> None:
+        """Report a request to the endpoint has started."""
+        with self._lock:
+            self._outstanding[url] = self._outstanding.get(url, 0) + 1
+
+    def finish(self, url: str) -> None:
+        """Report a request to the endpoint has finished, successfully or not."""
+        with self._lock:
+            self._outstanding[url] = max(0, self._outstanding.get(url, 0) - 1)
+
+    def observe(self, url: str, latency: float) -> None:
+        """Record the latency of a successful request."""
+        with self._lock:
+            previous = self._latency.get(url)
+            self._latency[url] = latency if previous is None else previous + self.alpha * (latency - previous)
+
+
+class RandomBalancer(Balancer):
+    """Uniform random choice, the default behaviour of sequences."""
+
+    @override
+    def choose(self, candidates: Sequence[str], key: str | None = None) -> str:
+        return random.choice(candidates)
+
+
+class RoundRobinBalancer(Balancer):
+    """Cycle through the candidates in order: pick the one chosen least recently.
+
+    Candidates that drop out are skipped without restarting the cycle. Disjoint candidate sets don't affect each other,
+    so one instance serving nodes and proxies cycles through both independently instead of advancing them in lockstep.
+    """
+
+    def __init__(self, alpha: float = 0.3) -> None:
+        super().__init__(alpha)
+        self._chosen_at: dict[str, int] = {}
+        self._ticks = itertools.count()
+
+    @override
+    def choose(self, candidates: Sequence[str], key: str | None = None) -> str:
+        with self._lock:
+            url = min(candidates, key=lambda url: self._chosen_at.get(url, -1))
+            self._chosen_at[url] = next(self._ticks)
+        return url
+
+
+class LeastOutstandingBalancer(Balancer):
+    """Pick the endpoint with the fewest requests in flight, ties broken randomly."""
+
+    @override
+    def choose(self, candidates: Sequence[str], key: str | None = None) -> str:
+        with self._lock:
+            outstanding = [self._outstanding.get(url, 0) for url in candidates]
+        fewest = min(outstanding)
+        return random.choice([url for url, n in zip(candidates, outstanding, strict=True) if n == fewest])
+
+
+class PowerOfTwoBalancer(Balancer):
+    """Power of two choices: sample two candidates and take the one with the lower expected latency.
+
+    The score is the EWMA latency multiplied by the requests in flight plus one. Endpoints without observations are
+    scored with the best known latency, so they get explored.
+    """
+
+    @override
+    def choose(self, candidates: Sequence[str], key: str | None = None) -> str:
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        with self._lock:
+            return first if self._score(first) <= self._score(second) else second
+
+    def _score(self, url: str) -> float:
+        """Expected latency of a request to the endpoint. Called with the lock held, as observe may add latencies."""
+        latency = self.latency(url)
+        if latency is None:
+            latency = min(self._latency.values(), default=1.0)
+        return latency * (self.outstanding(url) + 1)
+
+
+class ConsistentHashBalancer(Balancer):
+    """Map a caller key to the same endpoint for as long as it is a candidate.
+
+    Endpoints are placed on a hash ring with `replicas` virtual points each, so when an endpoint drops out only the keys
+    mapped to it move. Calls without a key fall back to a random choice.
+    """
+
+    def __init__(self, replicas: int = 100, alpha: float = 0.3) -> None:
+        if replicas < 1:
+            raise ValueError(f"replicas must be at least 1: {replicas}")
+        super().__init__(alpha)
+        self.replicas = replicas
+        self._placed: set[str] = set()
+        self._ring: tuple[list[int], list[str]] = ([], [])
+
+    @override
+    def choose(self, candidates: Sequence[str], key: str | None = None) -> str:
+        if key is None:
+            return random.choice(candidates)
+        allowed = set(candidates)
+        with self._lock:
+            if not allowed <= self._placed:
+                self._place(allowed - self._placed)
+            hashes, urls = self._ring
+        start = bisect.bisect(hashes, _hash(key))
+        return next(urls[i % len(urls)] for i in range(start, start + len(urls)) if urls[i % len(urls)] in allowed)
+
+    def _place(self, new: set[str]) -> None:
+        """Add the points of new endpoints to the ring. Called with the lock held.
+
+        The ring holds every endpoint seen so far, choose walks it clockwise past those that aren't candidates. Failures
+        only shrink the candidates, so the ring is rebuilt just when an endpoint shows up for the first time.
+        """
+        hashes, urls = self._ring
+        points = sorted(
+            [*zip(hashes, urls, strict=True), *((_hash(f"{url}#{i}"), url) for url in new for i in range(self.replicas))]
+        )
+        self._ring = [h for h, _ in points], [url for _, url in points]
+        self._placed |= new
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest())
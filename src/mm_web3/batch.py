@@ -0,0 +1,161 @@
+"""Automatic JSON-RPC micro-batching across concurrent callers."""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Unpack
+
+from mm_http import http_request
+from mm_result import Result
+
+from mm_web3.classify import ErrorKind
+from mm_web3.node import Nodes
+from mm_web3.proxy import Proxies
+from mm_web3.retry import RetryOptions, retry_with_node_and_proxy
+
+
+@dataclass(slots=True)
+class _Call:
+    method: str
+    params: list[Any] | dict[str, Any]
+    future: asyncio.Future[Result[Any]] = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class JsonRpcBatcher:
+    """Gathers JSON-RPC calls of concurrent callers into batch requests.
+
+    Calls arriving within `max_wait` seconds of the first pending one, up to `max_batch_size`, are sent as a single
+    JSON-RPC batch through retry_with_node_and_proxy, and each caller gets its own Result back. Retries work at two
+    levels: the whole batch is retried on transport errors (by the retry loop), then items that came back with
+    an error are re-sent in a smaller batch up to `item_retries` times. When the retry options have a classifier,
+    items with fatal errors are not re-sent.
+
+        batcher = JsonRpcBatcher(nodes, proxies, retries=3)
+        balances = await asyncio.gather(*(batcher.call("eth_getBalance", [a, "latest"]) for a in addresses))
+    """
+
+    def __init__(
+        self,
+        nodes: Nodes,
+        proxies: Proxies,
+        *,
+        retries: int,
+        item_retries: int = 1,
+        max_batch_size: int = 100,
+        max_wait: float = 0.005,
+        timeout: float = 10,
+        **options: Unpack[RetryOptions],
+    ) -> None:
+        """
+        Args:
+            nodes: Available nodes.
+            proxies: Available proxies.
+            retries: Number of attempts for each batch request.
+            item_retries: How many times items that failed inside an ok batch response are re-sent.
+            max_batch_size: Maximum number of calls in one batch request.
+            max_wait: Maximum time in seconds a call waits for others before its batch is sent.
+            timeout: HTTP request timeout in seconds.
+            **options: Keyword options of retry_with_node_and_proxy for the batch requests.
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be at least 1: {max_batch_size}")
+        if max_wait < 0 or item_retries < 0:
+            raise ValueError("max_wait and item_retries must be non-negative")
+        self.nodes = nodes
+        self.proxies = proxies
+        self.retries = retries
+        self.item_retries = item_retries
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.options = options
+        self.batches = 0  # batch requests sent, including re-sent failed items
+        self._pending: list[_Call] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def call(self, method: str, params: list[Any] | dict[str, Any] | None = None) -> Result[Any]:
+        """Make a JSON-RPC call as part of the next batch. Returns the `result` member on success."""
+        call = _Call(method, params if params is not None else [])
+        self._pending.append(call)
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self.flush)
+        return await call.future
+
+    def flush(self) -> None:
+        """Send pending calls now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_batch_size], self._pending[self.max_batch_size :]
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """Send pending calls and wait until all batches in flight are done."""
+        self.flush()
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def _send(self, batch: list[_Call]) -> None:
+        try:
+            await self._send_rounds(batch)
+        except Exception as e:
+            for call in batch:
+                if not call.future.done():
+                    call.future.set_exception(e)
+
+    async def _send_rounds(self, batch: list[_Call]) -> None:
+        classifier = self.options.get("classifier")
+        remaining = batch
+        for round_ in range(self.item_retries + 1):
+            self.batches += 1
+            payload = [{"jsonrpc": "2.0", "id": i, "method": c.method, "params": c.params} for i, c in enumerate(remaining)]
+            post = partial(self._post, payload=payload)
+            res = await retry_with_node_and_proxy(self.retries, self.nodes, self.proxies, post, **self.options)
+            if res.is_err():
+                for call in remaining:
+                    _resolve(call, Result.err(res.unwrap_err(), res.context))
+                return
+
+            responses = res.unwrap()
+            failed = []
+            for i, call in enumerate(remaining):
+                item = responses.get(i)
+                if isinstance(item, dict) and "result" in item and item.get("error") is None:
+                    _resolve(call, Result.ok(item["result"], res.context))
+                    continue
+                error = item.get("error") if isinstance(item, dict) else None
+                item_res: Result[Any] = Result.err(f"rpc_error: {error or 'missing response'}", {"rpc_error": error})
+                last_round = round_ == self.item_retries
+                if last_round or (classifier is not None and classifier.classify(item_res) == ErrorKind.FATAL):
+                    _resolve(call, item_res)
+                else:
+                    failed.append(call)
+            if not failed:
+                return
+            remaining = failed
+
+    async def _post(self, node: str, proxy: str | None, payload: list[dict[str, Any]]) -> Result[dict[int, Any]]:
+        """Send one batch request and index the response items by id."""
+        res = await http_request(node, method="POST", json=payload, proxy=proxy, timeout=self.timeout)
+        if res.is_err():
+            return res.to_result_err()
+        try:
+            items = json.loads(res.body or "")
+        except ValueError as e:
+            return res.to_result_err(f"invalid json: {e}")
+        if not isinstance(items, list):
+            # A node that doesn't support batches answers with a single error object
+            return res.to_result_err(f"batch not supported: {items}")
+        return res.to_result_ok({item["id"]: item for item in items if isinstance(item, dict) and "id" in item})
+
+
+def _resolve(call: _Call, res: Result[Any]) -> None:
+    if not call.future.done():  # the caller may have been cancelled
+        call.future.set_result(res)
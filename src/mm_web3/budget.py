@@ -0,0 +1,97 @@
+"""Retry budget shared by retry calls, to keep a degraded provider from being hit by a retry storm."""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class _Bucket:
+    started_at: float
+    first_attempts: int = 0
+    retries: int = 0
+
+
+class RetryBudget:
+    """Caps retries at `ratio` of first attempts over a sliding window of `window` seconds.
+
+    Every retry call deposits its first attempt; each further attempt (retries and hedges) withdraws from the budget.
+    `min_retries` per window are always allowed, so a low-traffic process can still retry. When the budget is spent,
+    the retry helpers stop at once with RETRY_BUDGET_ERROR instead of making more attempts.
+
+    One instance is meant to be shared by all calls in the process (it is thread-safe). The totals `first_attempts`,
+    `retries` and `rejected` count since creation; `available` is the number of retries the window allows right now.
+    """
+
+    def __init__(self, ratio: float = 0.2, window: float = 10.0, min_retries: int = 10, buckets: int = 10) -> None:
+        """
+        Args:
+            ratio: Allowed retries per first attempt, e.g. 0.2 for at most 20% extra load.
+            window: Sliding window length in seconds.
+            min_retries: Retries allowed per window regardless of traffic.
+            buckets: Number of time buckets the window is split into.
+        """
+        if ratio < 0:
+            raise ValueError(f"ratio must be non-negative: {ratio}")
+        if window <= 0:
+            raise ValueError(f"window must be positive: {window}")
+        if min_retries < 0:
+            raise ValueError(f"min_retries must be non-negative: {min_retries}")
+        if buckets < 1:
+            raise ValueError(f"buckets must be at least 1: {buckets}")
+        self.ratio = ratio
+        self.window = window
+        self.min_retries = min_retries
+        self.first_attempts = 0
+        self.retries = 0
+        self.rejected = 0
+        self._bucket_length = window / buckets
+        self._buckets: deque[_Bucket] = deque()
+        self._window_first_attempts = 0
+        self._window_retries = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> int:
+        """Number of retries the budget allows right now."""
+        with self._lock:
+            self._expire()
+            return self._available()
+
+    def record_first_attempt(self) -> None:
+        """Deposit a first attempt."""
+        with self._lock:
+            self._current().first_attempts += 1
+            self._window_first_attempts += 1
+            self.first_attempts += 1
+
+    def try_retry(self) -> bool:
+        """Withdraw a retry if the budget allows it. Rejections are counted."""
+        with self._lock:
+            self._expire()
+            if self._available() <= 0:
+                self.rejected += 1
+                return False
+            self._current().retries += 1
+            self._window_retries += 1
+            self.retries += 1
+            return True
+
+    def _available(self) -> int:
+        allowed = max(self.min_retries, int(self._window_first_attempts * self.ratio))
+        return allowed - self._window_retries
+
+    def _current(self) -> _Bucket:
+        now = time.monotonic()
+        if not self._buckets or now - self._buckets[-1].started_at >= self._bucket_length:
+            self._expire(now)
+            self._buckets.append(_Bucket(started_at=now))
+        return self._buckets[-1]
+
+    def _expire(self, now: float | None = None) -> None:
+        cutoff = (time.monotonic() if now is None else now) - self.window
+        while self._buckets and self._buckets[0].started_at <= cutoff:
+            bucket = self._buckets.popleft()
+            self._window_first_attempts -= bucket.first_attempts
+            self._window_retries -= bucket.retries
@@ -0,0 +1,136 @@
+"""TTL + LRU response cache for read-only RPC functions."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, cast
+
+from mm_result import Result
+
+from mm_web3.retry import FuncWithNodeAndProxy, FuncWithProxy
+
+
+@dataclass(slots=True)
+class _Entry:
+    result: Result[Any]
+    expires_at: float  # fresh until, time.monotonic() based
+    stale_until: float  # may be served while revalidating until
+
+
+class ResponseCache:
+    """Bounded cache of Results for read-only calls, keyed by a caller-supplied key.
+
+    Use it for immutable or slowly changing values such as chain id, token decimals or finalized blocks, around the
+    whole retry call, so a hit makes no request and no attempt at all:
+
+        await cache.get_or_call(("decimals", token), lambda: retry_with_node_and_proxy(3, nodes, proxies, get_decimals))
+
+    Don't pass a `wrap`ped function to the retry helpers instead: every hit would be reported as an attempt of the
+    picked node and proxy, to node pools, circuit breakers, limiters and balancers, though none was contacted.
+
+    Ok results live for `ttl` seconds, errors for `negative_ttl` seconds (not cached when 0). Within
+    `stale_while_revalidate` seconds after expiry, the stale result is returned at once while a single background
+    call refreshes it. The least recently used entry is evicted when the cache holds `maxsize` entries.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: float | None = 60, negative_ttl: float = 0, stale_while_revalidate: float = 0
+    ) -> None:
+        """
+        Args:
+            maxsize: Maximum number of entries.
+            ttl: Lifetime of ok results in seconds. None means they never expire.
+            negative_ttl: Lifetime of error results in seconds.
+            stale_while_revalidate: How long after expiry a stale ok result may be served while it is refreshed.
+        """
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1: {maxsize}")
+        if (ttl is not None and ttl <= 0) or negative_ttl < 0 or stale_while_revalidate < 0:
+            raise ValueError("ttl must be positive, negative_ttl and stale_while_revalidate non-negative")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.hits = 0
+        self.stale_hits = 0  # included in hits
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._refreshing: dict[Hashable, asyncio.Task[None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_call[T](self, key: Hashable, call: Callable[[], Awaitable[Result[T]]]) -> Result[T]:
+        """Return the cached Result for key, or await `call` and cache its Result. Typically `call` is a retry call."""
+        return await self._get(key, call)
+
+    def wrap[T](self, key: Hashable, func: FuncWithNodeAndProxy[T]) -> FuncWithNodeAndProxy[T]:
+        """Return a cached version of a (node, proxy) function, for direct calls. See the class docs for retry calls."""
+
+        async def cached(node: str, proxy: str | None) -> Result[T]:
+            return await self._get(key, lambda: func(node, proxy))
+
+        return cached
+
+    def wrap_proxy[T](self, key: Hashable, func: FuncWithProxy[T]) -> FuncWithProxy[T]:
+        """Return a cached version of a (proxy) function, for direct calls. See the class docs for retry calls."""
+
+        async def cached(proxy: str | None) -> Result[T]:
+            return await self._get(key, lambda: func(proxy))
+
+        return cached
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop the entry for key, or all entries when key is None."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def _get[T](self, key: Hashable, call: Callable[[], Awaitable[Result[T]]]) -> Result[T]:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cast(Result[T], entry.result)
+            if now < entry.stale_until:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    task = asyncio.create_task(self._refresh(key, call))
+                    self._refreshing[key] = task
+                    task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+                return cast(Result[T], entry.result)
+
+        self.misses += 1
+        res = await call()
+        self._store(key, res)
+        return res
+
+    async def _refresh[T](self, key: Hashable, call: Callable[[], Awaitable[Result[T]]]) -> None:
+        try:
+            res = await call()
+        except Exception:
+            return  # keep serving the stale result until it runs out
+        if res.is_ok():
+            self._store(key, res)
+
+    def _store(self, key: Hashable, res: Result[Any]) -> None:
+        now = time.monotonic()
+        if res.is_ok():
+            expires_at = now + self.ttl if self.ttl is not None else float("inf")
+            stale_until = expires_at + self.stale_while_revalidate
+        elif self.negative_ttl > 0:
+            expires_at = stale_until = now + self.negative_ttl
+        else:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = _Entry(res, expires_at, stale_until)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -1,6 +1,12 @@
+import operator
 import random
 import re
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
 from decimal import Decimal
+from fractions import Fraction
+from typing import NamedTuple, override
 
 from mm_std import random_decimal
 
@@ -23,7 +29,7 @@ def calc_decimal_expression(expression: str) -> Decimal:
     """
     expression = expression.lower().strip()
     if expression.startswith("random(") and expression.endswith(")"):
-        arr = expression.lstrip("random(").rstrip(")").split(",")
+        arr = expression.removeprefix("random(").removesuffix(")").split(",")
         if len(arr) != 2:
             raise ValueError(f"wrong expression, random part: {expression}")
         try:
@@ -41,14 +47,70 @@ def calc_decimal_expression(expression: str) -> Decimal:
         raise ValueError(f"invalid decimal expression: {expression}") from e
 
 
-def convert_value_with_units(value: str, unit_decimals: dict[str, int]) -> int:
+@dataclass(slots=True)
+class _SuffixNode:
+    children: dict[str, _SuffixNode] = field(default_factory=dict)
+    unit: str | None = None  # set when the path from the root spells a whole unit backwards
+
+
+class UnitTable:
+    """Unit suffixes with their decimal places, prepared once for repeated conversions.
+
+    Unit names are case-insensitive. `powers` holds 10 ** decimals of every unit. `match` finds the longest unit suffix
+    of a value by walking a trie of the reversed names, in time proportional to the suffix length, so "gwei" wins over
+    "wei" regardless of their order in the mapping.
+    """
+
+    def __init__(self, unit_decimals: Mapping[str, int]) -> None:
+        """
+        Args:
+            unit_decimals: Mapping of unit suffixes to decimal places (e.g., {"eth": 18})
+        """
+        self.decimals: dict[str, int] = {}
+        self.powers: dict[str, int] = {}
+        self._root = _SuffixNode()
+        for name, decimals in unit_decimals.items():
+            unit = name.lower()
+            if not unit:
+                raise ValueError("unit name is empty")
+            if decimals < 0:
+                raise ValueError(f"unit decimals must be non-negative: {name}")
+            self.decimals[unit] = decimals
+            self.powers[unit] = 10**decimals
+            node = self._root
+            for char in reversed(unit):
+                node = node.children.setdefault(char, _SuffixNode())
+            node.unit = unit
+
+    def __contains__(self, unit: object) -> bool:
+        return unit in self.decimals
+
+    def __len__(self) -> int:
+        return len(self.decimals)
+
+    def match(self, value: str) -> str | None:
+        """Longest unit that the lowercase value ends with, or None."""
+        node = self._root
+        unit = None
+        for char in reversed(value):
+            next_node = node.children.get(char)
+            if next_node is None:
+                break
+            node = next_node
+            if node.unit is not None:
+                unit = node.unit
+        return unit
+
+
+def convert_value_with_units(value: str, unit_decimals: Mapping[str, int] | UnitTable) -> int:
     """Convert value with units to base integer units.
 
-    Converts values like "1.5eth" to base units (wei) using decimal places mapping.
+    Converts values like "1.5eth" to base units (wei) using decimal places mapping. The longest matching unit suffix
+    is used. Pass a UnitTable to avoid preparing the units on every call.
 
     Args:
         value: String value to convert (e.g., "123.45eth", "100")
-        unit_decimals: Mapping of unit suffixes to decimal places (e.g., {"eth": 18})
+        unit_decimals: Mapping of unit suffixes to decimal places (e.g., {"eth": 18}), or a UnitTable
 
     Returns:
         Value converted to base integer units
@@ -61,31 +123,46 @@ def convert_value_with_units(value: str, unit_decimals: dict[str, int]) -> int:
         raise ValueError(f"negative value is illegal: {value}")
     if value.isdigit():
         return int(value)
-    unit_decimals = {k.lower(): v for k, v in unit_decimals.items()}
-    for suffix in unit_decimals:
-        if value.endswith(suffix):
-            value = value.removesuffix(suffix)
-            return int(Decimal(value) * 10 ** unit_decimals[suffix])
+    units = _unit_table(unit_decimals)
+    suffix = units.match(value)
+    if suffix is not None:
+        try:
+            return int(Decimal(value.removesuffix(suffix)) * units.powers[suffix])
+        except ArithmeticError as e:
+            raise ValueError(f"illegal value: {value}") from e
 
     raise ValueError(f"illegal value: {value}")
 
 
+def _unit_table(unit_decimals: Mapping[str, int] | UnitTable | None) -> UnitTable:
+    if isinstance(unit_decimals, UnitTable):
+        return unit_decimals
+    return UnitTable(unit_decimals or {})
+
+
 def calc_expression_with_vars(
-    expression: str, variables: dict[str, int] | None = None, unit_decimals: dict[str, int] | None = None
+    expression: str, variables: dict[str, int] | None = None, unit_decimals: dict[str, int] | UnitTable | None = None
 ) -> int:
     """Calculate complex integer expression with variables, units and random values.
 
     Supports:
-    - Arithmetic operations: "+", "-"
+    - Arithmetic operations: "+", "-", "*", "/" and parentheses
     - Variables with multipliers: "balance", "0.5balance"
     - Unit conversions: "1.5eth", "100gwei"
     - Random function: "random(1eth, 2eth)"
-    - Mixed expressions: "0.2balance + random(1gwei, 2gwei) - 100"
+    - Functions: "min(a, b, ...)", "max(a, b, ...)", "clamp(value, low, high)"
+    - Mixed expressions: "0.2balance + random(1gwei, 2gwei) - 100", "min(balance - fee, 10eth)"
+
+    All values are integers in base units. Multipliers and unit conversions are exact and then truncated toward zero,
+    "/" is integer division truncated toward zero as well. A sign is allowed at the start of an expression, an argument
+    or a parenthesized group, e.g. "2 * (-3)" but not "2 * -3".
+
+    To evaluate one expression many times, compile it once with compile_expression.
 
     Args:
         expression: String expression to calculate
         variables: Mapping of variable names to their integer values
-        unit_decimals: Mapping of unit suffixes to decimal places
+        unit_decimals: Mapping of unit suffixes to decimal places, or a UnitTable
 
     Returns:
         Calculated integer value in base units
@@ -94,124 +171,469 @@ def calc_expression_with_vars(
         ValueError: If expression format is invalid
         TypeError: If expression is not a string
     """
-    if not isinstance(expression, str):
-        raise TypeError(f"expression is not str: {expression}")
-    expression = expression.lower().strip()
-    if unit_decimals is None:
-        unit_decimals = {}
     if variables is None:
         variables = {}
-    unit_decimals = {k.lower(): v for k, v in unit_decimals.items()}
-    variables = {k.lower(): v for k, v in variables.items()}
+    return compile_expression(expression, unit_decimals, variables).evaluate(variables)
 
-    # Check for conflicts between variable names and unit suffixes
-    for var_name in variables:
-        if var_name in unit_decimals:
-            raise ValueError(f"variable name conflicts with unit suffix: {var_name}")
 
-    try:
-        result = 0
-        for token in _split_on_plus_minus_tokens(expression.lower()):
-            operator = token[0]
-            term = token[1:]
-            suffix = _get_suffix(term, unit_decimals)
-
-            if term.isdigit():
-                term_value = int(term)
-            elif suffix is not None:
-                term_value = convert_value_with_units(term, unit_decimals)
-            elif term.startswith("random(") and term.endswith(")"):
-                term_value = _parse_random_function(term, unit_decimals)
-            elif variables:
-                # Check if term ends with any variable name
-                matched_var = None
-                for var_name in variables:
-                    if term.endswith(var_name):
-                        matched_var = var_name
-                        break
-
-                if matched_var:
-                    multiplier_part = term.removesuffix(matched_var)
-                    multiplier = Decimal(multiplier_part) if multiplier_part else Decimal(1)
-                    term_value = int(multiplier * variables[matched_var])
-                else:
-                    # Re-raise as ValueError for consistent error type from function
-                    raise ValueError(f"unrecognized term: {term}")  # noqa: TRY301
-            else:
-                # Re-raise as ValueError for consistent error type from function
-                raise ValueError(f"unrecognized term: {term}")  # noqa: TRY301
+class _Node(ABC):
+    """Node of a compiled expression tree."""
 
-            if operator == "+":
-                result += term_value
-            elif operator == "-":
-                result -= term_value
+    __slots__ = ()
 
-        # Return inside try is intentional - exception handling wraps entire calculation
-        return result  # noqa: TRY300
-    except Exception as e:
-        raise ValueError(e) from e
+    @abstractmethod
+    def evaluate(self, variables: Mapping[str, int] | None) -> int:
+        """Value of the node in base units."""
+
+    @abstractmethod
+    def evaluate_batch(self, columns: Mapping[str, list[int]], size: int) -> list[int]:
+        """Values of the node for every row of the columns."""
+
+
+@dataclass(frozen=True, slots=True)
+class _Constant(_Node):
+    value: int
+
+    @override
+    def evaluate(self, variables: Mapping[str, int] | None) -> int:
+        return self.value
 
+    @override
+    def evaluate_batch(self, columns: Mapping[str, list[int]], size: int) -> list[int]:
+        return [self.value] * size
 
-def _parse_random_function(term: str, unit_decimals: dict[str, int]) -> int:
-    """Extract random function parameters and generate random value within range.
 
-    Supports unit conversion in random bounds to ensure consistent base units.
+@dataclass(frozen=True, slots=True)
+class _Variable(_Node):
+    name: str  # as passed to compile_expression
+    multiplier: Fraction | None = None  # 0.5 of "0.5balance"
+
+    @override
+    def evaluate(self, variables: Mapping[str, int] | None) -> int:
+        value = _lookup_variable(variables, self.name)
+        return value if self.multiplier is None else int(self.multiplier * value)
+
+    @override
+    def evaluate_batch(self, columns: Mapping[str, list[int]], size: int) -> list[int]:
+        column = _lookup_variable(columns, self.name)
+        if self.multiplier is None:
+            return column.copy()
+        numerator, denominator = self.multiplier.numerator, self.multiplier.denominator
+        if denominator == 1:
+            return [numerator * value for value in column]
+        # int(Fraction) without building fractions: truncate toward zero
+        return [p // denominator if (p := numerator * value) >= 0 else -(-p // denominator) for value in column]
+
+
+@dataclass(frozen=True, slots=True)
+class _Negate(_Node):
+    operand: _Node
+
+    @override
+    def evaluate(self, variables: Mapping[str, int] | None) -> int:
+        return -self.operand.evaluate(variables)
+
+    @override
+    def evaluate_batch(self, columns: Mapping[str, list[int]], size: int) -> list[int]:
+        return list(map(operator.neg, self.operand.evaluate_batch(columns, size)))
+
+
+class _Operation(NamedTuple):
+    op: str  # "+", "-", "*" or "/"
+    operand: _Node
+    position: int
+
+
+@dataclass(frozen=True, slots=True)
+class _Chain(_Node):
+    """Operators of one precedence level applied left to right: "a - b + c" is first=a, rest=(-b, +c).
+
+    A chain is evaluated in a loop rather than as nested binary nodes, so the tree depth does not grow with its length.
     """
-    content = term.lstrip("random(").rstrip(")")
-    parts = content.split(",")
-    if len(parts) != 2:
-        raise ValueError(f"random function must have exactly 2 arguments: {term}")
 
-    from_value = convert_value_with_units(parts[0].strip(), unit_decimals)
-    to_value = convert_value_with_units(parts[1].strip(), unit_decimals)
+    first: _Node
+    rest: tuple[_Operation, ...]
+
+    @override
+    def evaluate(self, variables: Mapping[str, int] | None) -> int:
+        value = self.first.evaluate(variables)
+        for op, operand, position in self.rest:
+            value = _apply(op, value, operand.evaluate(variables), position)
+        return value
+
+    @override
+    def evaluate_batch(self, columns: Mapping[str, list[int]], size: int) -> list[int]:
+        values = self.first.evaluate_batch(columns, size)
+        for op, operand, position in self.rest:
+            right = operand.evaluate_batch(columns, size)
+            if op == "/":
+                values = [_divide(a, b, position) for a, b in zip(values, right, strict=True)]
+            else:
+                values = list(map(_OPERATORS[op], values, right, strict=True))
+        return values
+
+
+@dataclass(frozen=True, slots=True)
+class _Call(_Node):
+    function: str  # a key of _FUNCTIONS
+    args: tuple[_Node, ...]
+    position: int
+
+    @override
+    def evaluate(self, variables: Mapping[str, int] | None) -> int:
+        return _call(self.function, [arg.evaluate(variables) for arg in self.args], self.position)
+
+    @override
+    def evaluate_batch(self, columns: Mapping[str, list[int]], size: int) -> list[int]:
+        if self.function == "random" and all(isinstance(arg, _Constant) for arg in self.args):
+            low, high = (arg.value for arg in self.args if isinstance(arg, _Constant))
+            return _random_column(low, high, size)
+        args = [arg.evaluate_batch(columns, size) for arg in self.args]
+        if self.function == "min":
+            return list(map(min, *args, strict=True))
+        if self.function == "max":
+            return list(map(max, *args, strict=True))
+        return [_call(self.function, list(row), self.position) for row in zip(*args, strict=True)]
+
+
+# Function name -> (min args, max args or None for any number)
+_FUNCTIONS: dict[str, tuple[int, int | None]] = {"random": (2, 2), "min": (2, None), "max": (2, None), "clamp": (3, 3)}
+
+_OPERATORS: dict[str, Callable[[int, int], int]] = {"+": operator.add, "-": operator.sub, "*": operator.mul}
+
+
+def _apply(op: str, left: int, right: int, position: int) -> int:
+    if op == "/":
+        return _divide(left, right, position)
+    return _OPERATORS[op](left, right)
+
 
-    if from_value > to_value:
-        raise ValueError(f"random range invalid, min > max: {term}")
+def _divide(left: int, right: int, position: int) -> int:
+    """Integer division truncated toward zero."""
+    if right == 0:
+        raise ValueError(f"division by zero at position {position}")
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
 
-    return random.randint(from_value, to_value)
 
+def _call(function: str, args: list[int], position: int) -> int:
+    if function == "random":
+        if args[0] > args[1]:
+            raise ValueError(f"random range invalid, min > max at position {position}")
+        return random.randint(args[0], args[1])
+    if function == "min":
+        return min(args)
+    if function == "max":
+        return max(args)
+    value, low, high = args
+    if low > high:
+        raise ValueError(f"clamp range invalid, min > max at position {position}")
+    return min(max(value, low), high)
 
-def _get_suffix(item: str, unit_decimals: dict[str, int]) -> str | None:
-    """Find unit suffix in term to enable unit conversion.
 
-    Returns first matching suffix to avoid ambiguity in complex expressions.
+def _random_column(low: int, high: int, size: int) -> list[int]:
+    """Draw `size` values of random.randint(low, high) at once.
+
+    Uses the same getrandbits rejection sampling as random.randint and keeps accepted draws in order, so it consumes
+    the random stream exactly like `size` sequential randint calls and returns the same values.
+    """
+    span = high - low + 1
+    bits = span.bit_length()
+    getrandbits = random.getrandbits
+    column: list[int] = []
+    while len(column) < size:
+        draws = [getrandbits(bits) for _ in range(size - len(column))]
+        column.extend(low + draw for draw in draws if draw < span)
+    return column
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledExpression:
+    """Expression parsed once by compile_expression, to be evaluated many times.
+
+    The expression is kept as a tree with units converted to base units, variables resolved to the names they are
+    looked up by, and every subexpression without variables or random values folded into a constant.
     """
-    for suffix in unit_decimals:
-        if item.endswith(suffix):
-            return suffix
-    return None
 
+    expression: str
+    var_names: tuple[str, ...]
+    root: _Node
+
+    def evaluate(self, variables: Mapping[str, int] | None = None) -> int:
+        """Calculate the value for the given variables, with the same result as calc_expression_with_vars.
+
+        Args:
+            variables: Mapping of variable names to their integer values. Only the referenced variables are required.
+
+        Returns:
+            Calculated integer value in base units
+
+        Raises:
+            ValueError: If a referenced variable is missing, on division by zero or on an invalid random or clamp range
+        """
+        return self.root.evaluate(variables)
+
+    def evaluate_batch(self, columns: Mapping[str, Iterable[int]], size: int | None = None) -> list[int]:
+        """Calculate the value for every row of the variable columns in one pass over the tree.
+
+        Each row gives the same result as `evaluate` with that row's variables. Random values are drawn in bulk, one
+        random call at a time; for an expression with a single random call and the same random state, the values are
+        those of calling `evaluate` row by row.
+
+        Args:
+            columns: Mapping of variable names to equally long columns of integer values: lists, array("q") or NumPy
+                integer arrays. Only the referenced variables are required.
+            size: Number of rows. Required only when no columns are given.
+
+        Returns:
+            Calculated integer values in base units, one per row
+
+        Raises:
+            ValueError: If columns differ in length or a referenced one is missing, on division by zero or on an
+                invalid random or clamp range in any row
+        """
+        lists = {name: _to_list(column) for name, column in columns.items()}
+        sizes = {len(column) for column in lists.values()}
+        if size is not None:
+            sizes.add(size)
+        if len(sizes) != 1:
+            raise ValueError("columns must have the same length" if sizes else "size is required when there are no columns")
+        return self.root.evaluate_batch(lists, sizes.pop())
 
-def _split_on_plus_minus_tokens(value: str) -> list[str]:
-    """Split expression into signed terms for sequential evaluation.
 
-    Normalizes input by removing spaces and adding leading '+' when needed.
-    Each token contains operator (+ or -) followed by the term value.
+def compile_expression(
+    expression: str, unit_decimals: dict[str, int] | UnitTable | None = None, var_names: Iterable[str] = ()
+) -> CompiledExpression:
+    """Parse an expression of calc_expression_with_vars once, for repeated evaluation.
+
+    Args:
+        expression: String expression to compile
+        unit_decimals: Mapping of unit suffixes to decimal places, or a UnitTable
+        var_names: Names of the variables the expression may reference
+
+    Returns:
+        Immutable compiled expression
+
+    Raises:
+        ValueError: If expression format is invalid
+        TypeError: If expression is not a string
     """
-    value = "".join(value.split())
-    if not value:
-        raise ValueError("value is empty")
-    if "++" in value:
-        raise ValueError("++ in value")
-    if "--" in value:
-        raise ValueError("-- in value")
-    if value.endswith("-"):
-        raise ValueError("ends with -")
-    if value.endswith("+"):
-        raise ValueError("ends with +")
-
-    if not value.startswith("+") and not value.startswith("-"):
-        value = "+" + value
-
-    result: list[str] = []
-    rest_value = value
+    if not isinstance(expression, str):
+        raise TypeError(f"expression is not str: {expression}")
+    expression = expression.lower()
+    units = _unit_table(unit_decimals)
+    names: dict[str, str] = {}  # lowercase name -> name as passed
+    for name in var_names:
+        names.setdefault(name.lower(), name)
+
+    # Check for conflicts between variable names and unit suffixes
+    for var_name in names:
+        if var_name in units:
+            raise ValueError(f"variable name conflicts with unit suffix: {var_name}")
+
+    return _Parser(expression, units, names).parse()
+
+
+def _lookup_variable[V](variables: Mapping[str, V] | None, name: str) -> V:
+    """Look up a variable by the name it was compiled with, falling back to a case-insensitive match."""
+    if variables:
+        value = variables.get(name)
+        if value is not None:
+            return value
+        for key, value in variables.items():
+            if key.lower() == name.lower():
+                return value
+    raise ValueError(f"missing variable: {name}")
+
+
+def _to_list(column: Iterable[int]) -> list[int]:
+    """Column as a list of Python ints. array("q") and NumPy arrays convert themselves with `tolist`."""
+    if isinstance(column, list):
+        return column
+    tolist = getattr(column, "tolist", None)
+    return tolist() if tolist is not None else list(column)
+
+
+@dataclass(frozen=True, slots=True)
+class _Token:
+    kind: str  # "number", "name", "op" or "end"
+    text: str
+    position: int  # offset in the expression
+
+
+# Numbers follow Python literals: single underscores may group digits and an exponent may follow, "1_000eth", "1.5e9gwei"
+_DIGITS = r"\d(?:_?\d)*"
+_EXPONENT = rf"(?:[eE][+-]?{_DIGITS})?"
+_TOKEN_RE = re.compile(
+    rf"\s*(?:(?P<number>(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS}){_EXPONENT})|(?P<name>[^\W\d]\w*)|(?P<op>[-+*/(),]))"
+)
+
+
+def _tokenize(expression: str) -> list[_Token]:
+    """Split an expression into tokens in a single pass. The last token is always "end"."""
+    tokens: list[_Token] = []
+    position = 0
     while True:
-        if not rest_value:
-            return result
-        items = re.split(r"[+\-]", rest_value)
-        if rest_value.startswith("+"):
-            result.append("+" + items[1])
-            rest_value = rest_value.removeprefix("+" + items[1])
-        elif rest_value.startswith("-"):
-            result.append("-" + items[1])
-            rest_value = rest_value.removeprefix("-" + items[1])
+        match = _TOKEN_RE.match(expression, position)
+        if match is None:
+            rest = expression[position:]
+            if rest.strip():
+                offset = position + len(rest) - len(rest.lstrip())
+                raise ValueError(f"unexpected character {expression[offset]!r} at position {offset}: {expression}")
+            tokens.append(_Token("end", "", len(expression)))
+            return tokens
+        kind = str(match.lastgroup)
+        tokens.append(_Token(kind, match.group(kind), match.start(kind)))
+        position = match.end()
+
+
+_MAX_DEPTH = 100  # nested parentheses and function calls
+_MAX_EXPONENT = 100  # absolute value of a NUMBER's exponent, e.g. 1e18
+
+
+class _Parser:
+    """Recursive descent parser of the calc_expression_with_vars grammar.
+
+    sum      := ["+" | "-"] product (("+" | "-") product)*
+    product  := primary (("*" | "/") primary)*
+    primary  := NUMBER [unit | variable] | variable | function "(" sum ("," sum)* ")" | "(" sum ")"
+
+    A NUMBER may have an exponent, e.g. 1e18 or 1.5e-3, of at most _MAX_EXPONENT. An integer NUMBER may stand alone,
+    a fractional one needs a unit or a variable to multiply. Parentheses and function calls may nest at most _MAX_DEPTH
+    levels deep.
+    """
+
+    def __init__(self, expression: str, units: UnitTable, names: dict[str, str]) -> None:
+        self.expression = expression
+        self.units = units
+        self.names = names
+        self.tokens = _tokenize(expression)
+        self.index = 0
+        self.depth = 0  # parentheses and function calls entered
+
+    def parse(self) -> CompiledExpression:
+        if self._peek().kind == "end":
+            raise ValueError("value is empty")
+        root = self._sum()
+        token = self._next()
+        if token.kind != "end":
+            raise self._unexpected(token)
+        return CompiledExpression(expression=self.expression.strip(), var_names=tuple(self.names.values()), root=root)
+
+    def _sum(self) -> _Node:
+        negative = False
+        if self._peek().text in ("+", "-"):
+            negative = self._next().text == "-"
+        node = self._product()
+        if negative:
+            node = self._fold(_Negate(node))
+        return self._chain(node, ("+", "-"), self._product)
+
+    def _product(self) -> _Node:
+        return self._chain(self._primary(), ("*", "/"), self._primary)
+
+    def _chain(self, first: _Node, ops: tuple[str, str], operand: Callable[[], _Node]) -> _Node:
+        rest: list[_Operation] = []
+        while self._peek().text in ops:
+            op = self._next()
+            rest.append(_Operation(op.text, operand(), op.position))
+        return self._fold(_Chain(first, tuple(rest))) if rest else first
+
+    def _primary(self) -> _Node:
+        token = self._next()
+        if token.text == "(":
+            self._enter(token)
+            node = self._sum()
+            self._expect(")")
+            self.depth -= 1
+            return node
+        if token.kind == "name" and self._peek().text == "(":
+            return self._call(token)
+        if token.kind == "name":
+            if token.text not in self.names:
+                raise self._error(token, f"unrecognized term: {token.text}")
+            return _Variable(self.names[token.text])
+        if token.kind != "number":
+            raise self._unexpected(token)
+
+        exponent = token.text.lower().partition("e")[2]
+        if exponent and abs(int(exponent)) > _MAX_EXPONENT:
+            raise self._error(token, f"exponent out of range: {token.text}")
+        number = Fraction(Decimal(token.text))
+        if self._peek().kind == "name":
+            name = self._next()
+            if name.text in self.names:
+                return _Variable(self.names[name.text], number)
+            if name.text not in self.units:
+                raise self._error(name, f"unknown unit: {name.text}")
+            return _Constant(int(number * self.units.powers[name.text]))
+        if number.denominator != 1:
+            raise self._error(token, f"fractional number needs a unit: {token.text}")
+        return _Constant(int(number))
+
+    def _call(self, name: _Token) -> _Node:
+        arity = _FUNCTIONS.get(name.text)
+        if arity is None:
+            raise self._error(name, f"unknown function: {name.text}")
+        self._enter(self._next())  # "("
+        args = [self._sum()]
+        while self._peek().text == ",":
+            self._next()
+            args.append(self._sum())
+        self._expect(")")
+        self.depth -= 1
+
+        min_args, max_args = arity
+        if len(args) < min_args or (max_args is not None and len(args) > max_args):
+            count = f"exactly {min_args}" if min_args == max_args else f"at least {min_args}"
+            raise self._error(name, f"{name.text} function must have {count} arguments")
+        node = _Call(name.text, tuple(args), name.position)
+        if name.text == "random":  # drawn at every evaluation, only the bounds are checked here
+            low, high = args
+            if isinstance(low, _Constant) and isinstance(high, _Constant) and low.value > high.value:
+                raise self._error(name, "random range invalid, min > max")
+            return node
+        return self._fold(node)
+
+    def _fold(self, node: _Negate | _Chain | _Call) -> _Node:
+        """Replace a node whose operands are all constants by its value, or the constant start of a chain."""
+        if isinstance(node, _Chain):
+            operands: tuple[_Node, ...] = (node.first, *(operation.operand for operation in node.rest))
+            constants = next((i for i, operand in enumerate(operands) if not isinstance(operand, _Constant)), len(operands))
+            if 1 < constants < len(operands):
+                return _Chain(self._fold(_Chain(node.first, node.rest[: constants - 1])), node.rest[constants - 1 :])
+        elif isinstance(node, _Negate):
+            operands = (node.operand,)
+        else:
+            operands = node.args
+        if not all(isinstance(operand, _Constant) for operand in operands):
+            return node
+        try:
+            return _Constant(node.evaluate(None))
+        except ValueError as e:
+            raise ValueError(f"{e}: {self.expression}") from e
+
+    def _enter(self, token: _Token) -> None:
+        """Count an opening parenthesis, refusing nesting that evaluation would need too much recursion for."""
+        self.depth += 1
+        if self.depth > _MAX_DEPTH:
+            raise self._error(token, f"expression nested deeper than {_MAX_DEPTH} levels")
+
+    def _expect(self, text: str) -> None:
+        token = self._next()
+        if token.text != text:
+            raise self._unexpected(token)
+
+    def _peek(self) -> _Token:
+        return self.tokens[self.index]
+
+    def _next(self) -> _Token:
+        token = self._peek()
+        self.index = min(self.index + 1, len(self.tokens) - 1)
+        return token
+
+    def _unexpected(self, token: _Token) -> ValueError:
+        return self._error(token, "unexpected end" if token.kind == "end" else f"unexpected {token.text!r}")
+
+    def _error(self, token: _Token, message: str) -> ValueError:
+        return ValueError(f"{message} at position {token.position}: {self.expression}")
@@ -0,0 +1,108 @@
+"""Circuit breakers for node and proxy endpoints."""
+
+import threading
+import time
+from dataclasses import dataclass
+from enum import StrEnum, unique
+
+
+@unique
+class CircuitState(StrEnum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"  # requests flow normally
+    OPEN = "open"  # endpoint is skipped until reset_timeout passes
+    HALF_OPEN = "half_open"  # a limited number of trial requests decide whether to close or reopen
+
+
+@dataclass(slots=True)
+class _Breaker:
+    state: CircuitState = CircuitState.CLOSED
+    failures: int = 0  # consecutive failures
+    opened_at: float = 0.0
+    trials: int = 0  # trial requests in flight while half-open
+
+
+class CircuitBreakers:
+    """Registry of circuit breakers keyed by endpoint URL (node or proxy).
+
+    A breaker opens after `failure_threshold` consecutive failures. After `reset_timeout` seconds it becomes
+    half-open and lets `half_open_max_calls` trial requests through: a success closes it, a failure opens it again.
+    Retry helpers skip open endpoints without making any request. The registry is safe to share between threads.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1) -> None:
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold must be at least 1: {failure_threshold}")
+        if reset_timeout < 0:
+            raise ValueError(f"reset_timeout must be non-negative: {reset_timeout}")
+        if half_open_max_calls < 1:
+            raise ValueError(f"half_open_max_calls must be at least 1: {half_open_max_calls}")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._breakers: dict[str, _Breaker] = {}
+        self._lock = threading.RLock()
+
+    def state(self, url: str) -> CircuitState:
+        """Return the current state of the endpoint's breaker."""
+        with self._lock:
+            breaker = self._breakers.get(url)
+            if breaker is None:
+                return CircuitState.CLOSED
+            if breaker.state == CircuitState.OPEN and time.monotonic() - breaker.opened_at >= self.reset_timeout:
+                breaker.state = CircuitState.HALF_OPEN
+                breaker.trials = 0
+            return breaker.state
+
+    def is_available(self, url: str) -> bool:
+        """Check whether a request to the endpoint would be allowed, without reserving a trial slot."""
+        with self._lock:
+            state = self.state(url)
+            if state == CircuitState.HALF_OPEN:
+                return self._breakers[url].trials < self.half_open_max_calls
+            return state == CircuitState.CLOSED
+
+    def allow(self, url: str) -> bool:
+        """Check whether a request to the endpoint is allowed. Reserves a trial slot when half-open."""
+        with self._lock:
+            if not self.is_available(url):
+                return False
+            breaker = self._breakers.get(url)
+            if breaker is not None and breaker.state == CircuitState.HALF_OPEN:
+                breaker.trials += 1
+            return True
+
+    def release(self, url: str) -> None:
+        """Give back a trial slot reserved by `allow` for a request that ended without an outcome, e.g. was cancelled."""
+        with self._lock:
+            breaker = self._breakers.get(url)
+            if breaker is not None and breaker.state == CircuitState.HALF_OPEN and breaker.trials > 0:
+                breaker.trials -= 1
+
+    def record_success(self, url: str) -> None:
+        """Record a successful request: closes the breaker."""
+        with self._lock:
+            breaker = self._breakers.get(url)
+            if breaker is not None:
+                breaker.state = CircuitState.CLOSED
+                breaker.failures = 0
+                breaker.trials = 0
+
+    def record_failure(self, url: str) -> None:
+        """Record a failed request: opens the breaker when the threshold is reached or a trial fails."""
+        with self._lock:
+            breaker = self._breakers.setdefault(url, _Breaker())
+            breaker.failures += 1
+            if breaker.state == CircuitState.HALF_OPEN or breaker.failures >= self.failure_threshold:
+                breaker.state = CircuitState.OPEN
+                breaker.opened_at = time.monotonic()
+                breaker.trials = 0
+
+    def reset(self, url: str | None = None) -> None:
+        """Close the endpoint's breaker, or all breakers when url is None."""
+        with self._lock:
+            if url is None:
+                self._breakers.clear()
+            else:
+                self._breakers.pop(url, None)
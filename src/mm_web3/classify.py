@@ -0,0 +1,89 @@
+"""Classification of failed attempts, so retries only happen on transient errors."""
+
+import re
+from collections.abc import Callable, Mapping
+from enum import StrEnum, unique
+from typing import Any
+
+from mm_result import Result
+
+
+@unique
+class ErrorKind(StrEnum):
+    """How the retry loop should react to a failed attempt."""
+
+    RETRY = "retry"  # transient error: retry as usual
+    SWITCH_NODE = "switch_node"  # node-specific error: don't use this node again in the call (the proxy in proxy-only calls)
+    FATAL = "fatal"  # permanent error that fails identically everywhere: stop retrying
+
+
+# Regular expressions over the lowercase error message -> kind. Checked in order, the first match wins.
+# Status codes only count in an HTTP status context, so an address or an amount containing "429" doesn't match.
+# Proxy failures have no rule: they are retried, and the next attempt draws another proxy anyway.
+BUILTIN_RULES: Mapping[str, ErrorKind] = {
+    r"\bexecution reverted\b": ErrorKind.FATAL,
+    r"\binvalid params\b": ErrorKind.FATAL,
+    r"\binvalid argument\b": ErrorKind.FATAL,
+    r"\bmethod not found\b": ErrorKind.FATAL,
+    r"\binsufficient funds\b": ErrorKind.FATAL,
+    r"\bnonce too low\b": ErrorKind.FATAL,
+    r"\balready known\b": ErrorKind.FATAL,
+    r"\breplacement transaction underpriced\b": ErrorKind.FATAL,
+    r"\bintrinsic gas too low\b": ErrorKind.FATAL,
+    r"\bgas required exceeds allowance\b": ErrorKind.FATAL,
+    r"\b(?:http|status|status code|status_code)\W{0,3}(?:429|502|503|504)\b": ErrorKind.SWITCH_NODE,
+    r"\b(?:429|502|503|504) (?:too many requests|bad gateway|service unavailable|gateway time-?out)\b": ErrorKind.SWITCH_NODE,
+    r"\btoo many requests\b": ErrorKind.SWITCH_NODE,
+    r"\brate[ _-]?limit": ErrorKind.SWITCH_NODE,
+    r"\bheader not found\b": ErrorKind.SWITCH_NODE,
+    r"\bmissing trie node\b": ErrorKind.SWITCH_NODE,
+    r"\btime(?:d)? ?out\b": ErrorKind.SWITCH_NODE,
+    r"\bconnection (?:refused|reset|aborted)\b": ErrorKind.SWITCH_NODE,
+    r"\b(?:bad gateway|service unavailable|gateway time-?out)\b": ErrorKind.SWITCH_NODE,
+}
+
+_BUILTIN_PATTERNS = [(re.compile(pattern), kind) for pattern, kind in BUILTIN_RULES.items()]
+
+
+class ErrorClassifier:
+    """Decides whether a failed attempt is retryable, needs another node, or is fatal.
+
+    The error message is the Result's error plus its exception, matched case-insensitively.
+    Resolution order: the user callable (if it returns a kind), user rules, built-in rules, then `default`.
+    User rules are plain substrings, built-in rules are the regular expressions of BUILTIN_RULES.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[Result[Any]], ErrorKind | None] | None = None,
+        rules: Mapping[str, ErrorKind] | None = None,
+        builtin_rules: bool = True,
+        default: ErrorKind = ErrorKind.RETRY,
+    ) -> None:
+        """
+        Args:
+            func: Callable over the failed Result (error, exception and context). Return None to fall through to the rules.
+            rules: Lowercase message substrings -> kind, checked before the built-in rules.
+            builtin_rules: Whether to apply BUILTIN_RULES.
+            default: Kind of errors no rule matches.
+        """
+        self.func = func
+        self.rules = {k.lower(): v for k, v in (rules or {}).items()}
+        self.builtin_rules = builtin_rules
+        self.default = default
+
+    def classify(self, res: Result[Any]) -> ErrorKind:
+        """Classify a failed Result."""
+        if self.func is not None:
+            kind = self.func(res)
+            if kind is not None:
+                return kind
+        message = f"{res.error} {res.exception or ''}".lower()
+        for pattern, kind in self.rules.items():
+            if pattern in message:
+                return kind
+        if self.builtin_rules:
+            for regex, kind in _BUILTIN_PATTERNS:
+                if regex.search(message):
+                    return kind
+        return self.default
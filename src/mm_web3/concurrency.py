@@ -0,0 +1,140 @@
+"""Adaptive per-endpoint concurrency limits."""
+
+import asyncio
+import re
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from mm_result import Result
+
+# Regular expressions over the lowercase error message that signal an overloaded endpoint. Anchored like
+# classify.BUILTIN_RULES: the status code only counts in an HTTP status context, so an address or a hash containing
+# "429" doesn't match.
+OVERLOAD_RULES = (
+    r"\b(?:http|status|status code|status_code)\W{0,3}429\b",
+    r"\btoo many requests\b",
+    r"\brate[ _-]?limit",
+    r"time(?:d)? ?out\b",  # also matches names like "ReadTimeout"
+    r"\bdeadline_exceeded\b",
+)
+
+_OVERLOAD_PATTERN = re.compile("|".join(OVERLOAD_RULES))
+
+
+def is_overload_error(res: Result[Any]) -> bool:
+    """Whether a failed Result looks like a timeout or a rate limit response. Default signal of AdaptiveLimiter."""
+    return _OVERLOAD_PATTERN.search(f"{res.error} {res.exception or ''}".lower()) is not None
+
+
+@dataclass(slots=True)
+class _Window:
+    limit: float
+    in_flight: int = 0
+    decreased_at: float = 0.0  # time.monotonic() of the last decrease
+    waiters: deque[asyncio.Future[None]] = field(default_factory=deque)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit per endpoint, like TCP congestion control.
+
+    Every endpoint starts with `initial` slots. A healthy response that arrives while the window is in full use grows
+    the limit by `increase / limit`, i.e. about `increase` per window of responses. A timeout or a rate limit error cuts
+    it to `limit * decrease`, once per window: responses to requests sent before the last cut don't cut it again.
+    Successes slower than `max_latency` hold the limit. Waiters get free slots in arrival order.
+
+    Pass it as `adaptive_limiter` to retry_with_node_and_proxy to bound in-flight requests per node; an instance is meant
+    to be shared by all calls of one event loop.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        max_latency: float | None = None,
+        is_overload: Callable[[Result[Any]], bool] = is_overload_error,
+    ) -> None:
+        """
+        Args:
+            initial: Starting limit of every endpoint.
+            min_limit: Lower bound of the limit.
+            max_limit: Upper bound of the limit.
+            increase: Additive increase per window of healthy responses.
+            decrease: Multiplicative decrease factor in (0, 1) on overload.
+            max_latency: Seconds above which a success doesn't grow the limit. No latency check when None.
+            is_overload: Decides whether a failed Result signals overload. Other failures leave the limit unchanged.
+        """
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError(f"limits must satisfy 1 <= min_limit <= initial <= max_limit: {min_limit}, {initial}, {max_limit}")
+        if increase <= 0:
+            raise ValueError(f"increase must be positive: {increase}")
+        if not 0 < decrease < 1:
+            raise ValueError(f"decrease must be in (0, 1): {decrease}")
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.max_latency = max_latency
+        self.is_overload = is_overload
+        self._windows: dict[str, _Window] = {}
+
+    def limit(self, url: str) -> int:
+        """Current number of slots of the endpoint."""
+        window = self._windows.get(url)
+        return self.initial if window is None else int(window.limit)
+
+    def in_flight(self, url: str) -> int:
+        """Number of slots of the endpoint in use."""
+        window = self._windows.get(url)
+        return 0 if window is None else window.in_flight
+
+    async def acquire(self, url: str) -> float:
+        """Wait for a free slot and take it. Returns the time.monotonic() it was taken, to pass to `release`."""
+        window = self._windows.get(url)
+        if window is None:
+            window = self._windows[url] = _Window(limit=float(self.initial))
+        if window.in_flight < int(window.limit) and not window.waiters:
+            window.in_flight += 1
+            return time.monotonic()
+
+        waiter = asyncio.get_running_loop().create_future()
+        window.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():  # the slot was handed over just before the cancellation
+                window.in_flight -= 1
+                self._wake(window)
+            else:
+                window.waiters.remove(waiter)
+            raise
+        return time.monotonic()
+
+    def release(self, url: str, acquired_at: float, res: Result[Any] | None = None) -> None:
+        """Free a slot and adapt the limit to the outcome. `res` is None when the request was abandoned."""
+        window = self._windows[url]
+        full = window.in_flight >= int(window.limit)
+        window.in_flight -= 1
+        if res is not None:
+            now = time.monotonic()
+            if res.is_ok():
+                slow = self.max_latency is not None and now - acquired_at > self.max_latency
+                if full and not slow:
+                    window.limit = min(self.max_limit, window.limit + self.increase / window.limit)
+            elif self.is_overload(res) and acquired_at >= window.decreased_at:
+                window.limit = max(self.min_limit, window.limit * self.decrease)
+                window.decreased_at = now
+        self._wake(window)
+
+    def _wake(self, window: _Window) -> None:
+        while window.waiters and window.in_flight < int(window.limit):
+            waiter = window.waiters.popleft()
+            if not waiter.done():
+                window.in_flight += 1
+                waiter.set_result(None)
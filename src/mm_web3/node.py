@@ -1,23 +1,255 @@
+import asyncio
+import contextlib
 import random
-from collections.abc import Sequence
+import threading
+from collections.abc import Awaitable, Callable, Collection, Sequence
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Self
 
-type Nodes = str | Sequence[str]
+from mm_result import Result
+
+from mm_web3.balance import Balancer
+
+type Nodes = str | Sequence[str] | NodePool
 """
 Type alias for JSON RPC node configuration.
 
 Can be either:
 - A single node URL as string
 - A sequence (list, tuple) of node URLs
+- A NodePool, which picks nodes by observed latency and error rate
 """
 
 
-def random_node(nodes: Nodes, remove_slash: bool = True) -> str:
+@dataclass(slots=True)
+class NodeStats:
+    """Observed health of a single node."""
+
+    latency: float | None = None  # EWMA of successful attempt latency in seconds, None until the first success
+    error_rate: float = 0.0  # EWMA of failures, from 0.0 (healthy) to 1.0 (always failing)
+    requests: int = 0
+    failures: int = 0
+    head: int | None = None  # latest block seen by a HeadTracker
+    lag: int | None = None  # blocks behind the best head seen by a HeadTracker
+
+
+class NodePool:
+    """Stateful set of JSON RPC nodes that favours fast and healthy ones.
+
+    Each node is weighted by `health / latency`, where latency and error rate are exponentially
+    weighted moving averages of reported attempts. Only successful attempts count towards latency,
+    so a node that fails fast (e.g. connection refused) is not mistaken for a fast one. Nodes without
+    successful observations are scored with the best known latency, so they get explored. Health never
+    drops below `min_health`, so a recovered node eventually wins traffic back.
+
+    Disabled nodes (e.g. out of sync ones, see HeadTracker) are not picked while any enabled node remains.
+    With a `balancer`, it picks among the enabled nodes instead of the weighted choice.
+
+    A pool is accepted anywhere `Nodes` is. The retry helpers report every attempt back via `record`,
+    which may be called from several threads at once.
+    """
+
+    def __init__(
+        self, nodes: str | Sequence[str], alpha: float = 0.2, min_health: float = 0.05, balancer: Balancer | None = None
+    ) -> None:
+        """
+        Args:
+            nodes: Single node URL or sequence of node URLs. Trailing slashes are removed.
+            alpha: EWMA smoothing factor in (0, 1]; higher values react faster to recent attempts.
+            min_health: Lower bound of the health factor for failing nodes.
+            balancer: Selection strategy replacing the weighted choice.
+
+        Raises:
+            ValueError: When no nodes are provided or parameters are out of range
+        """
+        urls = [nodes] if isinstance(nodes, str) else list(nodes)
+        urls = list(dict.fromkeys(url.removesuffix("/") for url in urls))
+        if not urls:
+            raise ValueError("No nodes provided")
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1]: {alpha}")
+        if not 0 < min_health <= 1:
+            raise ValueError(f"min_health must be in (0, 1]: {min_health}")
+
+        self.urls: tuple[str, ...] = tuple(urls)
+        self.alpha = alpha
+        self.min_health = min_health
+        self.balancer = balancer
+        self._stats = {url: NodeStats() for url in urls}
+        self._disabled: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __contains__(self, url: object) -> bool:
+        return url in self._stats
+
+    @property
+    def enabled_urls(self) -> tuple[str, ...]:
+        """Nodes available for selection: enabled ones, or all of them if every node is disabled."""
+        if not self._disabled:
+            return self.urls
+        return tuple(url for url in self.urls if url not in self._disabled) or self.urls
+
+    def disable(self, url: str) -> None:
+        """Exclude the node from selection."""
+        if url in self._stats:
+            self._disabled.add(url)
+
+    def enable(self, url: str) -> None:
+        """Return a disabled node to selection."""
+        self._disabled.discard(url)
+
+    def stats(self, url: str) -> NodeStats:
+        """Return observed stats of the node."""
+        return self._stats[url]
+
+    def weight(self, url: str) -> float:
+        """Return the selection weight of the node."""
+        stats = self._stats[url]
+        latency = stats.latency if stats.latency is not None else self._default_latency()
+        health = max(1.0 - stats.error_rate, self.min_health)
+        return health / max(latency, 0.001)
+
+    def pick(self, exclude: Collection[str] = (), key: str | None = None) -> str:
+        """Pick a node randomly, weighted by its score, or with the pool's balancer.
+
+        Args:
+            exclude: Nodes to skip. Ignored when it covers all enabled nodes.
+            key: Affinity key passed to the balancer.
+        """
+        enabled = self.enabled_urls
+        candidates = [url for url in enabled if url not in exclude] or list(enabled)
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.balancer is not None:
+            return self.balancer.choose(candidates, key)
+        return random.choices(candidates, weights=[self.weight(url) for url in candidates])[0]
+
+    def record(self, url: str, latency: float, ok: bool) -> None:
+        """Record the outcome of an attempt made against the node. Unknown URLs are ignored.
+
+        The latency of a failed attempt is ignored, it says nothing about how fast the node serves requests.
+        """
+        with self._lock:
+            stats = self._stats.get(url.removesuffix("/"))
+            if stats is None:
+                return
+            stats.requests += 1
+            if not ok:
+                stats.failures += 1
+            stats.error_rate += self.alpha * ((0.0 if ok else 1.0) - stats.error_rate)
+            if ok:
+                stats.latency = latency if stats.latency is None else stats.latency + self.alpha * (latency - stats.latency)
+
+    def _default_latency(self) -> float:
+        known = [s.latency for s in self._stats.values() if s.latency is not None]
+        return min(known) if known else 1.0
+
+
+class HeadTracker:
+    """Background tracker of the latest block of every node in a NodePool.
+
+    Every `interval` seconds it calls `probe` for all nodes concurrently, stores each node's head and lag behind
+    the best head in its NodeStats, and disables nodes more than `max_lag` blocks behind, so retry helpers stop
+    picking them. Nodes are enabled again once they catch up. A failed probe (an error, a timeout or an exception)
+    leaves the node's state unchanged.
+
+        async with HeadTracker(pool, get_block_number, interval=10, max_lag=5):
+            ...  # retry_with_node_and_proxy(..., pool, ...) skips out-of-sync nodes
+    """
+
+    def __init__(
+        self,
+        pool: NodePool,
+        probe: Callable[[str], Awaitable[Result[int]]],
+        interval: float = 10,
+        max_lag: int = 5,
+        timeout: float | None = None,
+    ) -> None:
+        """
+        Args:
+            pool: Nodes to track.
+            probe: Async function that returns the latest block number of the given node.
+            interval: Seconds between polls.
+            max_lag: Maximum allowed number of blocks behind the best head.
+            timeout: Probe timeout in seconds, `interval` by default.
+        """
+        if interval <= 0:
+            raise ValueError(f"interval must be positive: {interval}")
+        if max_lag < 0:
+            raise ValueError(f"max_lag must be non-negative: {max_lag}")
+        self.pool = pool
+        self.probe = probe
+        self.interval = interval
+        self.max_lag = max_lag
+        self.timeout = timeout if timeout is not None else interval
+        self._task: asyncio.Task[None] | None = None
+
+    async def poll(self) -> None:
+        """Probe all nodes once and update their lag and selection state."""
+        results = await asyncio.gather(*(self._probe(url) for url in self.pool.urls))
+        heads = {url: head for url, head in zip(self.pool.urls, results, strict=True) if head is not None}
+        if not heads:
+            return
+        best = max(heads.values())
+        for url, head in heads.items():
+            stats = self.pool.stats(url)
+            stats.head = head
+            stats.lag = best - head
+            if stats.lag > self.max_lag:
+                self.pool.disable(url)
+            else:
+                self.pool.enable(url)
+
+    def start(self) -> None:
+        """Start polling in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop background polling."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def __aenter__(self) -> Self:
+        await self.poll()
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        await self.stop()
+
+    async def _run(self) -> None:
+        while True:
+            await self.poll()
+            await asyncio.sleep(self.interval)
+
+    async def _probe(self, url: str) -> int | None:
+        try:
+            async with asyncio.timeout(self.timeout):
+                res = await self.probe(url)
+        except Exception:
+            return None  # a broken probe must not stop tracking the other nodes
+        return res.unwrap() if res.is_ok() else None
+
+
+def random_node(nodes: Nodes, remove_slash: bool = True, balancer: Balancer | None = None, key: str | None = None) -> str:
     """
     Select a random JSON RPC node from the provided nodes.
 
+    A NodePool picks by its latency and health scores, sequences are sampled uniformly.
+
     Args:
-        nodes: Single node URL or sequence of node URLs
+        nodes: Single node URL, sequence of node URLs or a NodePool
         remove_slash: Whether to remove trailing slash from the URL
+        balancer: Selection strategy used instead of the default one, for a NodePool among its enabled nodes
+        key: Affinity key passed to the balancer
 
     Returns:
         Selected node URL
@@ -27,10 +259,12 @@ def random_node(nodes: Nodes, remove_slash: bool = True) -> str:
     """
     if isinstance(nodes, str):
         selected = nodes
+    elif isinstance(nodes, NodePool):
+        selected = balancer.choose(nodes.enabled_urls, key) if balancer is not None else nodes.pick(key=key)
     else:
         if not nodes:
             raise ValueError("No nodes provided")
-        selected = random.choice(nodes)
+        selected = balancer.choose(nodes, key) if balancer is not None else random.choice(nodes)
 
     if remove_slash and selected.endswith("/"):
         selected = selected.removesuffix("/")
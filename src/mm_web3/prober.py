@@ -0,0 +1,153 @@
+"""Background health probing of proxies."""
+
+import asyncio
+import contextlib
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Self
+from urllib.parse import urlparse
+
+from mm_http import http_request
+
+from mm_web3.proxy import ProxyPool, fetch_proxies, is_valid_proxy_url
+
+
+@dataclass(frozen=True, slots=True)
+class ProxyCheck:
+    """Outcome of probing one proxy."""
+
+    proxy: str
+    ok: bool
+    connect_latency: float | None  # seconds to open a TCP connection to the proxy
+    response_time: float | None  # seconds of the whole probe request through the proxy, on a connection of its own
+    error: str | None = None
+
+
+class ProxyProber:
+    """Background health prober that keeps a ranked set of live proxies.
+
+    Every `interval` seconds it checks all proxies concurrently, at most `concurrency` at a time. A check opens a TCP
+    connection to the proxy (connect latency) and then requests `probe_url` through it (response time, until the whole
+    response is read). Proxies that pass are published in `live`, fastest first, so requests are never routed
+    through a proxy already known to be dead. When given a ProxyPool, outcomes are also recorded in it.
+
+    Route requests through the pool rather than through `live`: `live` is empty when every check failed, and an empty
+    sequence of proxies means no proxy at all, while a pool keeps using its soonest released proxy.
+
+        pool = ProxyPool(proxies)
+        async with ProxyProber(pool, "https://example.com/ping", interval=60):
+            ...  # retry_with_proxy(..., pool, ...)
+    """
+
+    def __init__(
+        self,
+        proxies: Sequence[str] | ProxyPool,
+        probe_url: str,
+        *,
+        proxies_url: str | None = None,
+        concurrency: int = 500,
+        timeout: float = 5,
+        interval: float = 300,
+    ) -> None:
+        """
+        Args:
+            proxies: Proxies to check. A ProxyPool also receives every check outcome.
+            probe_url: URL requested through each proxy.
+            proxies_url: If set, the proxy list is re-fetched from it with fetch_proxies before every poll.
+                The previous list is kept when the fetch fails.
+            concurrency: Maximum number of simultaneous checks.
+            timeout: Timeout in seconds for each phase of a check.
+            interval: Seconds between polls.
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1: {concurrency}")
+        if interval <= 0:
+            raise ValueError(f"interval must be positive: {interval}")
+        self.pool = proxies if isinstance(proxies, ProxyPool) else None
+        self.proxies = list(proxies.urls if isinstance(proxies, ProxyPool) else dict.fromkeys(proxies))
+        self.probe_url = probe_url
+        self.proxies_url = proxies_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.interval = interval
+        self.live: list[str] = []
+        self.checks: dict[str, ProxyCheck] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    async def poll(self) -> list[str]:
+        """Check all proxies once and publish the live ones. Returns the new live list."""
+        if self.proxies_url is not None:
+            res = await fetch_proxies(self.proxies_url, timeout=self.timeout)
+            if res.is_ok():
+                self.proxies = res.unwrap()
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(proxy: str) -> ProxyCheck:
+            async with semaphore:
+                return await self.check(proxy)
+
+        checks = await asyncio.gather(*(bounded(proxy) for proxy in self.proxies))
+        if self.pool is not None:
+            for check in checks:
+                self.pool.record(check.proxy, check.ok)
+        self.checks = {check.proxy: check for check in checks}
+        self.live = [check.proxy for check in sorted((c for c in checks if c.ok), key=lambda c: c.response_time or 0.0)]
+        return self.live
+
+    async def check(self, proxy: str) -> ProxyCheck:
+        """Check a single proxy."""
+        if not is_valid_proxy_url(proxy):
+            return ProxyCheck(proxy, ok=False, connect_latency=None, response_time=None, error="invalid proxy url")
+
+        parsed = urlparse(proxy)
+        started_at = time.monotonic()
+        try:
+            async with asyncio.timeout(self.timeout):
+                _, writer = await asyncio.open_connection(parsed.hostname, parsed.port)
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+        except (OSError, TimeoutError) as e:
+            return ProxyCheck(proxy, ok=False, connect_latency=None, response_time=None, error=f"connect: {e!r}")
+        connect_latency = time.monotonic() - started_at
+
+        started_at = time.monotonic()
+        res = await http_request(self.probe_url, proxy=proxy, timeout=self.timeout)
+        response_time = time.monotonic() - started_at
+        error = str(res.to_result_err().error) if res.is_err() else None
+        return ProxyCheck(proxy, ok=error is None, connect_latency=connect_latency, response_time=response_time, error=error)
+
+    @property
+    def running(self) -> bool:
+        """Whether background polling is active."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start polling in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop background polling."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def __aenter__(self) -> Self:
+        await self.poll()
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        await self.stop()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            with contextlib.suppress(Exception):  # a failed cycle keeps the previous live list and must not stop polling
+                await self.poll()
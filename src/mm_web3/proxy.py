@@ -1,27 +1,194 @@
 """Proxy utilities for HTTP requests."""
 
+import hashlib
+import heapq
+import json
+import os
 import random
-from collections.abc import Sequence
+import threading
+import time
+from collections.abc import Collection, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
 from urllib.parse import urlparse
 
-from mm_http import http_request, http_request_sync
+from mm_http import HttpResponse, http_request, http_request_sync
 from mm_result import Result
 
-type Proxies = str | Sequence[str] | None
-"""Proxy configuration: single URL, sequence of URLs, or None for no proxy."""
+from mm_web3.balance import Balancer
 
+type Proxies = str | Sequence[str] | ProxyPool | None
+"""Proxy configuration: single URL, sequence of URLs, a ProxyPool, or None for no proxy."""
 
-def random_proxy(proxies: Proxies) -> str | None:
-    """Select a random proxy from the given configuration."""
+
+_PICK_DRAWS = 8  # random draws before ProxyPool.pick filters the active list
+
+
+@dataclass(slots=True)
+class _ProxyState:
+    failures: int = 0  # consecutive failures
+    strikes: int = 0  # quarantines in a row without a success in between
+    quarantined_until: float | None = None  # time.monotonic() based
+
+
+class ProxyPool:
+    """Set of proxies that quarantines failing ones and reinstates them after a cooldown.
+
+    A proxy is quarantined after `failure_threshold` consecutive failures. The cooldown doubles with every
+    quarantine in a row (up to `max_cooldown`) and resets after a success. The active set supports O(1) picks
+    and removals. If every proxy is quarantined, the one that is released soonest is picked, so requests never
+    silently go out without a proxy. State changes are guarded by a lock, so a pool can be shared between threads.
+
+    A pool is accepted anywhere `Proxies` is. The retry helpers report every attempt back via `record`.
+    """
+
+    def __init__(
+        self,
+        proxies: Sequence[str],
+        failure_threshold: int = 3,
+        cooldown: float = 30,
+        max_cooldown: float = 600,
+        balancer: Balancer | None = None,
+    ) -> None:
+        """
+        Args:
+            proxies: Proxy URLs. Duplicates are removed.
+            failure_threshold: Consecutive failures that put a proxy into quarantine.
+            cooldown: First quarantine duration in seconds.
+            max_cooldown: Upper bound of the quarantine duration in seconds.
+            balancer: Selection strategy among active proxies, uniform random when None.
+
+        Raises:
+            ValueError: When no proxies are provided or parameters are out of range
+        """
+        urls = list(dict.fromkeys(proxies))
+        if not urls:
+            raise ValueError("No proxies provided")
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold must be at least 1: {failure_threshold}")
+        if cooldown <= 0 or max_cooldown < cooldown:
+            raise ValueError(f"invalid cooldown range: {cooldown}..{max_cooldown}")
+        self.urls: tuple[str, ...] = tuple(urls)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.balancer = balancer
+        self._states = {url: _ProxyState() for url in urls}
+        self._active = list(urls)
+        self._active_index = {url: i for i, url in enumerate(urls)}
+        self._releases: list[tuple[float, str]] = []  # heap of quarantine ends
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __contains__(self, url: object) -> bool:
+        return url in self._states
+
+    @property
+    def active(self) -> list[str]:
+        """Proxies that are not quarantined."""
+        with self._lock:
+            self._release_expired()
+            return list(self._active)
+
+    @property
+    def quarantined(self) -> list[str]:
+        """Proxies in quarantine."""
+        with self._lock:
+            self._release_expired()
+            return [url for url in self.urls if url not in self._active_index]
+
+    def candidates(self) -> list[str]:
+        """Proxies to pick from: the active ones, or the soonest released one if all are quarantined."""
+        with self._lock:
+            active = self.active
+            if active:
+                return active
+            return [self._releases[0][1]]
+
+    def pick(self, exclude: Collection[str] = (), key: str | None = None) -> str:
+        """Pick a random active proxy, or one chosen by the pool's balancer.
+
+        Without a balancer, a small `exclude` is handled by drawing again, so a pick stays O(1) on average however
+        many proxies are active.
+
+        Args:
+            exclude: Proxies to skip. Ignored when it covers all active proxies.
+            key: Affinity key passed to the balancer.
+        """
+        with self._lock:
+            self._release_expired()
+            if not self._active:
+                return self._releases[0][1]
+            if self.balancer is None:
+                for _ in range(_PICK_DRAWS):
+                    url = random.choice(self._active)
+                    if url not in exclude:
+                        return url
+            candidates = [url for url in self._active if url not in exclude] if exclude else self._active
+            candidates = candidates or self._active
+            if self.balancer is not None:
+                return self.balancer.choose(list(candidates), key)
+            return random.choice(candidates)
+
+    def record(self, url: str, ok: bool) -> None:
+        """Record the outcome of a request made through the proxy. Unknown URLs are ignored."""
+        with self._lock:
+            state = self._states.get(url)
+            if state is None:
+                return
+            if ok:
+                state.failures = 0
+                state.strikes = 0
+                return
+            state.failures += 1
+            if state.failures >= self.failure_threshold and url in self._active_index:
+                duration = min(self.max_cooldown, self.cooldown * 2**state.strikes)
+                state.strikes += 1
+                state.failures = 0
+                state.quarantined_until = time.monotonic() + duration
+                heapq.heappush(self._releases, (state.quarantined_until, url))
+                self._deactivate(url)
+
+    def _release_expired(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            while self._releases and self._releases[0][0] <= now:
+                until, url = heapq.heappop(self._releases)
+                state = self._states[url]
+                if state.quarantined_until == until:
+                    state.quarantined_until = None
+                    self._active_index[url] = len(self._active)
+                    self._active.append(url)
+
+    def _deactivate(self, url: str) -> None:
+        """Remove from the active list in O(1) by moving the last element into its slot."""
+        index = self._active_index.pop(url)
+        last = self._active.pop()
+        if index < len(self._active):
+            self._active[index] = last
+            self._active_index[last] = index
+
+
+def random_proxy(proxies: Proxies, balancer: Balancer | None = None, key: str | None = None) -> str | None:
+    """Select a random proxy from the given configuration. A ProxyPool picks among its active proxies.
+
+    A `balancer` replaces the uniform choice (for a ProxyPool, among its candidates); `key` is passed to it.
+    """
     if proxies is None:
         return None
 
     if isinstance(proxies, str):
         return proxies
 
+    if isinstance(proxies, ProxyPool):
+        return balancer.choose(proxies.candidates(), key) if balancer is not None else proxies.pick(key=key)
+
     # proxies is a Sequence[str] at this point
     if proxies:
-        return random.choice(proxies)
+        return balancer.choose(proxies, key) if balancer is not None else random.choice(proxies)
 
     return None
 
@@ -29,23 +196,115 @@ def random_proxy(proxies: Proxies) -> str | None:
 async def fetch_proxies(proxies_url: str, timeout: float = 5) -> Result[list[str]]:
     """Fetch proxies from the given url. Expects content-type: text/plain with one proxy per line. Each proxy must be valid."""
     res = await http_request(proxies_url, timeout=timeout)
-    if res.is_err():
-        return res.to_result_err()
-
-    proxies = [p.strip() for p in (res.body or "").splitlines() if p.strip()]
-    proxies = list(dict.fromkeys(proxies))
-    for proxy in proxies:
-        if not is_valid_proxy_url(proxy):
-            return res.to_result_err(f"Invalid proxy URL: {proxy}")
-
-    if not proxies:
-        return res.to_result_err("No valid proxies found")
-    return res.to_result_ok(proxies)
+    return _proxies_from_response(res)
 
 
 def fetch_proxies_sync(proxies_url: str, timeout: float = 5) -> Result[list[str]]:
     """Synchronous version of fetch_proxies."""
     res = http_request_sync(proxies_url, timeout=timeout)
+    return _proxies_from_response(res)
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    url: str
+    proxies: list[str]
+    fetched_at: float  # time.time() of the last successful fetch or revalidation
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class ProxyListCache:
+    """On-disk cache of proxy lists, one JSON file per source URL.
+
+    A list younger than `ttl` seconds is returned without a request. An older one is revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged list costs a 304 instead of a full download. If the
+    source is down or returns an invalid list, the last good copy is returned (the context has `cache: stale`
+    and the `error`). A source that has never been fetched successfully returns the error.
+    """
+
+    def __init__(self, directory: str | Path, ttl: float = 3600) -> None:
+        self.directory = Path(directory).expanduser()
+        self.ttl = ttl
+
+    def fetch_sync(self, proxies_url: str, timeout: float = 5) -> Result[list[str]]:
+        """Fetch a proxy list, using and updating the cache. The context has `cache`: fresh, revalidated, stale or miss."""
+        entry = self._load(proxies_url)
+        if entry is not None and time.time() - entry.fetched_at < self.ttl:
+            return Result.ok(entry.proxies, {"cache": "fresh"})
+
+        headers: dict[str, str] = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        res = http_request_sync(proxies_url, headers=headers, timeout=timeout)
+
+        if entry is not None and res.status_code == 304:
+            entry.fetched_at = time.time()
+            self._save(entry)
+            return Result.ok(entry.proxies, {"cache": "revalidated"})
+
+        result = _proxies_from_response(res)
+        if result.is_err():
+            if entry is not None:
+                return Result.ok(entry.proxies, {"cache": "stale", "error": result.unwrap_err()})
+            return result
+
+        response_headers = {k.lower(): v for k, v in (res.headers or {}).items()}
+        entry = _CacheEntry(
+            url=proxies_url,
+            proxies=result.unwrap(),
+            fetched_at=time.time(),
+            etag=response_headers.get("etag"),
+            last_modified=response_headers.get("last-modified"),
+        )
+        self._save(entry)
+        return Result.ok(entry.proxies, {"cache": "miss"})
+
+    def _path(self, proxies_url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(proxies_url.encode()).hexdigest()[:32]}.json"
+
+    def _load(self, proxies_url: str) -> _CacheEntry | None:
+        try:
+            entry = _CacheEntry(**json.loads(self._path(proxies_url).read_text()))
+        except OSError, ValueError, TypeError:
+            return None
+        return entry if entry.url == proxies_url else None
+
+    def _save(self, entry: _CacheEntry) -> None:
+        """Write atomically, so a concurrent reader never sees a partial file. Cache write errors are ignored."""
+        path = self._path(entry.url)
+        tmp = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(asdict(entry)))
+            tmp.replace(path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+
+def fetch_proxy_lists_sync(
+    proxies_urls: Sequence[str], timeout: float = 5, cache: ProxyListCache | None = None
+) -> list[Result[list[str]]]:
+    """Fetch several proxy lists concurrently in threads. Results are in the order of `proxies_urls`.
+
+    With a cache, each list is fetched through ProxyListCache.fetch_sync.
+    """
+    if not proxies_urls:
+        return []
+
+    def fetch(url: str) -> Result[list[str]]:
+        if cache is not None:
+            return cache.fetch_sync(url, timeout=timeout)
+        return fetch_proxies_sync(url, timeout=timeout)
+
+    with ThreadPoolExecutor(max_workers=len(proxies_urls)) as executor:
+        return list(executor.map(fetch, proxies_urls))
+
+
+def _proxies_from_response(res: HttpResponse) -> Result[list[str]]:
+    """Parse and validate a text/plain proxy list response."""
     if res.is_err():
         return res.to_result_err()
 
@@ -0,0 +1,115 @@
+"""Token-bucket rate limiting for node and proxy endpoints."""
+
+import asyncio
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """Allowed request rate of an endpoint."""
+
+    rps: float  # sustained requests per second
+    burst: int = 1  # bucket capacity: requests allowed back to back after an idle period
+
+    def __post_init__(self) -> None:
+        if self.rps <= 0:
+            raise ValueError(f"rps must be positive: {self.rps}")
+        if self.burst < 1:
+            raise ValueError(f"burst must be at least 1: {self.burst}")
+
+
+class _Bucket:
+    __slots__ = ("limit", "tokens", "updated_at")
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+        self.tokens = float(limit.burst)
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token, possibly going into debt. Return the seconds to wait until the token is actually available."""
+        now = time.monotonic()
+        self.tokens = min(self.limit.burst, self.tokens + (now - self.updated_at) * self.limit.rps)
+        self.updated_at = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.limit.rps)
+
+
+class RateLimiter:
+    """Registry of token buckets keyed by endpoint URL (node or proxy).
+
+    Retry helpers await a token for the node and the proxy of every attempt before calling `func`.
+    Waiters are served in arrival order. Endpoints without a configured limit and no default are not limited.
+    Buckets are guarded by a lock, so one limiter can serve async tasks and threads (see `acquire_sync`) at once.
+    """
+
+    def __init__(self, default: RateLimit | None = None, limits: Mapping[str, RateLimit] | None = None) -> None:
+        """
+        Args:
+            default: Limit applied to every endpoint without its own limit. No limit when None.
+            limits: Per-endpoint limits keyed by node or proxy URL.
+        """
+        self.default = default
+        self._limits: dict[str, RateLimit] = dict(limits or {})
+        self._buckets: dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def set_limit(self, url: str, limit: RateLimit | None) -> None:
+        """Set the endpoint's limit, or remove it (falling back to the default) when limit is None."""
+        with self._lock:
+            if limit is None:
+                self._limits.pop(url, None)
+            else:
+                self._limits[url] = limit
+            self._buckets.pop(url, None)
+
+    def limit(self, url: str) -> RateLimit | None:
+        """Return the limit that applies to the endpoint."""
+        return self._limits.get(url, self.default)
+
+    def try_acquire(self, url: str) -> bool:
+        """Take a token if one is available right now, without waiting."""
+        with self._lock:
+            bucket = self._bucket(url)
+            if bucket is None:
+                return True
+            if bucket.reserve() > 0:
+                bucket.tokens += 1  # give the reservation back
+                return False
+            return True
+
+    async def acquire(self, url: str) -> float:
+        """Wait until a token is available and take it. Return the seconds waited."""
+        bucket, wait = self._reserve(url)
+        if bucket is not None and wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                with self._lock:
+                    bucket.tokens += 1  # the reserved token was not used
+                raise
+        return wait
+
+    def acquire_sync(self, url: str) -> float:
+        """Blocking version of acquire, for threads."""
+        _, wait = self._reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _reserve(self, url: str) -> tuple[_Bucket | None, float]:
+        with self._lock:
+            bucket = self._bucket(url)
+            return bucket, bucket.reserve() if bucket is not None else 0.0
+
+    def _bucket(self, url: str) -> _Bucket | None:
+        bucket = self._buckets.get(url)
+        if bucket is None:
+            limit = self.limit(url)
+            if limit is None:
+                return None
+            bucket = self._buckets[url] = _Bucket(limit)
+        return bucket
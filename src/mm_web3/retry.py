@@ -1,10 +1,29 @@
-from collections.abc import Awaitable, Callable
-from typing import TypeVar
+import asyncio
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import StrEnum, unique
+from itertools import islice
+from typing import Any, NamedTuple, TypedDict, TypeVar, Unpack
 
 from mm_result import Result
 
-from mm_web3.node import Nodes, random_node
-from mm_web3.proxy import Proxies, random_proxy
+from mm_web3.backoff import Backoff
+from mm_web3.balance import Balancer
+from mm_web3.budget import RetryBudget
+from mm_web3.circuit import CircuitBreakers
+from mm_web3.classify import ErrorClassifier, ErrorKind
+from mm_web3.concurrency import AdaptiveLimiter
+from mm_web3.node import NodePool, Nodes
+from mm_web3.proxy import Proxies, ProxyPool
+from mm_web3.ratelimit import RateLimiter
 
 T = TypeVar("T")
 
@@ -14,55 +33,1060 @@ FuncWithNodeAndProxy = Callable[[str, str | None], Awaitable[Result[T]]]
 # Function that takes only (proxy) and returns an Awaitable[Result[T]]
 FuncWithProxy = Callable[[str | None], Awaitable[Result[T]]]
 
+# Function that takes (item, node, proxy) and returns an Awaitable[Result[T]], used by the bulk helpers
+type FuncWithItem[ItemT, T] = Callable[[ItemT, str, str | None], Awaitable[Result[T]]]
 
-async def retry_with_node_and_proxy[T](retries: int, nodes: Nodes, proxies: Proxies, func: FuncWithNodeAndProxy[T]) -> Result[T]:
+# Sync counterparts of the function types above, used by the *_sync helpers
+SyncFuncWithNodeAndProxy = Callable[[str, str | None], Result[T]]
+SyncFuncWithProxy = Callable[[str | None], Result[T]]
+type SyncFuncWithItem[ItemT, T] = Callable[[ItemT, str, str | None], Result[T]]
+
+# In-flight hedged attempts: task -> (attempt number, node, proxy, start time)
+type _Pending[T] = dict[asyncio.Task[tuple[Result[T], ErrorKind | None]], tuple[int, str, str | None, float]]
+
+# Error returned without calling func when every node or every proxy has an open circuit breaker
+CIRCUIT_OPEN_ERROR = "circuit_open"
+
+# Error returned when the call's deadline passes before an attempt succeeds
+DEADLINE_EXCEEDED_ERROR = "deadline_exceeded"
+
+# Error returned instead of retrying when the shared RetryBudget is spent
+RETRY_BUDGET_ERROR = "retry_budget_exhausted"
+
+
+class Hedge:
+    """Hedging policy for retry_with_node_and_proxy.
+
+    If an attempt hasn't finished within the hedge delay, a backup attempt starts on a different node/proxy pair.
+    The delay is either fixed, or a percentile of the latencies observed by this policy once it has enough samples.
+    Only successful attempts are observed, so fast errors don't pull the delay down.
+    A single Hedge instance is meant to be shared between calls, so the percentile reflects recent traffic.
+    """
+
+    def __init__(self, delay: float = 1.0, percentile: float | None = None, max_in_flight: int = 2, window: int = 200) -> None:
+        """
+        Args:
+            delay: Hedge delay in seconds. Used until enough latencies are observed when `percentile` is set.
+            percentile: Percentile (1-99) of observed latencies to use as the hedge delay, e.g. 95.
+            max_in_flight: Maximum number of concurrent attempts per call.
+            window: Number of most recent latencies to keep.
+        """
+        if delay < 0:
+            raise ValueError(f"delay must be non-negative: {delay}")
+        if percentile is not None and not 1 <= percentile <= 99:
+            raise ValueError(f"percentile must be in [1, 99]: {percentile}")
+        if max_in_flight < 2:
+            raise ValueError(f"max_in_flight must be at least 2: {max_in_flight}")
+        self.fixed_delay = delay
+        self.percentile = percentile
+        self.max_in_flight = max_in_flight
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    @property
+    def delay(self) -> float:
+        """Current hedge delay in seconds."""
+        if self.percentile is None or len(self._latencies) < 20:
+            return self.fixed_delay
+        return statistics.quantiles(self._latencies, n=100)[round(self.percentile) - 1]
+
+    def observe(self, latency: float) -> None:
+        """Record the latency of a successful attempt."""
+        self._latencies.append(latency)
+
+
+@unique
+class RetryLogMode(StrEnum):
+    """What the retry helpers put into the `retry_logs` context of their result."""
+
+    FULL = "full"  # a dict per attempt with node, proxy and the attempt's Result.to_dict()
+    FAILURES = "failures"  # like FULL, but successful attempts are skipped
+    COMPACT = "compact"  # an AttemptLog per attempt, without serializing results
+    OFF = "off"  # no `retry_logs` key at all
+
+
+class AttemptLog(NamedTuple):
+    """Compact retry_logs entry of one attempt, see RetryLogMode.COMPACT."""
+
+    attempt: int
+    node: str | None  # None for proxy-only calls
+    proxy: str | None
+    elapsed: float  # seconds, including waits for rate limiter tokens and limiter slots
+    error: str | None  # None for a successful attempt, "cancelled" for a hedge that lost
+    kind: ErrorKind | None  # classifier verdict for a failed attempt
+
+
+class SyncRetryOptions(TypedDict, total=False):
+    """Keyword options of retry_with_node_and_proxy_sync, passed through by retry_map_sync."""
+
+    breakers: CircuitBreakers | None
+    backoff: Backoff | None
+    deadline: float | None
+    rate_limiter: RateLimiter | None
+    classifier: ErrorClassifier | None
+    balancer: Balancer | None
+    balance_key: str | None
+    budget: RetryBudget | None
+    log_mode: RetryLogMode
+
+
+class RetryOptions(SyncRetryOptions, total=False):
+    """Keyword options of retry_with_node_and_proxy, passed through by the bulk helpers."""
+
+    hedge: Hedge | None
+    adaptive_limiter: AdaptiveLimiter | None
+
+
+async def retry_with_node_and_proxy[T](
+    retries: int,
+    nodes: Nodes,
+    proxies: Proxies,
+    func: FuncWithNodeAndProxy[T],
+    *,
+    hedge: Hedge | None = None,
+    adaptive_limiter: AdaptiveLimiter | None = None,
+    breakers: CircuitBreakers | None = None,
+    backoff: Backoff | None = None,
+    deadline: float | None = None,
+    rate_limiter: RateLimiter | None = None,
+    classifier: ErrorClassifier | None = None,
+    balancer: Balancer | None = None,
+    balance_key: str | None = None,
+    budget: RetryBudget | None = None,
+    log_mode: RetryLogMode = RetryLogMode.FULL,
+) -> Result[T]:
     """
     Retry the given function multiple times with random node and proxy on each attempt.
 
+    Nodes and proxies are drawn without replacement: each attempt uses ones not tried yet by this call,
+    and once all were tried a new round starts that never repeats the endpoint used by the previous attempt.
+    When `nodes` is a NodePool or `proxies` is a ProxyPool, the outcome of every attempt is recorded in it.
+
     Args:
         retries: Number of attempts to make.
         nodes: Available nodes to randomly choose from.
         proxies: Available proxies to randomly choose from.
         func: Async function that accepts (node, proxy) and returns a Result.
+        hedge: Run a backup attempt on another node/proxy pair when an attempt is slower than the hedge delay.
+            The first ok result wins and the other attempts are cancelled. Hedges count towards `retries`.
+        adaptive_limiter: Every attempt waits for a slot of its node, the limit adapts to timeouts and 429s.
+        breakers: Circuit breakers consulted before each attempt and updated with its outcome, for both node and proxy.
+            Endpoints with an open breaker are skipped. If all nodes or all proxies are open, no attempt is made.
+        backoff: Delay policy between sequential attempts. No delay when None. Not used in hedged mode.
+        deadline: Time budget for the whole call in seconds. An attempt still running at the deadline is cancelled.
+            `func` can read the time left with `remaining_time()` to shrink its own timeout.
+        rate_limiter: Every attempt awaits a token for its node and its proxy before calling `func`.
+        classifier: Classifies failed attempts. Fatal errors stop the call at once (the context gets `error_kind`),
+            switch-node errors keep the failed node out of the remaining attempts. Without a classifier
+            every error is retried.
+        balancer: Selection strategy for nodes and proxies among the remaining candidates of each attempt, overriding
+            a pool's own balancer. Attempts are reported to it (in-flight counts, latencies), as they are to a pool's.
+        balance_key: Affinity key passed to the balancer, e.g. an address for ConsistentHashBalancer.
+        budget: Shared retry budget. The first attempt is deposited, every further attempt (including hedges) needs
+            budget. When it is spent the call fails with RETRY_BUDGET_ERROR (in hedged mode, no more hedges start).
+        log_mode: Form of the `retry_logs` context: full dicts (default), failed attempts only, AttemptLog tuples, or none.
 
     Returns:
         Result with success on first successful call, or last failure with logs of attempts.
+        In hedged mode, logs entries carry the attempt number and the context has `retry_winner`.
     """
-    res: Result[T] = Result.err("not_started")
-    logs = []
+    options = _Options(
+        breakers=breakers,
+        backoff=backoff,
+        deadline_at=_deadline_at(deadline),
+        rate_limiter=rate_limiter,
+        classifier=classifier,
+        balancer=balancer,
+        balance_key=balance_key,
+        budget=budget,
+        log_mode=log_mode,
+        adaptive_limiter=adaptive_limiter,
+        node_limits=_current_node_limits.get(),
+    )
+    with _call_scope(options.deadline_at):
+        if hedge is not None:
+            return await _retry_hedged(retries, nodes, proxies, func, hedge, options)
+        return await _retry(retries, nodes, proxies, func, options)
 
-    for _ in range(retries):
-        node = random_node(nodes)
-        proxy = random_proxy(proxies)
-        res = await func(node, proxy)
-        logs.append({"node": node, "proxy": proxy, "result": res.to_dict()})
-        if res.is_ok():
-            return Result.ok(res.unwrap(), {"retry_logs": logs})
 
-    return Result.err(res.unwrap_err(), {"retry_logs": logs})
-
-
-async def retry_with_proxy[T](retries: int, proxies: Proxies, func: FuncWithProxy[T]) -> Result[T]:
+async def retry_with_proxy[T](
+    retries: int,
+    proxies: Proxies,
+    func: FuncWithProxy[T],
+    *,
+    breakers: CircuitBreakers | None = None,
+    backoff: Backoff | None = None,
+    deadline: float | None = None,
+    rate_limiter: RateLimiter | None = None,
+    classifier: ErrorClassifier | None = None,
+    balancer: Balancer | None = None,
+    balance_key: str | None = None,
+    budget: RetryBudget | None = None,
+    log_mode: RetryLogMode = RetryLogMode.FULL,
+) -> Result[T]:
     """
     Retry the given function multiple times using a random proxy on each attempt.
 
+    Proxies are drawn without replacement, the same way as in retry_with_node_and_proxy.
+    When `proxies` is a ProxyPool, the outcome of every attempt is recorded in it.
 
     Args:
         retries: Number of attempts to make.
         proxies: Available proxies to randomly choose from.
         func: Async function that accepts (proxy) and returns a Result.
+        breakers: Circuit breakers consulted before each attempt and updated with its outcome.
+            Proxies with an open breaker are skipped. If all proxies are open, no attempt is made.
+        backoff: Delay policy between attempts. No delay when None.
+        deadline: Time budget for the whole call in seconds. An attempt still running at the deadline is cancelled.
+            `func` can read the time left with `remaining_time()` to shrink its own timeout.
+        rate_limiter: Every attempt awaits a token for its proxy before calling `func`.
+        classifier: Classifies failed attempts, the same way as in retry_with_node_and_proxy. Switch-node errors keep
+            the failed proxy out of the remaining attempts.
+        balancer: Selection strategy for proxies, see retry_with_node_and_proxy.
+        balance_key: Affinity key passed to the balancer.
+        budget: Shared retry budget, see retry_with_node_and_proxy.
+        log_mode: Form of the `retry_logs` context, see retry_with_node_and_proxy.
+
+    Returns:
+        Result with success on first successful call, or last failure with logs of attempts.
+    """
+    options = _Options(
+        breakers=breakers,
+        backoff=backoff,
+        deadline_at=_deadline_at(deadline),
+        rate_limiter=rate_limiter,
+        classifier=classifier,
+        balancer=balancer,
+        balance_key=balance_key,
+        budget=budget,
+        log_mode=log_mode,
+    )
+    with _call_scope(options.deadline_at):
+        return await _retry(retries, None, proxies, lambda _node, proxy: func(proxy), options)
+
+
+def retry_with_node_and_proxy_sync[T](
+    retries: int,
+    nodes: Nodes,
+    proxies: Proxies,
+    func: SyncFuncWithNodeAndProxy[T],
+    *,
+    breakers: CircuitBreakers | None = None,
+    backoff: Backoff | None = None,
+    deadline: float | None = None,
+    rate_limiter: RateLimiter | None = None,
+    classifier: ErrorClassifier | None = None,
+    balancer: Balancer | None = None,
+    balance_key: str | None = None,
+    budget: RetryBudget | None = None,
+    log_mode: RetryLogMode = RetryLogMode.FULL,
+) -> Result[T]:
+    """
+    Synchronous version of retry_with_node_and_proxy, for code that runs without an event loop.
+
+    Node/proxy selection and the policies work the same way, and a NodePool, ProxyPool, CircuitBreakers or
+    RateLimiter can be shared with async calls and other threads. Hedging is not supported. A running attempt
+    can't be interrupted, so the deadline is checked before each attempt and `func` should bound its own timeout
+    with `remaining_time()`.
+
+    Args:
+        retries: Number of attempts to make.
+        nodes: Available nodes to randomly choose from.
+        proxies: Available proxies to randomly choose from.
+        func: Function that accepts (node, proxy) and returns a Result.
+        breakers: See retry_with_node_and_proxy.
+        backoff: Delay policy between attempts. No delay when None.
+        deadline: Time budget for the whole call in seconds.
+        rate_limiter: Every attempt waits for a token for its node and its proxy before calling `func`.
+        classifier: See retry_with_node_and_proxy.
+        balancer: See retry_with_node_and_proxy.
+        balance_key: See retry_with_node_and_proxy.
+        budget: See retry_with_node_and_proxy.
+        log_mode: See retry_with_node_and_proxy.
 
     Returns:
         Result with success on first successful call, or last failure with logs of attempts.
     """
+    options = _Options(
+        breakers=breakers,
+        backoff=backoff,
+        deadline_at=_deadline_at(deadline),
+        rate_limiter=rate_limiter,
+        classifier=classifier,
+        balancer=balancer,
+        balance_key=balance_key,
+        budget=budget,
+        log_mode=log_mode,
+        node_limits=_current_node_limits.get(),
+    )
+    with _call_scope(options.deadline_at):
+        return _retry_sync(retries, nodes, proxies, func, options)
+
+
+def retry_with_proxy_sync[T](
+    retries: int,
+    proxies: Proxies,
+    func: SyncFuncWithProxy[T],
+    *,
+    breakers: CircuitBreakers | None = None,
+    backoff: Backoff | None = None,
+    deadline: float | None = None,
+    rate_limiter: RateLimiter | None = None,
+    classifier: ErrorClassifier | None = None,
+    balancer: Balancer | None = None,
+    balance_key: str | None = None,
+    budget: RetryBudget | None = None,
+    log_mode: RetryLogMode = RetryLogMode.FULL,
+) -> Result[T]:
+    """Synchronous version of retry_with_proxy. Attempts work as in retry_with_node_and_proxy_sync."""
+    options = _Options(
+        breakers=breakers,
+        backoff=backoff,
+        deadline_at=_deadline_at(deadline),
+        rate_limiter=rate_limiter,
+        classifier=classifier,
+        balancer=balancer,
+        balance_key=balance_key,
+        budget=budget,
+        log_mode=log_mode,
+    )
+    with _call_scope(options.deadline_at):
+        return _retry_sync(retries, None, proxies, lambda _node, proxy: func(proxy), options)
+
+
+def remaining_time() -> float | None:
+    """Return the seconds left until the deadline of the enclosing retry call, or None if it has no deadline.
+
+    Meant to be called from inside `func` to bound per-attempt timeouts, e.g. `timeout=min(10, remaining_time() or 10)`.
+    Retry calls nested inside `func` inherit the deadline of the outer call.
+    """
+    deadline_at = _current_deadline.get()
+    if deadline_at is None:
+        return None
+    return max(0.0, deadline_at - time.monotonic())
+
+
+async def retry_map[ItemT, T](
+    items: Iterable[ItemT],
+    func: FuncWithItem[ItemT, T],
+    nodes: Nodes,
+    proxies: Proxies,
+    *,
+    retries: int,
+    concurrency: int = 10,
+    per_node_concurrency: int | None = None,
+    **options: Unpack[RetryOptions],
+) -> list[Result[T]]:
+    """
+    Run retry_with_node_and_proxy for every item with bounded concurrency.
+
+    Args:
+        items: Items to process, e.g. addresses.
+        func: Async function that accepts (item, node, proxy) and returns a Result.
+        nodes: Available nodes, shared by all items.
+        proxies: Available proxies, shared by all items.
+        retries: Number of attempts per item.
+        concurrency: Maximum number of items processed at the same time.
+        per_node_concurrency: Maximum number of in-flight `func` calls per node. Waiting for a slot is not counted
+            as node latency. No limit when None.
+        **options: Keyword options of retry_with_node_and_proxy, applied to every item.
+
+    Returns:
+        Results in the same order as items.
+    """
+    bounded = _retry_bounded(items, func, nodes, proxies, retries, concurrency, per_node_concurrency, options)
+    results = {index: res async for index, _, res in bounded}
+    return [results[index] for index in range(len(results))]
+
+
+async def retry_as_completed[ItemT, T](
+    items: Iterable[ItemT],
+    func: FuncWithItem[ItemT, T],
+    nodes: Nodes,
+    proxies: Proxies,
+    *,
+    retries: int,
+    concurrency: int = 10,
+    per_node_concurrency: int | None = None,
+    **options: Unpack[RetryOptions],
+) -> AsyncIterator[tuple[ItemT, Result[T]]]:
+    """
+    Streaming variant of retry_map: yields (item, result) pairs as soon as they complete.
+
+    Items are consumed lazily, so only `concurrency` calls are held in memory at any time and
+    `items` may be a generator over a huge batch. Leaving the loop early cancels in-flight calls.
+    """
+    stream = _retry_bounded(items, func, nodes, proxies, retries, concurrency, per_node_concurrency, options)
+    async with aclosing(stream):
+        async for _, item, res in stream:
+            yield item, res
+
+
+def retry_map_sync[ItemT, T](
+    items: Iterable[ItemT],
+    func: SyncFuncWithItem[ItemT, T],
+    nodes: Nodes,
+    proxies: Proxies,
+    *,
+    retries: int,
+    concurrency: int = 10,
+    per_node_concurrency: int | None = None,
+    **options: Unpack[SyncRetryOptions],
+) -> list[Result[T]]:
+    """
+    Threaded version of retry_map: runs retry_with_node_and_proxy_sync for every item in a pool of `concurrency` threads.
+
+    All items share the node/proxy selection state and policies. A deadline of an enclosing retry call applies to every item.
+
+    Returns:
+        Results in the same order as items.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1: {concurrency}")
+    if per_node_concurrency is not None and per_node_concurrency < 1:
+        raise ValueError(f"per_node_concurrency must be at least 1: {per_node_concurrency}")
+    node_limits = _NodeLimits(per_node_concurrency) if per_node_concurrency is not None else None
+    outer_deadline_at = _current_deadline.get()
+
+    def run(item: ItemT) -> Result[T]:
+        with _call_scope(outer_deadline_at, node_limits):
+            return retry_with_node_and_proxy_sync(retries, nodes, proxies, lambda node, proxy: func(item, node, proxy), **options)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run, items))
+
+
+class _NodeLimits:
+    """In-flight limit per node shared by the calls of one retry_map or retry_map_sync, see per_node_concurrency."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._sync_semaphores: dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def semaphore(self, node: str) -> asyncio.Semaphore:
+        return self._semaphores.setdefault(node, asyncio.Semaphore(self.limit))
+
+    def sync_semaphore(self, node: str) -> threading.Semaphore:
+        with self._lock:
+            return self._sync_semaphores.setdefault(node, threading.Semaphore(self.limit))
+
+
+@dataclass(slots=True)
+class _Options:
+    """Per-call retry policies shared by the attempt loops."""
+
+    breakers: CircuitBreakers | None = None
+    backoff: Backoff | None = None
+    deadline_at: float | None = None  # time.monotonic() based
+    rate_limiter: RateLimiter | None = None
+    classifier: ErrorClassifier | None = None
+    balancer: Balancer | None = None
+    balance_key: str | None = None
+    budget: RetryBudget | None = None
+    log_mode: RetryLogMode = RetryLogMode.FULL
+    adaptive_limiter: AdaptiveLimiter | None = None  # async helpers only
+    node_limits: _NodeLimits | None = None  # per_node_concurrency of an enclosing retry_map
+
+    def remaining(self) -> float | None:
+        return None if self.deadline_at is None else self.deadline_at - time.monotonic()
+
+
+class _AttemptLogs:
+    """retry_logs of one call in the requested form. OFF and FAILURES skip building entries they would drop."""
+
+    __slots__ = ("entries", "hedged", "mode", "proxy_only")
+
+    def __init__(self, mode: RetryLogMode, proxy_only: bool = False, hedged: bool = False) -> None:
+        self.mode = mode
+        self.proxy_only = proxy_only
+        self.hedged = hedged
+        self.entries: list[object] = []
+
+    def add(
+        self, attempt: int, node: str, proxy: str | None, res: Result[Any] | None, kind: ErrorKind | None, elapsed: float
+    ) -> None:
+        """Add an attempt. `res` is None for a cancelled hedge."""
+        if self.mode == RetryLogMode.OFF or (self.mode == RetryLogMode.FAILURES and res is not None and res.is_ok()):
+            return
+        if self.mode == RetryLogMode.COMPACT:
+            error = "cancelled" if res is None else None if res.is_ok() else res.error
+            self.entries.append(AttemptLog(attempt, None if self.proxy_only else node, proxy, elapsed, error, kind))
+            return
+        entry: dict[str, object] = {} if self.proxy_only else {"node": node}
+        entry["proxy"] = proxy
+        if self.hedged:
+            entry["attempt"] = attempt
+        entry["result"] = "cancelled" if res is None else res.to_dict()
+        self.entries.append(entry)
+
+    def context(self, **extra: object) -> dict[str, object]:
+        if self.mode == RetryLogMode.OFF:
+            return extra
+        return {"retry_logs": self.entries, **extra}
+
+
+# Absolute deadline (time.monotonic() based) of the retry call running in the current context
+_current_deadline: ContextVar[float | None] = ContextVar("mm_web3_retry_deadline", default=None)
+
+# Per-node limits of the retry_map call that started the retry call running in the current context
+_current_node_limits: ContextVar[_NodeLimits | None] = ContextVar("mm_web3_retry_node_limits", default=None)
+
+
+def _deadline_at(deadline: float | None) -> float | None:
+    """Convert a relative deadline to an absolute one. A retry call nested in another one inherits its deadline."""
+    outer = _current_deadline.get()
+    if deadline is None:
+        return outer
+    if deadline <= 0:
+        raise ValueError(f"deadline must be positive: {deadline}")
+    own = time.monotonic() + deadline
+    return own if outer is None else min(own, outer)
+
+
+@contextmanager
+def _call_scope(deadline_at: float | None, node_limits: _NodeLimits | None = None) -> Iterator[None]:
+    """Context of the retry calls made within: the deadline they inherit and the per-node limits they apply.
+
+    Retry calls enter a scope without node limits, so calls nested in `func` don't wait for the slot their caller holds.
+    """
+    deadline_token = _current_deadline.set(deadline_at)
+    limits_token = _current_node_limits.set(node_limits)
+    try:
+        yield
+    finally:
+        _current_node_limits.reset(limits_token)
+        _current_deadline.reset(deadline_token)
+
+
+async def _retry_bounded[ItemT, T](
+    items: Iterable[ItemT],
+    func: FuncWithItem[ItemT, T],
+    nodes: Nodes,
+    proxies: Proxies,
+    retries: int,
+    concurrency: int,
+    per_node_concurrency: int | None,
+    options: RetryOptions,
+) -> AsyncGenerator[tuple[int, ItemT, Result[T]]]:
+    """Keep up to `concurrency` retry calls running and yield (index, item, result) in completion order."""
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1: {concurrency}")
+    if per_node_concurrency is not None and per_node_concurrency < 1:
+        raise ValueError(f"per_node_concurrency must be at least 1: {per_node_concurrency}")
+    node_limits = _NodeLimits(per_node_concurrency) if per_node_concurrency is not None else None
+
+    def bind(item: ItemT) -> FuncWithNodeAndProxy[T]:
+        return lambda node, proxy: func(item, node, proxy)
+
+    source = enumerate(items)
+    pending: dict[asyncio.Task[Result[T]], tuple[int, ItemT]] = {}
+    try:
+        while True:
+            for index, item in islice(source, concurrency - len(pending)):
+                with _call_scope(_current_deadline.get(), node_limits):  # the task copies the context
+                    task = asyncio.create_task(retry_with_node_and_proxy(retries, nodes, proxies, bind(item), **options))
+                pending[task] = (index, item)
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, item = pending.pop(task)
+                yield index, item, task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+class _Sequential[T]:
+    """Bookkeeping of a sequential retry call, shared by _retry and _retry_sync: they only sleep and call func.
+
+    Each attempt asks `delay` how long to back off, then `pick` for a node/proxy pair, then reports the attempt to
+    `finish`. Any of them can end the call, after which `result` is its outcome.
+    """
+
+    def __init__(self, nodes: Nodes | None, proxies: Proxies, options: _Options) -> None:
+        self.nodes = nodes
+        self.proxies = proxies
+        self.options = options
+        self.res: Result[T] = Result.err("not_started")
+        self.kind: ErrorKind | None = None
+        self.logs = _AttemptLogs(options.log_mode, proxy_only=nodes is None)
+        self.tried = _Tried()
+        self.delays = options.backoff.delays() if options.backoff is not None else None
+
+    def delay(self, attempt: int) -> float | None:
+        """Seconds to back off before the attempt, or None when the retry budget or the deadline ends the call."""
+        if not _spend_budget(self.options, attempt):
+            self.res = Result.err(RETRY_BUDGET_ERROR)
+            return None
+        if attempt == 0 or self.delays is None:
+            return 0.0
+        delay = next(self.delays)
+        remaining = self.options.remaining()
+        if remaining is not None and delay >= remaining:
+            self.res = Result.err(DEADLINE_EXCEEDED_ERROR)
+            return None
+        return delay
+
+    def pick(self) -> tuple[str, str | None] | None:
+        """Node/proxy pair for the attempt, or None when the deadline passed or every node or proxy is open."""
+        remaining = self.options.remaining()
+        if remaining is not None and remaining <= 0:
+            self.res = Result.err(DEADLINE_EXCEEDED_ERROR)
+            return None
+        pair = _pick_pair(self.nodes, self.proxies, self.options, self.tried)
+        if pair is None:
+            self.res = Result.err(CIRCUIT_OPEN_ERROR)
+        return pair
+
+    def finish(self, attempt: int, pair: tuple[str, str | None], res: Result[T], kind: ErrorKind | None, elapsed: float) -> bool:
+        """Log the attempt. True when it ends the call: it succeeded or failed with a fatal error."""
+        node, proxy = pair
+        self.logs.add(attempt, node, proxy, res, kind, elapsed)
+        self.res = res
+        if res.is_ok() or kind == ErrorKind.FATAL:
+            self.kind = kind
+            return True
+        if kind == ErrorKind.SWITCH_NODE:
+            self.tried.ban(self.nodes, node, proxy)
+        return False
+
+    def result(self) -> Result[T]:
+        """Outcome of the call, with the attempt logs in its context."""
+        if self.res.is_ok():
+            return Result.ok(self.res.unwrap(), self.logs.context())
+        if self.kind == ErrorKind.FATAL:
+            return Result.err(self.res.unwrap_err(), self.logs.context(error_kind=self.kind))
+        return Result.err(self.res.unwrap_err(), self.logs.context())
+
+
+async def _retry[T](
+    retries: int, nodes: Nodes | None, proxies: Proxies, func: FuncWithNodeAndProxy[T], options: _Options
+) -> Result[T]:
+    """Sequential attempt loop shared by both helpers. `nodes` is None for proxy-only calls."""
+    call = _Sequential[T](nodes, proxies, options)
+    for attempt in range(retries):
+        delay = call.delay(attempt)
+        if delay is None:
+            break
+        if delay:
+            await asyncio.sleep(delay)
+        pair = call.pick()
+        if pair is None:
+            break
+        started_at = time.monotonic()
+        res, kind = await _attempt(nodes, proxies, *pair, func, options)
+        if call.finish(attempt, pair, res, kind, time.monotonic() - started_at):
+            break
+    return call.result()
+
+
+async def _attempt[T](
+    nodes: Nodes | None, proxies: Proxies, node: str, proxy: str | None, func: FuncWithNodeAndProxy[T], options: _Options
+) -> tuple[Result[T], ErrorKind | None]:
+    """Call func once, bounded by the deadline, and report the outcome to the node/proxy pools and circuit breakers.
+
+    Waiting for rate limiter tokens, per-node slots of retry_map and adaptive limiter slots counts towards the deadline,
+    but not towards the latency recorded in the node pool and the balancers. Returns the result and, for failures, its
+    kind when a classifier is set. Fatal errors are not the endpoints' fault, so they count as healthy responses for the
+    pools and circuit breakers. When the deadline passes before func is called, nothing is reported.
+    """
+    started_at = time.monotonic()
+    timeout = options.remaining()
+    limiter = options.adaptive_limiter if nodes is not None else None
+    node_limit = options.node_limits.semaphore(node) if options.node_limits is not None and nodes is not None else None
+    node_slot = False
+    slot_at: float | None = None
+    called = False
+    res: Result[T] | None = None
+    try:
+        try:
+            async with asyncio.timeout(timeout) as cm:
+                if options.rate_limiter is not None:
+                    for url in _endpoints(nodes, node, proxy):
+                        await options.rate_limiter.acquire(url)
+                    started_at = time.monotonic()
+                if node_limit is not None:
+                    await node_limit.acquire()
+                    node_slot = True
+                    started_at = time.monotonic()
+                if limiter is not None:
+                    slot_at = await limiter.acquire(node)
+                    started_at = slot_at
+                called = True
+                with _outstanding(_attempt_balancers(nodes, proxies, node, proxy, options)):
+                    res = await func(node, proxy)
+        except TimeoutError:
+            if not cm.expired():
+                raise
+            res = Result.err(DEADLINE_EXCEEDED_ERROR)
+        finally:
+            if limiter is not None and slot_at is not None:
+                limiter.release(node, slot_at, res)  # res is None when the attempt was cancelled
+            if node_limit is not None and node_slot:
+                node_limit.release()
+    except BaseException:
+        _release_trials(nodes, node, proxy, options)
+        raise
+
+    if not called:  # timed out waiting for local limits, the endpoints were never contacted
+        _release_trials(nodes, node, proxy, options)
+        return res, None
+    return res, _record_outcome(nodes, proxies, node, proxy, res, time.monotonic() - started_at, options)
+
+
+def _retry_sync[T](
+    retries: int, nodes: Nodes | None, proxies: Proxies, func: SyncFuncWithNodeAndProxy[T], options: _Options
+) -> Result[T]:
+    """Blocking twin of _retry."""
+    call = _Sequential[T](nodes, proxies, options)
+    for attempt in range(retries):
+        delay = call.delay(attempt)
+        if delay is None:
+            break
+        if delay:
+            time.sleep(delay)
+        pair = call.pick()
+        if pair is None:
+            break
+        started_at = time.monotonic()
+        res, kind = _attempt_sync(nodes, proxies, *pair, func, options)
+        if call.finish(attempt, pair, res, kind, time.monotonic() - started_at):
+            break
+    return call.result()
+
+
+def _attempt_sync[T](
+    nodes: Nodes | None, proxies: Proxies, node: str, proxy: str | None, func: SyncFuncWithNodeAndProxy[T], options: _Options
+) -> tuple[Result[T], ErrorKind | None]:
+    """Blocking twin of _attempt. The deadline can only be checked after waiting for rate limiter tokens."""
+    if options.rate_limiter is not None:
+        for url in _endpoints(nodes, node, proxy):
+            options.rate_limiter.acquire_sync(url)
+        remaining = options.remaining()
+        if remaining is not None and remaining <= 0:
+            _release_trials(nodes, node, proxy, options)
+            return Result.err(DEADLINE_EXCEEDED_ERROR), None
+    node_limit = options.node_limits.sync_semaphore(node) if options.node_limits is not None and nodes is not None else None
+    if node_limit is not None:
+        remaining = options.remaining()
+        if not node_limit.acquire(timeout=None if remaining is None else max(0.0, remaining)):
+            _release_trials(nodes, node, proxy, options)
+            return Result.err(DEADLINE_EXCEEDED_ERROR), None
+    started_at = time.monotonic()
+    try:
+        with _outstanding(_attempt_balancers(nodes, proxies, node, proxy, options)):
+            res = func(node, proxy)
+    except BaseException:
+        _release_trials(nodes, node, proxy, options)
+        raise
+    finally:
+        if node_limit is not None:
+            node_limit.release()
+    return res, _record_outcome(nodes, proxies, node, proxy, res, time.monotonic() - started_at, options)
+
+
+def _record_outcome(
+    nodes: Nodes | None, proxies: Proxies, node: str, proxy: str | None, res: Result[Any], latency: float, options: _Options
+) -> ErrorKind | None:
+    """Classify a finished attempt and report it to the node/proxy pools and circuit breakers."""
+    kind = options.classifier.classify(res) if options.classifier is not None and res.is_err() else None
+    healthy = res.is_ok() or kind == ErrorKind.FATAL
+    if isinstance(nodes, NodePool):
+        nodes.record(node, latency, healthy)
+    if isinstance(proxies, ProxyPool) and proxy is not None:
+        proxies.record(proxy, healthy)
+    if options.breakers is not None:
+        for url in _endpoints(nodes, node, proxy):
+            if healthy:
+                options.breakers.record_success(url)
+            else:
+                options.breakers.record_failure(url)
+    if res.is_ok():
+        for balancer, url in _attempt_balancers(nodes, proxies, node, proxy, options):
+            balancer.observe(url, latency)
+    return kind
+
+
+def _release_trials(nodes: Nodes | None, node: str, proxy: str | None, options: _Options) -> None:
+    """Give back the half-open trial slots reserved by _pick_pair for an attempt that won't record an outcome."""
+    if options.breakers is not None:
+        for url in _endpoints(nodes, node, proxy):
+            options.breakers.release(url)
+
+
+def _attempt_balancers(
+    nodes: Nodes | None, proxies: Proxies, node: str, proxy: str | None, options: _Options
+) -> list[tuple[Balancer, str]]:
+    """Balancers to report the attempt to: the per-call one, else the node pool's and the proxy pool's."""
+    node_balancer = options.balancer or (nodes.balancer if isinstance(nodes, NodePool) else None)
+    proxy_balancer = options.balancer or (proxies.balancer if isinstance(proxies, ProxyPool) else None)
+    balancers = []
+    if nodes is not None and node_balancer is not None:
+        balancers.append((node_balancer, node))
+    if proxy is not None and proxy_balancer is not None:
+        balancers.append((proxy_balancer, proxy))
+    return balancers
+
+
+@contextmanager
+def _outstanding(balancers: list[tuple[Balancer, str]]) -> Iterator[None]:
+    """Count the attempt as in flight for its balancers, including when it is cancelled."""
+    for balancer, url in balancers:
+        balancer.start(url)
+    try:
+        yield
+    finally:
+        for balancer, url in balancers:
+            balancer.finish(url)
+
+
+async def _retry_hedged[T](
+    retries: int, nodes: Nodes, proxies: Proxies, func: FuncWithNodeAndProxy[T], hedge: Hedge, options: _Options
+) -> Result[T]:
     res: Result[T] = Result.err("not_started")
-    logs = []
+    logs = _AttemptLogs(options.log_mode, hedged=True)
+    pending: _Pending[T] = {}
+    tried = _Tried()
+    launched = 0
+    last_launch_at = 0.0
+    budget_spent = False  # stop hedging after the first rejection, instead of asking the budget every delay
+
+    def launch() -> bool:
+        nonlocal launched, last_launch_at, budget_spent
+        remaining = options.remaining()
+        if remaining is not None and remaining <= 0:
+            return False
+        if budget_spent:
+            return False
+        if not _spend_budget(options, launched):
+            budget_spent = True
+            return False
+        pair = _pick_pair(nodes, proxies, options, tried)
+        if pair is None:
+            return False
+        node, proxy = pair
+        last_launch_at = time.monotonic()
+        task = asyncio.create_task(_attempt(nodes, proxies, node, proxy, func, options))
+        pending[task] = (launched, node, proxy, last_launch_at)
+        launched += 1
+        return True
+
+    try:
+        if retries > 0 and not launch():
+            res = Result.err(CIRCUIT_OPEN_ERROR)  # the deadline can't have passed yet
+        while pending:
+            can_hedge = not budget_spent and launched < retries and len(pending) < hedge.max_in_flight
+            timeout = max(0.0, last_launch_at + hedge.delay - time.monotonic()) if can_hedge else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if not launch():
+                    last_launch_at = time.monotonic()  # no endpoint available for a hedge right now
+                continue
+            for task in done:
+                attempt, node, proxy, started_at = pending.pop(task)
+                res, kind = task.result()
+                logs.add(attempt, node, proxy, res, kind, time.monotonic() - started_at)
+                if res.is_ok():
+                    hedge.observe(time.monotonic() - started_at)
+                    await _cancel_pending(pending, logs)
+                    return Result.ok(res.unwrap(), logs.context(retry_winner=attempt))
+                if kind == ErrorKind.FATAL:
+                    await _cancel_pending(pending, logs)
+                    return Result.err(res.unwrap_err(), logs.context(error_kind=kind))
+                if kind == ErrorKind.SWITCH_NODE:
+                    tried.ban(nodes, node, proxy)
+            for _ in done:  # replace failed attempts
+                if launched < retries and len(pending) < hedge.max_in_flight:
+                    launch()
+    finally:
+        await _cancel_pending(pending, logs)
+
+    return Result.err(res.unwrap_err(), logs.context())
+
+
+async def _cancel_pending[T](pending: _Pending[T], logs: _AttemptLogs) -> None:
+    """Cancel losing attempts and wait until they are done."""
+    # Let attempts launched just now start, so that each of them releases its circuit breaker trial slots on cancellation
+    await asyncio.sleep(0)
+    now = time.monotonic()
+    for task, (attempt, node, proxy, started_at) in pending.items():
+        task.cancel()
+        logs.add(attempt, node, proxy, None, None, now - started_at)
+    await asyncio.gather(*pending, return_exceptions=True)
+    pending.clear()
+
+
+def _spend_budget(options: _Options, attempt: int) -> bool:
+    """Deposit the first attempt of a call into the retry budget, or withdraw a later one. False when it is spent."""
+    if options.budget is None:
+        return True
+    if attempt == 0:
+        options.budget.record_first_attempt()
+        return True
+    return options.budget.try_retry()
+
+
+def _endpoints(nodes: Nodes | None, node: str, proxy: str | None) -> list[str]:
+    """URLs an attempt goes through: its node (unless proxy-only) and its proxy (if any)."""
+    urls = [] if nodes is None else [node]
+    if proxy is not None:
+        urls.append(proxy)
+    return urls
+
+
+class _Tried:
+    """Nodes and proxies already used by a call, in order of use.
+
+    Attempts draw endpoints without replacement: used ones are excluded until all candidates were tried,
+    then a new round starts that still excludes the last used endpoint.
+    Banned endpoints failed with a SWITCH_NODE error and are avoided for the rest of the call: nodes, or proxies in
+    proxy-only calls.
+    """
+
+    __slots__ = ("banned_nodes", "banned_proxies", "nodes", "proxies")
+
+    def __init__(self) -> None:
+        self.nodes: dict[str, None] = {}
+        self.proxies: dict[str | None, None] = {}
+        self.banned_nodes: set[str] = set()
+        self.banned_proxies: set[str | None] = set()
+
+    def ban(self, nodes: Nodes | None, node: str, proxy: str | None) -> None:
+        """Avoid the node of a SWITCH_NODE error. Proxy-only calls have no node, so their proxy is avoided instead."""
+        if nodes is None:
+            self.banned_proxies.add(proxy)
+        else:
+            self.banned_nodes.add(node)
+
+
+def _pick_pair(nodes: Nodes | None, proxies: Proxies, options: _Options, tried: _Tried) -> tuple[str, str | None] | None:
+    """Pick a node/proxy pair for the next attempt, or None if every node or every proxy is open.
+
+    Endpoints with an open circuit breaker are never picked. When `nodes` is None, the node is an empty string.
+    The final choice among the remaining candidates is made by the per-call balancer, else by the pools. The picked
+    endpoints are reserved with `breakers.allow`, which takes their half-open trial slots; a candidate it refuses, e.g.
+    because concurrent calls took the trial slots first, is dropped and another one is picked.
+    """
+    breakers = options.breakers
+    node_candidates = [""] if nodes is None else _node_urls(nodes)
+    if breakers is not None and nodes is not None:
+        node_candidates = [node for node in node_candidates if breakers.is_available(node)]
+    if not node_candidates:
+        return None
+
+    proxy = _pick_fresh_proxy(proxies, options, tried) if isinstance(proxies, ProxyPool) else None
+    if proxy is None:
+        proxy_candidates = _proxy_urls(proxies)
+        if breakers is not None:
+            proxy_candidates = [proxy for proxy in proxy_candidates if proxy is None or breakers.is_available(proxy)]
+        if not proxy_candidates:
+            return None
+        proxy_candidates = [proxy for proxy in proxy_candidates if proxy not in tried.banned_proxies] or proxy_candidates
+        proxy_candidates = _without_replacement(proxy_candidates, tried.proxies)
+        proxy_urls = [proxy for proxy in proxy_candidates if proxy is not None]
+        if proxy_urls:
+            proxy = _reserve(proxy_urls, lambda urls: _choose_proxy(proxies, urls, options), breakers)
+            if proxy is None:
+                return None
+
+    node_candidates = [node for node in node_candidates if node not in tried.banned_nodes] or node_candidates
+    node_candidates = _without_replacement(node_candidates, tried.nodes)
+    if nodes is None:
+        node = node_candidates[0]
+    else:
+        reserved = _reserve(node_candidates, lambda urls: _choose_node(nodes, urls, options), breakers)
+        if reserved is None:
+            if breakers is not None and proxy is not None:
+                breakers.release(proxy)
+            return None
+        node = reserved
+    tried.nodes[node] = None
+    tried.proxies[proxy] = None
+    return node, proxy
+
+
+def _reserve(candidates: list[str], choose: Callable[[list[str]], str], breakers: CircuitBreakers | None) -> str | None:
+    """Choose a candidate and reserve it with its circuit breaker, dropping refused ones. None when all are refused."""
+    candidates = list(candidates)
+    while candidates:
+        url = choose(candidates)
+        if url not in candidates:  # the pool changed since the candidates were listed
+            url = random.choice(candidates)
+        if breakers is None or breakers.allow(url):
+            return url
+        candidates.remove(url)
+    return None
+
+
+def _choose_node(nodes: Nodes, candidates: list[str], options: _Options) -> str:
+    """Choose among node candidates with the per-call balancer, else the node pool, else at random."""
+    if options.balancer is not None:
+        return options.balancer.choose(candidates, options.balance_key)
+    if isinstance(nodes, NodePool):
+        return nodes.pick(exclude=set(nodes.enabled_urls) - set(candidates), key=options.balance_key)
+    return random.choice(candidates)
+
+
+def _choose_proxy(proxies: Proxies, candidates: list[str], options: _Options) -> str:
+    """Choose among proxy candidates with the per-call balancer, else the proxy pool, else at random."""
+    if options.balancer is not None:
+        return options.balancer.choose(candidates, options.balance_key)
+    if isinstance(proxies, ProxyPool):
+        return proxies.pick(exclude=set(proxies.urls) - set(candidates), key=options.balance_key)
+    return random.choice(candidates)
+
+
+def _pick_fresh_proxy(pool: ProxyPool, options: _Options, tried: _Tried) -> str | None:
+    """Pick and reserve an active proxy of the pool that this call hasn't tried or banned and whose breaker allows it.
+
+    Only those few proxies are excluded, so the pool picks without copying its active set. Returns None when no such
+    proxy turns up quickly, e.g. once every proxy was tried; the caller then falls back to the candidate lists.
+    """
+    if options.balancer is not None:
+        return None
+    exclude = {proxy for proxy in (*tried.proxies, *tried.banned_proxies) if proxy is not None}
+    for _ in range(_PICK_TRIES):
+        proxy = pool.pick(exclude=exclude, key=options.balance_key)
+        if proxy in exclude:  # every active proxy is excluded
+            return None
+        if options.breakers is None or options.breakers.allow(proxy):
+            return proxy
+        exclude.add(proxy)
+    return None
+
+
+_PICK_TRIES = 8  # refused proxies skipped by _pick_fresh_proxy before falling back to the candidate lists
+
+
+def _without_replacement[K](candidates: list[K], used: dict[K, None]) -> list[K]:
+    """Return candidates not used yet. When all were used, start a new round without the last used one."""
+    fresh = [c for c in candidates if c not in used]
+    if fresh:
+        return fresh
+    last = next(reversed(used))
+    used.clear()
+    used[last] = None
+    return [c for c in candidates if c != last] or candidates
+
+
+def _node_urls(nodes: Nodes) -> list[str]:
+    if isinstance(nodes, NodePool):
+        return list(nodes.enabled_urls)
+    urls = [node.removesuffix("/") for node in ([nodes] if isinstance(nodes, str) else nodes)]
+    if not urls:
+        raise ValueError("No nodes provided")
+    return urls
 
-    for _ in range(retries):
-        proxy = random_proxy(proxies)
-        res = await func(proxy)
-        logs.append({"proxy": proxy, "result": res.to_dict()})
-        if res.is_ok():
-            return Result.ok(res.unwrap(), {"retry_logs": logs})
 
-    return Result.err(res.unwrap_err(), {"retry_logs": logs})
+def _proxy_urls(proxies: Proxies) -> list[str | None]:
+    if proxies is None:
+        return [None]
+    if isinstance(proxies, ProxyPool):
+        urls: list[str | None] = [*proxies.candidates()]
+        return urls
+    if isinstance(proxies, str):
+        return [proxies]
+    return list(proxies) or [None]
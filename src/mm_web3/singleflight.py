@@ -0,0 +1,46 @@
+"""Coalescing of identical concurrent calls."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, cast
+
+from mm_result import Result
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single in-flight call.
+
+    The first caller for a key starts `func`; callers arriving while it runs wait for it and receive the same
+    Result (or exception). Once it finishes the key is released, so later calls start a fresh one.
+    Typically `func` wraps a whole retry call:
+
+        await flights.do(("decimals", token), lambda: retry_with_node_and_proxy(3, nodes, proxies, get_decimals))
+
+    Cancelling a waiter doesn't cancel the shared call for the others.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, asyncio.Task[Any]] = {}
+        self.calls = 0  # calls that started func
+        self.shared = 0  # calls that joined an in-flight call
+
+    @property
+    def in_flight(self) -> int:
+        """Number of keys with a call in flight."""
+        return len(self._flights)
+
+    async def do[T](self, key: Hashable, func: Callable[[], Awaitable[Result[T]]]) -> Result[T]:
+        """Run func, or join the in-flight call with the same key."""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._release(key, task))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return cast(Result[T], await asyncio.shield(task))
+
+    def _release(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
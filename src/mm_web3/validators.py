@@ -6,8 +6,8 @@ from mm_std import parse_lines
 from pydantic import BaseModel
 
 from mm_web3.account import PrivateKeyMap
-from mm_web3.calcs import calc_decimal_expression, calc_expression_with_vars
-from mm_web3.proxy import fetch_proxies_sync
+from mm_web3.calcs import UnitTable, calc_decimal_expression, calc_expression_with_vars
+from mm_web3.proxy import ProxyListCache, fetch_proxy_lists_sync
 from mm_web3.utils import read_lines_from_file
 
 type IsAddress = Callable[[str], bool]
@@ -97,11 +97,16 @@ class ConfigValidators:
         return validator
 
     @staticmethod
-    def proxies() -> Callable[[str], list[str]]:
+    def proxies(cache_dir: str | Path | None = None, cache_ttl: float = 3600) -> Callable[[str], list[str]]:
         """Validate and parse proxy configuration from multiple sources.
 
         Supports direct proxy specification, fetching from URLs, environment variables,
-        and local files. Automatically deduplicates results.
+        and local files. URL sources are fetched concurrently. Automatically deduplicates results.
+
+        Args:
+            cache_dir: If set, URL sources are cached on disk there (see ProxyListCache), so a fresh
+                copy skips the download and a source that is down falls back to the last good copy
+            cache_ttl: Seconds a cached list is used without revalidation
 
         Returns:
             Validator function that parses string into unique list of proxy addresses
@@ -115,30 +120,36 @@ class ConfigValidators:
         Raises:
             ValueError: If URL fetch fails or environment variable is missing
         """
+        cache = ProxyListCache(cache_dir, ttl=cache_ttl) if cache_dir is not None else None
 
         def validator(v: str) -> list[str]:
-            result = []
+            parts: list[list[str] | str] = []  # a str is a URL to fetch
             for line in parse_lines(v, deduplicate=True, remove_comments=True):
                 if line.startswith("url:"):
-                    url = line.removeprefix("url:").strip()
-                    res = fetch_proxies_sync(url)
-                    if res.is_err():
-                        raise ValueError(f"Can't get proxies: {res.unwrap_err()}")
-                    result += res.unwrap()
+                    parts.append(line.removeprefix("url:").strip())
                 elif line.startswith("env_url:"):
                     env_var = line.removeprefix("env_url:").strip()
                     url = os.getenv(env_var) or ""
                     if not url:
                         raise ValueError(f"missing env var: {env_var}")
-                    res = fetch_proxies_sync(url)
+                    parts.append(url)
+                elif line.startswith("file:"):
+                    path = line.removeprefix("file:").strip()
+                    parts.append(read_lines_from_file(path))
+                else:
+                    parts.append([line])
+
+            urls = list(dict.fromkeys(part for part in parts if isinstance(part, str)))
+            fetched = dict(zip(urls, fetch_proxy_lists_sync(urls, cache=cache), strict=True))
+            result = []
+            for part in parts:
+                if isinstance(part, str):
+                    res = fetched[part]
                     if res.is_err():
                         raise ValueError(f"Can't get proxies: {res.unwrap_err()}")
                     result += res.unwrap()
-                elif line.startswith("file:"):
-                    path = line.removeprefix("file:").strip()
-                    result += read_lines_from_file(path)
                 else:
-                    result.append(line)
+                    result += part
 
             return list(dict.fromkeys(result))
 
@@ -296,7 +307,9 @@ class ConfigValidators:
         return validator
 
     @staticmethod
-    def expression_with_vars(var_name: str | None = None, unit_decimals: dict[str, int] | None = None) -> Callable[[str], str]:
+    def expression_with_vars(
+        var_name: str | None = None, unit_decimals: dict[str, int] | UnitTable | None = None
+    ) -> Callable[[str], str]:
         """Validate mathematical expressions with variables and units.
 
         Validates expressions using calc_expression_with_vars function. Supports variables,
@@ -304,7 +317,7 @@ class ConfigValidators:
 
         Args:
             var_name: Variable name to include in validation context
-            unit_decimals: Mapping of unit suffixes to decimal places
+            unit_decimals: Mapping of unit suffixes to decimal places, or a UnitTable
 
         Returns:
             Validator function that validates expression syntax
@@ -317,10 +330,12 @@ class ConfigValidators:
             ValueError: If expression syntax is invalid
         """
 
+        units = unit_decimals if isinstance(unit_decimals, UnitTable) else UnitTable(unit_decimals or {})
+
         def validator(v: str) -> str:
             # Use arbitrary test value to validate expression syntax without actual calculation
             variables = {var_name: 123} if var_name else {}
-            calc_expression_with_vars(v, variables, unit_decimals=unit_decimals)
+            calc_expression_with_vars(v, variables, unit_decimals=units)
             return v
 
         return validator
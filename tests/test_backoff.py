@@ -0,0 +1,47 @@
+"""Tests for backoff policies."""
+
+from itertools import islice
+
+import pytest
+
+from mm_web3 import ConstantBackoff, ExponentialBackoff, Jitter
+
+
+class TestConstantBackoff:
+    def test_delays(self):
+        assert list(islice(ConstantBackoff(0.5).delays(), 3)) == [0.5, 0.5, 0.5]
+
+    def test_negative_delay(self):
+        with pytest.raises(ValueError, match="non-negative"):
+            ConstantBackoff(-1)
+
+
+class TestExponentialBackoff:
+    def test_without_jitter(self):
+        backoff = ExponentialBackoff(base=0.1, cap=0.5, jitter=Jitter.NONE)
+        assert list(islice(backoff.delays(), 5)) == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_full_jitter_stays_below_ceiling(self):
+        backoff = ExponentialBackoff(base=0.1, cap=1, jitter=Jitter.FULL)
+        for _ in range(20):
+            delays = list(islice(backoff.delays(), 6))
+            ceilings = [0.1, 0.2, 0.4, 0.8, 1, 1]
+            assert all(0 <= d <= c for d, c in zip(delays, ceilings, strict=True))
+
+    def test_decorrelated_jitter_bounds(self):
+        backoff = ExponentialBackoff(base=0.1, cap=2, jitter=Jitter.DECORRELATED)
+        for _ in range(20):
+            previous = 0.1
+            for delay in islice(backoff.delays(), 10):
+                assert 0.1 <= delay <= min(2, previous * 3)
+                previous = delay
+
+    def test_many_delays_do_not_overflow(self):
+        delays = ExponentialBackoff(base=0.1, cap=1, jitter=Jitter.NONE).delays()
+        assert list(islice(delays, 2000))[-1] == 1
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError, match="base"):
+            ExponentialBackoff(base=0)
+        with pytest.raises(ValueError, match="cap"):
+            ExponentialBackoff(base=1, cap=0.5)
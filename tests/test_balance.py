@@ -0,0 +1,152 @@
+"""Tests for load-balancing strategies."""
+
+import time
+from collections import Counter
+
+import pytest
+from mm_result import Result
+
+from mm_web3 import (
+    ConsistentHashBalancer,
+    LeastOutstandingBalancer,
+    NodePool,
+    PowerOfTwoBalancer,
+    ProxyPool,
+    RoundRobinBalancer,
+    random_node,
+    random_proxy,
+    retry_with_node_and_proxy,
+)
+
+NODES = ["https://node1.com", "https://node2.com", "https://node3.com"]
+
+
+class TestStrategies:
+    def test_round_robin_cycles(self):
+        balancer = RoundRobinBalancer()
+        assert [balancer.choose(NODES) for _ in range(6)] == NODES * 2
+
+    def test_round_robin_skips_dropped_candidates(self):
+        balancer = RoundRobinBalancer()
+        assert [balancer.choose(NODES) for _ in range(2)] == NODES[:2]
+        assert [balancer.choose([NODES[0], NODES[2]]) for _ in range(2)] == [NODES[2], NODES[0]]
+        assert balancer.choose(NODES) == NODES[1]
+
+    def test_least_outstanding_avoids_busy_nodes(self):
+        balancer = LeastOutstandingBalancer()
+        balancer.start(NODES[0])
+        balancer.start(NODES[1])
+        assert {balancer.choose(NODES) for _ in range(20)} == {NODES[2]}
+        balancer.finish(NODES[0])
+        balancer.start(NODES[2])
+        assert balancer.choose(NODES) == NODES[0]
+
+    def test_power_of_two_prefers_fast_nodes(self):
+        balancer = PowerOfTwoBalancer()
+        balancer.observe(NODES[0], 0.01)
+        balancer.observe(NODES[1], 1.0)
+        balancer.observe(NODES[2], 1.0)
+        counts = Counter(balancer.choose(NODES) for _ in range(300))
+        # the fast node loses only when it is not sampled: 1/3 of the time
+        assert counts[NODES[0]] > 150
+
+    def test_power_of_two_accounts_for_outstanding_requests(self):
+        balancer = PowerOfTwoBalancer()
+        for url in NODES[:2]:
+            balancer.observe(url, 0.1)
+        for _ in range(5):
+            balancer.start(NODES[0])
+        assert {balancer.choose(NODES[:2]) for _ in range(20)} == {NODES[1]}
+
+    def test_consistent_hash_is_sticky(self):
+        balancer = ConsistentHashBalancer()
+        keys = [f"0x{i:040x}" for i in range(200)]
+        before = {key: balancer.choose(NODES, key) for key in keys}
+        assert before == {key: balancer.choose(list(reversed(NODES)), key) for key in keys}
+        assert len(set(before.values())) == 3
+
+        after = {key: balancer.choose(NODES[:2], key) for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        assert all(before[key] == NODES[2] for key in moved)
+
+    def test_consistent_hash_keeps_one_ring_for_changing_candidates(self):
+        urls = [f"https://node{i}.com" for i in range(500)]
+        balancer = ConsistentHashBalancer()
+        started_at = time.monotonic()
+        chosen = [balancer.choose(urls[:i] + urls[i + 1 :], "key") for i in range(100)]
+        assert time.monotonic() - started_at < 1  # rebuilding the ring per candidate set takes over 10 s
+        assert chosen[:3] == [ConsistentHashBalancer().choose(urls[:i] + urls[i + 1 :], "key") for i in range(3)]
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            RoundRobinBalancer(alpha=0)
+        with pytest.raises(ValueError):
+            ConsistentHashBalancer(replicas=0)
+
+
+class TestBalancerIntegration:
+    def test_random_node_and_proxy(self):
+        balancer = RoundRobinBalancer()
+        assert [random_node(NODES, balancer=balancer) for _ in range(3)] == NODES
+        assert random_proxy(["p1", "p2"], balancer=ConsistentHashBalancer(), key="k") == random_proxy(
+            ["p2", "p1"], balancer=ConsistentHashBalancer(), key="k"
+        )
+
+    def test_pool_balancers(self):
+        pool = NodePool(NODES, balancer=RoundRobinBalancer())
+        assert [pool.pick() for _ in range(3)] == NODES
+        proxies = ProxyPool(["p1", "p2", "p3"], balancer=ConsistentHashBalancer())
+        assert len({proxies.pick(key="0xabc") for _ in range(10)}) == 1
+
+    async def test_retry_reports_attempts_to_balancer(self):
+        balancer = LeastOutstandingBalancer()
+        seen: list[int] = []
+
+        async def func(node: str, proxy: str | None) -> Result[str]:
+            seen.append(balancer.outstanding(node) + balancer.outstanding(proxy or ""))
+            return Result.ok("ok")
+
+        res = await retry_with_node_and_proxy(1, NODES, ["p1"], func, balancer=balancer)
+        assert res.is_ok()
+        assert seen == [2]
+        assert balancer.outstanding(res.context["retry_logs"][0]["node"]) == 0
+        assert balancer.latency("p1") is not None
+
+    async def test_retry_round_robin_spreads_nodes_and_proxies(self):
+        balancer = RoundRobinBalancer()
+        pairs: Counter[tuple[str, str | None]] = Counter()
+
+        async def func(node: str, proxy: str | None) -> Result[str]:
+            pairs[(node, proxy)] += 1
+            return Result.ok("ok")
+
+        for _ in range(100):
+            await retry_with_node_and_proxy(1, ["a", "b"], ["p", "q"], func, balancer=balancer)
+        assert Counter(node for node, _ in pairs.elements()) == {"a": 50, "b": 50}
+        assert Counter(proxy for _, proxy in pairs.elements()) == {"p": 50, "q": 50}
+
+    async def test_retry_consistent_hash_by_key(self):
+        balancer = ConsistentHashBalancer()
+        used: set[str] = set()
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            used.add(node)
+            return Result.ok(node)
+
+        for _ in range(10):
+            await retry_with_node_and_proxy(1, NODES, None, func, balancer=balancer, balance_key="0xabc")
+        assert len(used) == 1
+
+    async def test_retry_uses_pool_balancer(self):
+        pool = NodePool(NODES, balancer=RoundRobinBalancer())
+        used = []
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            used.append(node)
+            return Result.ok(node)
+
+        for _ in range(3):
+            await retry_with_node_and_proxy(1, pool, None, func)
+        assert used == NODES
+        assert pool.balancer is not None
+        assert pool.balancer.latency(NODES[0]) is not None
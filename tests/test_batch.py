@@ -0,0 +1,83 @@
+"""Tests for JSON-RPC micro-batching."""
+
+import asyncio
+import json
+
+import pytest
+from pytest_httpserver import HTTPServer
+from werkzeug import Request, Response
+
+from mm_web3 import ErrorClassifier, JsonRpcBatcher
+
+
+class TestJsonRpcBatcher:
+    @pytest.fixture
+    def http_server(self):
+        server = HTTPServer(host="127.0.0.1", port=0)
+        server.start()
+        yield server
+        server.stop()
+
+    async def test_concurrent_calls_share_one_batch(self, http_server: HTTPServer):
+        batch_sizes = []
+
+        def handler(request: Request) -> Response:
+            payload = json.loads(request.data)
+            batch_sizes.append(len(payload))
+            body = [{"jsonrpc": "2.0", "id": item["id"], "result": item["params"][0] * 2} for item in payload]
+            return Response(json.dumps(body), content_type="application/json")
+
+        http_server.expect_request("/rpc").respond_with_handler(handler)
+        batcher = JsonRpcBatcher(http_server.url_for("/rpc"), None, retries=2, max_batch_size=20, max_wait=0.01)
+
+        results = await asyncio.gather(*(batcher.call("double", [i]) for i in range(50)))
+        assert [r.unwrap() for r in results] == [i * 2 for i in range(50)]
+        assert sorted(batch_sizes) == [10, 20, 20]
+
+    async def test_failed_items_are_resent(self, http_server: HTTPServer):
+        seen: dict[int, int] = {}
+
+        def handler(request: Request) -> Response:
+            body = []
+            for item in json.loads(request.data):
+                value = item["params"][0]
+                seen[value] = seen.get(value, 0) + 1
+                if value == 1 and seen[value] == 1:  # flaky once
+                    body.append({"jsonrpc": "2.0", "id": item["id"], "error": {"code": -32000, "message": "header not found"}})
+                elif value == 2:
+                    body.append({"jsonrpc": "2.0", "id": item["id"], "error": {"code": 3, "message": "execution reverted"}})
+                else:
+                    body.append({"jsonrpc": "2.0", "id": item["id"], "result": value})
+            return Response(json.dumps(body), content_type="application/json")
+
+        http_server.expect_request("/rpc").respond_with_handler(handler)
+        batcher = JsonRpcBatcher(http_server.url_for("/rpc"), None, retries=1, item_retries=2, classifier=ErrorClassifier())
+
+        results = await asyncio.gather(*(batcher.call("echo", [i]) for i in range(3)))
+        assert results[0].unwrap() == 0
+        assert results[1].unwrap() == 1
+        assert results[2].is_err()
+        assert "execution reverted" in results[2].unwrap_err()
+        assert seen == {0: 1, 1: 2, 2: 1}  # the fatal item is not re-sent
+
+    async def test_transport_error_fails_every_call(self, http_server: HTTPServer):
+        http_server.expect_request("/rpc").respond_with_response(Response(status=500))
+        batcher = JsonRpcBatcher(http_server.url_for("/rpc"), None, retries=2)
+
+        results = await asyncio.gather(*(batcher.call("eth_blockNumber") for _ in range(3)))
+        assert all(r.is_err() for r in results)
+        assert all(len(r.context["retry_logs"]) == 2 for r in results)
+
+    async def test_drain_sends_pending_calls(self, http_server: HTTPServer):
+        def handler(request: Request) -> Response:
+            body = [{"jsonrpc": "2.0", "id": item["id"], "result": "0x1"} for item in json.loads(request.data)]
+            return Response(json.dumps(body), content_type="application/json")
+
+        http_server.expect_request("/rpc").respond_with_handler(handler)
+        batcher = JsonRpcBatcher(http_server.url_for("/rpc"), None, retries=1, max_wait=60)
+
+        task = asyncio.create_task(batcher.call("eth_blockNumber"))
+        await asyncio.sleep(0)
+        await batcher.drain()
+        assert (await task).unwrap() == "0x1"
+        assert batcher.batches == 1
@@ -0,0 +1,79 @@
+"""Tests for RetryBudget."""
+
+import asyncio
+import time
+
+import pytest
+from mm_result import Result
+
+from mm_web3 import Hedge, RetryBudget, retry_with_node_and_proxy, retry_with_proxy_sync
+
+
+class TestRetryBudget:
+    def test_ratio_of_first_attempts(self):
+        budget = RetryBudget(ratio=0.2, min_retries=0)
+        for _ in range(50):
+            budget.record_first_attempt()
+        assert budget.available == 10
+        assert all(budget.try_retry() for _ in range(10))
+        assert not budget.try_retry()
+        assert (budget.first_attempts, budget.retries, budget.rejected) == (50, 10, 1)
+
+    def test_min_retries(self):
+        budget = RetryBudget(ratio=0.1, min_retries=3)
+        assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+
+    def test_window_slides(self):
+        budget = RetryBudget(ratio=0, window=0.1, min_retries=1, buckets=2)
+        assert budget.try_retry()
+        assert not budget.try_retry()
+        time.sleep(0.12)
+        assert budget.available == 1
+        assert budget.try_retry()
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            RetryBudget(ratio=-1)
+        with pytest.raises(ValueError):
+            RetryBudget(window=0)
+
+
+class TestRetryBudgetInRetry:
+    async def test_spent_budget_fails_fast(self):
+        budget = RetryBudget(ratio=0, min_retries=2)
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.err("failure")
+
+        res = await retry_with_node_and_proxy(5, ["node1", "node2"], None, func, budget=budget)
+        assert res.unwrap_err() == "retry_budget_exhausted"
+        assert len(res.context["retry_logs"]) == 3
+        assert calls == 3
+
+        res = await retry_with_node_and_proxy(5, ["node1", "node2"], None, func, budget=budget)
+        assert len(res.context["retry_logs"]) == 1
+        assert (budget.first_attempts, budget.retries, budget.rejected) == (2, 2, 2)
+
+    async def test_budget_limits_hedges(self):
+        budget = RetryBudget(ratio=0, min_retries=0)
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            await asyncio.sleep(0.1)
+            return Result.ok(node)
+
+        res = await retry_with_node_and_proxy(3, ["node1", "node2"], None, func, hedge=Hedge(delay=0.01), budget=budget)
+        assert res.is_ok()
+        assert len(res.context["retry_logs"]) == 1
+        assert budget.rejected == 1  # hedging stops after the first rejection
+
+    def test_sync_helpers_share_budget(self):
+        budget = RetryBudget(ratio=0, min_retries=1)
+
+        def func(_proxy: str | None) -> Result[str]:
+            return Result.err("failure")
+
+        assert len(retry_with_proxy_sync(3, ["proxy1", "proxy2"], func, budget=budget).context["retry_logs"]) == 2
+        assert budget.rejected == 1
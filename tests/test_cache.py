@@ -0,0 +1,126 @@
+"""Tests for the response cache."""
+
+import asyncio
+
+import pytest
+from mm_result import Result
+
+from mm_web3 import CircuitBreakers, NodePool, ResponseCache, retry_with_node_and_proxy
+
+
+class TestResponseCache:
+    async def test_wraps_whole_retry_call(self):
+        cache = ResponseCache(ttl=60)
+        pool = NodePool(["node1", "node2"])
+        calls = []
+
+        async def chain_id(node: str, _proxy: str | None) -> Result[int]:
+            calls.append(node)
+            return Result.ok(1)
+
+        for _ in range(10):
+            result = await cache.get_or_call("chain_id", lambda: retry_with_node_and_proxy(3, pool, None, chain_id))
+            assert result.value == 1
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (9, 1)
+        assert sum(pool.stats(url).requests for url in ["node1", "node2"]) == 1
+
+    async def test_cached_error_is_not_an_attempt(self):
+        cache = ResponseCache(negative_ttl=60)
+        breakers = CircuitBreakers(failure_threshold=1)
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[int]:
+            nonlocal calls
+            calls += 1
+            return Result.err("failure")
+
+        nodes = ["node1", "node2", "node3"]
+        for _ in range(5):
+            result = await cache.get_or_call("key", lambda: retry_with_node_and_proxy(1, nodes, None, func, breakers=breakers))
+            assert result.error == "failure"
+        assert calls == 1
+        assert sum(breakers.is_available(url) for url in nodes) == 2  # only the node actually called was opened
+
+    async def test_ttl_expiry(self):
+        cache = ResponseCache(ttl=0.01)
+        calls = 0
+
+        async def func(_proxy: str | None) -> Result[int]:
+            nonlocal calls
+            calls += 1
+            return Result.ok(calls)
+
+        cached = cache.wrap_proxy("key", func)
+        assert (await cached(None)).value == 1
+        assert (await cached(None)).value == 1
+        await asyncio.sleep(0.02)
+        assert (await cached(None)).value == 2
+
+    async def test_negative_ttl(self):
+        async def func(_proxy: str | None) -> Result[int]:
+            return Result.err("failure")
+
+        no_negative = ResponseCache()
+        await no_negative.wrap_proxy("key", func)(None)
+        assert len(no_negative) == 0
+
+        negative = ResponseCache(negative_ttl=60)
+        cached = negative.wrap_proxy("key", func)
+        await cached(None)
+        await cached(None)
+        assert (negative.hits, negative.misses) == (1, 1)
+
+    async def test_lru_eviction(self):
+        cache = ResponseCache(maxsize=2)
+
+        async def func(_proxy: str | None) -> Result[int]:
+            return Result.ok(1)
+
+        await cache.wrap_proxy("a", func)(None)
+        await cache.wrap_proxy("b", func)(None)
+        await cache.wrap_proxy("a", func)(None)  # "a" becomes the most recently used
+        await cache.wrap_proxy("c", func)(None)  # evicts "b"
+        assert len(cache) == 2
+        await cache.wrap_proxy("a", func)(None)
+        await cache.wrap_proxy("b", func)(None)
+        assert cache.misses == 4
+
+    async def test_stale_while_revalidate(self):
+        cache = ResponseCache(ttl=0.05, stale_while_revalidate=60)
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[int]:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return Result.ok(calls)
+
+        cached = cache.wrap("block", func)
+        assert (await cached("node1", None)).value == 1
+        await asyncio.sleep(0.06)
+        assert (await cached("node1", None)).value == 1  # stale, refresh started
+        assert (await cached("node1", None)).value == 1  # still stale, no second refresh
+        await asyncio.sleep(0.02)
+        assert (await cached("node1", None)).value == 2
+        assert calls == 2
+        assert cache.stale_hits == 2
+
+    async def test_invalidate(self):
+        cache = ResponseCache()
+
+        async def func(_proxy: str | None) -> Result[int]:
+            return Result.ok(1)
+
+        await cache.wrap_proxy("a", func)(None)
+        await cache.wrap_proxy("b", func)(None)
+        cache.invalidate("a")
+        assert len(cache) == 1
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError, match="maxsize"):
+            ResponseCache(maxsize=0)
+        with pytest.raises(ValueError, match="ttl"):
+            ResponseCache(ttl=0)
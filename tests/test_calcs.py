@@ -1,14 +1,20 @@
+import random
+from array import array
 from decimal import Decimal
 from unittest.mock import patch
 
 import pytest
 
 from mm_web3.calcs import (
-    _get_suffix,
-    _parse_random_function,
-    _split_on_plus_minus_tokens,
+    UnitTable,
+    _Chain,
+    _Constant,
+    _Operation,
+    _tokenize,
+    _Variable,
     calc_decimal_expression,
     calc_expression_with_vars,
+    compile_expression,
     convert_value_with_units,
 )
 
@@ -70,6 +76,14 @@ class TestConvertValueWithUnits:
         unit_decimals = {"eth": 18}
         assert convert_value_with_units("  1.5eth  ", unit_decimals) == int(Decimal("1.5") * 10**18)
 
+    def test_longest_suffix_wins(self) -> None:
+        assert convert_value_with_units("1gwei", {"wei": 0, "gwei": 9}) == 10**9
+        assert convert_value_with_units("1wei", {"wei": 0, "gwei": 9}) == 1
+
+    def test_unit_without_number(self) -> None:
+        with pytest.raises(ValueError, match="illegal value: eth"):
+            convert_value_with_units("eth", {"eth": 18})
+
     def test_negative_value_error(self) -> None:
         with pytest.raises(ValueError, match="negative value is illegal"):
             convert_value_with_units("-1eth", {"eth": 18})
@@ -79,6 +93,39 @@ class TestConvertValueWithUnits:
             convert_value_with_units("1btc", {"eth": 18})
 
 
+class TestUnitTable:
+    def test_decimals_and_powers(self) -> None:
+        units = UnitTable({"ETH": 18, "gwei": 9, "wei": 0})
+        assert units.decimals == {"eth": 18, "gwei": 9, "wei": 0}
+        assert units.powers == {"eth": 10**18, "gwei": 10**9, "wei": 1}
+        assert "eth" in units
+        assert "ETH" not in units
+        assert len(units) == 3
+
+    def test_longest_suffix(self) -> None:
+        units = UnitTable({"wei": 0, "gwei": 9, "t": 6})
+        assert units.match("1gwei") == "gwei"
+        assert units.match("1wei") == "wei"
+        assert units.match("1.5t") == "t"
+        assert units.match("100") is None
+        assert units.match("1btc") is None
+        assert units.match("") is None
+
+    def test_invalid_units(self) -> None:
+        with pytest.raises(ValueError, match="unit name is empty"):
+            UnitTable({"": 1})
+        with pytest.raises(ValueError, match="unit decimals must be non-negative"):
+            UnitTable({"eth": -1})
+
+    def test_accepted_by_calcs(self) -> None:
+        units = UnitTable({"wei": 0, "gwei": 9, "eth": 18})
+        assert convert_value_with_units("2gwei", units) == 2 * 10**9
+        assert calc_expression_with_vars("0.5balance + 1gwei", {"balance": 10}, units) == 10**9 + 5
+        assert compile_expression("1eth - 1wei", units).evaluate() == 10**18 - 1
+        with pytest.raises(ValueError, match="variable name conflicts with unit suffix"):
+            compile_expression("1", units, ["GWEI"])
+
+
 class TestCalcExpressionWithVars:
     def test_simple_arithmetic(self) -> None:
         assert calc_expression_with_vars("100 + 50") == 150
@@ -184,71 +231,314 @@ class TestCalcExpressionWithVars:
             calc_expression_with_vars("1.5eth", variables=variables_conflict, unit_decimals=suffix_decimals)
 
 
-class TestParseRandomFunction:
+class TestCompileExpression:
+    def test_matches_calc_expression_with_vars(self) -> None:
+        unit_decimals = {"eth": 18, "gwei": 9}
+        expressions = ["100 + 50 - 20", "0.5balance + 1gwei - 100", "1.5eth - fee", "balance - 0.1fee + 2eth", "0.3333balance"]
+        for expression in expressions:
+            compiled = compile_expression(expression, unit_decimals, ["balance", "fee"])
+            for balance in [0, 1, 7, 10**18, 123456789123456789]:
+                variables = {"balance": balance, "fee": 21000}
+                assert compiled.evaluate(variables) == calc_expression_with_vars(expression, variables, unit_decimals)
+
+    def test_constants_are_folded(self) -> None:
+        unit_decimals = {"eth": 18, "gwei": 9}
+        compiled = compile_expression("1eth + 100gwei - 5 * max(1, 2)", unit_decimals)
+        assert compiled.root == _Constant(10**18 + 100 * 10**9 - 10)
+        compiled = compile_expression("balance + (1eth - 100gwei)", unit_decimals, ["balance"])
+        assert compiled.root == _Chain(_Variable("balance"), (_Operation("+", _Constant(10**18 - 100 * 10**9), 8),))
+        compiled = compile_expression("2 * 3 * balance / 4", var_names=["balance"])
+        assert compiled.root == _Chain(
+            _Constant(6), (_Operation("*", _Variable("balance"), 6), _Operation("/", _Constant(4), 16))
+        )
+
+    @patch("mm_web3.calcs.random.randint")
+    def test_random_drawn_per_evaluation(self, mock_randint) -> None:
+        mock_randint.side_effect = [10**9, 2 * 10**9]
+        compiled = compile_expression("balance - random(1gwei, 2gwei)", {"gwei": 9}, ["balance"])
+        assert compiled.evaluate({"balance": 10**10}) == 9 * 10**9
+        assert compiled.evaluate({"balance": 10**10}) == 8 * 10**9
+        mock_randint.assert_called_with(10**9, 2 * 10**9)
+
+    def test_variable_names_case_insensitive(self) -> None:
+        compiled = compile_expression("0.5BALANCE", var_names=["Balance"])
+        assert compiled.var_names == ("Balance",)
+        assert compiled.evaluate({"Balance": 100}) == 50
+        assert compiled.evaluate({"balance": 100}) == 50
+
+    def test_missing_variable(self) -> None:
+        compiled = compile_expression("balance + 1", var_names=["balance", "fee"])
+        assert compiled.evaluate({"balance": 1}) == 2
+        with pytest.raises(ValueError, match="missing variable: balance"):
+            compiled.evaluate({"fee": 1})
+
+    def test_immutable(self) -> None:
+        compiled = compile_expression("100")
+        with pytest.raises(AttributeError):
+            compiled.root = _Constant(5)  # type: ignore[misc]
+
+    def test_errors_at_compile_time(self) -> None:
+        with pytest.raises(ValueError, match="unrecognized term"):
+            compile_expression("balance + fee", var_names=["balance"])
+        with pytest.raises(ValueError, match="random range invalid"):
+            compile_expression("random(3, 1)")
+        with pytest.raises(ValueError, match="variable name conflicts with unit suffix"):
+            compile_expression("1eth", {"eth": 18}, ["ETH"])
+        with pytest.raises(TypeError):
+            compile_expression(123)  # type: ignore[arg-type]
+
+
+class TestExpressionGrammar:
+    def test_multiplication_and_division(self) -> None:
+        assert calc_expression_with_vars("2 * 3 + 4") == 10
+        assert calc_expression_with_vars("2 + 3 * 4") == 14
+        assert calc_expression_with_vars("1eth * 3 / 4", unit_decimals={"eth": 18}) == 75 * 10**16
+        assert calc_expression_with_vars("balance / 3", {"balance": 100}) == 33
+
+    def test_division_truncates_toward_zero(self) -> None:
+        assert calc_expression_with_vars("7 / 2") == 3
+        assert calc_expression_with_vars("-7 / 2") == -3
+        assert calc_expression_with_vars("7 / (-2)") == -3
+        assert calc_expression_with_vars("(0 - 7) / (0 - 2)") == 3
+
+    def test_division_by_zero(self) -> None:
+        with pytest.raises(ValueError, match="division by zero at position 2"):
+            calc_expression_with_vars("1 / 0")
+        compiled = compile_expression("100 / fee", var_names=["fee"])
+        assert compiled.evaluate({"fee": 3}) == 33
+        with pytest.raises(ValueError, match="division by zero at position 4"):
+            compiled.evaluate({"fee": 0})
+
+    def test_parentheses(self) -> None:
+        assert calc_expression_with_vars("(2 + 3) * 4") == 20
+        assert calc_expression_with_vars("2 * (3 - 5)") == -4
+        assert calc_expression_with_vars("-(2 + 3)") == -5
+        with pytest.raises(ValueError, match="unexpected end at position 6"):
+            calc_expression_with_vars("(2 + 3")
+
+    def test_sign_only_at_start_of_group(self) -> None:
+        with pytest.raises(ValueError, match="unexpected '-' at position 4"):
+            calc_expression_with_vars("2 * -3")
+
+    def test_min_max_clamp(self) -> None:
+        unit_decimals = {"eth": 18}
+        variables = {"balance": 12 * 10**18, "fee": 10**16}
+        assert calc_expression_with_vars("min(balance - fee, 10eth)", variables, unit_decimals) == 10 * 10**18
+        assert calc_expression_with_vars("max(balance - fee, 20eth)", variables, unit_decimals) == 20 * 10**18
+        assert calc_expression_with_vars("min(5, 3, 4)") == 3
+        assert calc_expression_with_vars("clamp(0.5balance, 1eth, 2eth)", variables, unit_decimals) == 2 * 10**18
+        assert calc_expression_with_vars("clamp(0.01balance, 1eth, 2eth)", variables, unit_decimals) == 10**18
+        assert calc_expression_with_vars("clamp(balance / 8, 1eth, 2eth)", variables, unit_decimals) == 15 * 10**17
+
+    def test_function_errors(self) -> None:
+        with pytest.raises(ValueError, match="min function must have at least 2 arguments"):
+            calc_expression_with_vars("min(1)")
+        with pytest.raises(ValueError, match="clamp function must have exactly 3 arguments"):
+            calc_expression_with_vars("clamp(1, 2)")
+        with pytest.raises(ValueError, match="unknown function: avg at position 0"):
+            calc_expression_with_vars("avg(1, 2)")
+        with pytest.raises(ValueError, match="clamp range invalid, min > max"):
+            calc_expression_with_vars("clamp(1, 5, 2)")
+        compiled = compile_expression("clamp(1, low, 2)", var_names=["low"])
+        with pytest.raises(ValueError, match="clamp range invalid, min > max at position 0"):
+            compiled.evaluate({"low": 3})
+
+    def test_random_with_expression_bounds(self) -> None:
+        compiled = compile_expression("random(0.1balance, 0.2balance)", var_names=["balance"])
+        for _ in range(20):
+            assert 100 <= compiled.evaluate({"balance": 1000}) <= 200
+        with pytest.raises(ValueError, match="random range invalid, min > max at position 0"):
+            compiled.evaluate({"balance": -1000})
+
+    def test_exact_in_base_units(self) -> None:
+        balance = 123456789012345678901234567890123
+        assert calc_expression_with_vars("0.5balance", {"balance": balance}) == balance // 2
+        assert calc_expression_with_vars("3balance / 7", {"balance": balance}) == 3 * balance // 7
+        value = calc_expression_with_vars("123456789012345678901.123456789012345678eth", unit_decimals={"eth": 18})
+        assert value == 123456789012345678901123456789012345678
+
+
+class TestEvaluateBatch:
+    def test_matches_scalar_evaluation(self) -> None:
+        unit_decimals = {"eth": 18, "gwei": 9}
+        expressions = [
+            "0.5balance + 1gwei - 100",
+            "-balance",
+            "min(balance - fee, 10eth) / 3",
+            "clamp(0.3333balance, 1gwei, 2eth) * 2",
+            "(balance - 0.1fee) / (fee + 1)",
+            "1eth",
+        ]
+        balances = [0, 1, 7, 10**18, 123456789123456789123, -5]
+        fees = [21000, 0, 3, 10**16, 1, 99]
+        for expression in expressions:
+            compiled = compile_expression(expression, unit_decimals, ["balance", "fee"])
+            expected = [compiled.evaluate({"balance": b, "fee": f}) for b, f in zip(balances, fees, strict=True)]
+            assert compiled.evaluate_batch({"balance": balances, "fee": fees}) == expected
+
+    def test_random_matches_scalar_evaluation(self) -> None:
+        compiled = compile_expression("0.5balance - random(1gwei, 2gwei)", {"gwei": 9}, ["balance"])
+        balances = list(range(10**10, 10**10 + 1000))
+        random.seed(42)
+        expected = [compiled.evaluate({"balance": balance}) for balance in balances]
+        random.seed(42)
+        assert compiled.evaluate_batch({"balance": balances}) == expected
+
+    def test_random_with_variable_bounds(self) -> None:
+        compiled = compile_expression("random(0.1balance, 0.2balance)", var_names=["balance"])
+        balances = [1000, 2000, 3000]
+        random.seed(7)
+        expected = [compiled.evaluate({"balance": balance}) for balance in balances]
+        random.seed(7)
+        assert compiled.evaluate_batch({"balance": balances}) == expected
+
+    def test_array_columns(self) -> None:
+        compiled = compile_expression("balance - fee", var_names=["balance", "fee"])
+        result = compiled.evaluate_batch({"balance": array("q", [10, 20, 30]), "fee": (1, 2, 3)})
+        assert result == [9, 18, 27]
+
+    def test_numpy_columns(self) -> None:
+        np = pytest.importorskip("numpy")
+        compiled = compile_expression("0.5balance * 10eth", {"eth": 18}, ["balance"])
+        result = compiled.evaluate_batch({"balance": np.array([1, 2, 3], dtype=np.int64)})
+        assert result == [5 * 10**18, 10 * 10**18, 15 * 10**18]
+        assert all(type(value) is int for value in result)
+
+    def test_result_does_not_alias_column(self) -> None:
+        balances = [1, 2, 3]
+        result = compile_expression("balance", var_names=["balance"]).evaluate_batch({"balance": balances})
+        result[0] = 100
+        assert balances == [1, 2, 3]
+
+    def test_size(self) -> None:
+        assert compile_expression("1 + 2").evaluate_batch({}, size=3) == [3, 3, 3]
+        with pytest.raises(ValueError, match="size is required"):
+            compile_expression("1 + 2").evaluate_batch({})
+
+    def test_errors(self) -> None:
+        compiled = compile_expression("balance / fee", var_names=["balance", "fee"])
+        with pytest.raises(ValueError, match="columns must have the same length"):
+            compiled.evaluate_batch({"balance": [1, 2], "fee": [1]})
+        with pytest.raises(ValueError, match="missing variable: fee"):
+            compiled.evaluate_batch({"balance": [1, 2]})
+        with pytest.raises(ValueError, match="division by zero at position 8"):
+            compiled.evaluate_batch({"balance": [1, 2], "fee": [1, 0]})
+
+
+class TestRandomFunction:
     @patch("mm_web3.calcs.random.randint")
     def test_valid_random_function(self, mock_randint) -> None:
         unit_decimals = {"gwei": 9}
         mock_randint.return_value = 5 * 10**9
-        result = _parse_random_function("random(1gwei, 10gwei)", unit_decimals)
+        result = calc_expression_with_vars("random(1gwei, 10gwei)", unit_decimals=unit_decimals)
         assert result == 5 * 10**9
         mock_randint.assert_called_once_with(10**9, 10 * 10**9)
 
     def test_invalid_arguments_count(self) -> None:
-        with pytest.raises(ValueError, match="random function must have exactly 2 arguments"):
-            _parse_random_function("random(1)", {})
+        with pytest.raises(ValueError, match="random function must have exactly 2 arguments at position 0"):
+            calc_expression_with_vars("random(1)")
 
-        with pytest.raises(ValueError, match="random function must have exactly 2 arguments"):
-            _parse_random_function("random(1, 2, 3)", {})
+        with pytest.raises(ValueError, match="random function must have exactly 2 arguments at position 4"):
+            calc_expression_with_vars("1 + random(1, 2, 3)")
 
     def test_invalid_range(self) -> None:
         with pytest.raises(ValueError, match="random range invalid, min > max"):
-            _parse_random_function("random(10, 5)", {})
-
-
-class TestGetSuffix:
-    def test_finds_matching_suffix(self) -> None:
-        unit_decimals = {"eth": 18, "gwei": 9}
-        assert _get_suffix("1eth", unit_decimals) == "eth"
-        assert _get_suffix("100gwei", unit_decimals) == "gwei"
-
-    def test_no_matching_suffix(self) -> None:
-        unit_decimals = {"eth": 18}
-        assert _get_suffix("100", unit_decimals) is None
-        assert _get_suffix("1btc", unit_decimals) is None
-
-    def test_returns_first_match(self) -> None:
-        # Test that it returns first matching suffix when multiple could match
-        unit_decimals = {"wei": 0, "gwei": 9}
-        assert _get_suffix("1gwei", unit_decimals) in ["wei", "gwei"]
-
-
-class TestSplitOnPlusMinusTokens:
-    def test_simple_expressions(self) -> None:
-        assert _split_on_plus_minus_tokens("100") == ["+100"]
-        assert _split_on_plus_minus_tokens("+100") == ["+100"]
-        assert _split_on_plus_minus_tokens("-100") == ["-100"]
-
-    def test_complex_expressions(self) -> None:
-        assert _split_on_plus_minus_tokens("100+50") == ["+100", "+50"]
-        assert _split_on_plus_minus_tokens("100-50") == ["+100", "-50"]
-        assert _split_on_plus_minus_tokens("100+50-20") == ["+100", "+50", "-20"]
-        assert _split_on_plus_minus_tokens("-100+50") == ["-100", "+50"]
-
-    def test_whitespace_removal(self) -> None:
-        assert _split_on_plus_minus_tokens("100 + 50 - 20") == ["+100", "+50", "-20"]
-
-    def test_error_conditions(self) -> None:
+            calc_expression_with_vars("random(10, 5)")
+
+    def test_bound_error_position(self) -> None:
+        with pytest.raises(ValueError, match="unknown unit: btc at position 15"):
+            calc_expression_with_vars("random(1gwei, 2btc)", unit_decimals={"gwei": 9})
+
+
+class TestTokenize:
+    def test_positions(self) -> None:
+        tokens = _tokenize("0.5balance - random(1gwei, 2)")
+        assert [(t.kind, t.text, t.position) for t in tokens] == [
+            ("number", "0.5", 0),
+            ("name", "balance", 3),
+            ("op", "-", 11),
+            ("name", "random", 13),
+            ("op", "(", 19),
+            ("number", "1", 20),
+            ("name", "gwei", 21),
+            ("op", ",", 25),
+            ("number", "2", 27),
+            ("op", ")", 28),
+            ("end", "", 29),
+        ]
+
+    def test_empty(self) -> None:
+        assert [t.kind for t in _tokenize("   ")] == ["end"]
+
+    def test_unexpected_character(self) -> None:
+        with pytest.raises(ValueError, match="unexpected character '@' at position 4"):
+            _tokenize("100 @ 5")
+
+    def test_underscores_group_digits(self) -> None:
+        assert [t.text for t in _tokenize("1_000eth + 0.000_5")] == ["1_000", "eth", "+", "0.000_5", ""]
+        assert calc_expression_with_vars("1_000eth", unit_decimals={"eth": 18}) == 1000 * 10**18
+        with pytest.raises(ValueError, match="unknown unit: _ at position 1"):
+            calc_expression_with_vars("1_")
+        with pytest.raises(ValueError, match="unknown unit: __0 at position 1"):
+            calc_expression_with_vars("1__0")
+
+    def test_exponents(self) -> None:
+        assert [t.text for t in _tokenize("1e18wei + 1.5E-3eth")] == ["1e18", "wei", "+", "1.5E-3", "eth", ""]
+        assert calc_expression_with_vars("1e3") == 1000
+        assert calc_expression_with_vars("1e18wei", unit_decimals={"wei": 0}) == 10**18
+        assert calc_expression_with_vars("1.5e9gwei", unit_decimals={"gwei": 9}) == 15 * 10**17
+        assert calc_expression_with_vars("1e3balance", {"balance": 5}) == 5000
+        assert calc_expression_with_vars("1eth", unit_decimals={"eth": 18}) == 10**18
+        with pytest.raises(ValueError, match="fractional number needs a unit: 1e-3 at position 0"):
+            calc_expression_with_vars("1e-3")
+        with pytest.raises(ValueError, match="exponent out of range: 1e1000 at position 0"):
+            calc_expression_with_vars("1e1000wei", unit_decimals={"wei": 0})
+
+    def test_long_chains_do_not_recurse(self) -> None:
+        expression = " + ".join(["0.5balance"] * 1200)
+        compiled = compile_expression(expression, var_names=["balance"])
+        assert compiled.evaluate({"balance": 2}) == 1200
+        assert compiled.evaluate_batch({"balance": [2, 4]}) == [1200, 2400]
+        assert calc_expression_with_vars(" * ".join(["balance"] * 1200), {"balance": 1}) == 1
+
+    def test_nesting_depth_is_limited(self) -> None:
+        assert calc_expression_with_vars("(" * 100 + "balance" + ")" * 100, {"balance": 1}) == 1
+        with pytest.raises(ValueError, match="expression nested deeper than 100 levels at position 100"):
+            calc_expression_with_vars("(" * 400 + "balance" + ")" * 400, {"balance": 1})
+        with pytest.raises(ValueError, match="expression nested deeper than 100 levels at position 703"):
+            calc_expression_with_vars("max(1, " * 101 + "2" + ")" * 101)
+
+    def test_long_expression(self) -> None:
+        expression = " + ".join(["1gwei"] * 20000)
+        assert len(_tokenize(expression)) == 3 * 20000
+        assert calc_expression_with_vars(expression, unit_decimals={"gwei": 9}) == 20000 * 10**9
+
+
+class TestParseErrors:
+    def test_empty(self) -> None:
         with pytest.raises(ValueError, match="value is empty"):
-            _split_on_plus_minus_tokens("")
-
-        with pytest.raises(ValueError, match=r"\+\+ in value"):
-            _split_on_plus_minus_tokens("100++50")
-
-        with pytest.raises(ValueError, match="-- in value"):
-            _split_on_plus_minus_tokens("100--50")
-
-        with pytest.raises(ValueError, match="ends with -"):
-            _split_on_plus_minus_tokens("100-")
-
-        with pytest.raises(ValueError, match=r"ends with \+"):
-            _split_on_plus_minus_tokens("100+")
+            calc_expression_with_vars("")
+        with pytest.raises(ValueError, match="value is empty"):
+            calc_expression_with_vars("   ")
+
+    def test_sign_without_term(self) -> None:
+        with pytest.raises(ValueError, match=r"unexpected '\+' at position 4"):
+            calc_expression_with_vars("100++50")
+        with pytest.raises(ValueError, match="unexpected '-' at position 4"):
+            calc_expression_with_vars("100--50")
+        with pytest.raises(ValueError, match="unexpected end at position 4"):
+            calc_expression_with_vars("100-")
+        with pytest.raises(ValueError, match="unexpected end at position 4"):
+            calc_expression_with_vars("100+")
+
+    def test_missing_operator(self) -> None:
+        with pytest.raises(ValueError, match="unexpected '2' at position 12"):
+            calc_expression_with_vars("balance + 1 2", {"balance": 1})
+
+    def test_fractional_number_needs_unit(self) -> None:
+        with pytest.raises(ValueError, match=r"fractional number needs a unit: 1\.5 at position 6"):
+            calc_expression_with_vars("100 + 1.5")
+
+    def test_unit_matched_by_whole_name(self) -> None:
+        unit_decimals = {"wei": 0, "gwei": 9}
+        assert calc_expression_with_vars("1gwei + 1wei", unit_decimals=unit_decimals) == 10**9 + 1
@@ -0,0 +1,78 @@
+"""Tests for circuit breakers."""
+
+import time
+
+import pytest
+
+from mm_web3 import CircuitBreakers, CircuitState
+
+
+class TestCircuitBreakers:
+    def test_opens_after_threshold(self):
+        breakers = CircuitBreakers(failure_threshold=2, reset_timeout=60)
+        assert breakers.state("node1") == CircuitState.CLOSED
+
+        breakers.record_failure("node1")
+        assert breakers.allow("node1")
+        breakers.record_failure("node1")
+        assert breakers.state("node1") == CircuitState.OPEN
+        assert not breakers.allow("node1")
+        assert breakers.allow("node2")
+
+    def test_success_resets_consecutive_failures(self):
+        breakers = CircuitBreakers(failure_threshold=2)
+        breakers.record_failure("node1")
+        breakers.record_success("node1")
+        breakers.record_failure("node1")
+        assert breakers.state("node1") == CircuitState.CLOSED
+
+    def test_half_open_allows_limited_trials(self):
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=0.01)
+        breakers.record_failure("node1")
+        assert not breakers.is_available("node1")
+
+        time.sleep(0.02)
+        assert breakers.state("node1") == CircuitState.HALF_OPEN
+        assert breakers.allow("node1")
+        assert not breakers.allow("node1")  # the only trial slot is taken
+
+        breakers.record_success("node1")
+        assert breakers.state("node1") == CircuitState.CLOSED
+
+    def test_release_returns_trial_slot(self):
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=0.01)
+        breakers.release("node1")  # no breaker yet, nothing to release
+        breakers.record_failure("node1")
+        time.sleep(0.02)
+        assert breakers.allow("node1")
+        assert not breakers.is_available("node1")
+        breakers.release("node1")
+        assert breakers.state("node1") == CircuitState.HALF_OPEN
+        assert breakers.allow("node1")
+        breakers.release("node1")
+        breakers.release("node1")  # extra releases don't create slots
+        assert breakers.allow("node1")
+        assert not breakers.allow("node1")
+
+    def test_failed_trial_reopens(self):
+        breakers = CircuitBreakers(failure_threshold=3, reset_timeout=0.01)
+        for _ in range(3):
+            breakers.record_failure("node1")
+        time.sleep(0.02)
+        assert breakers.allow("node1")
+        breakers.record_failure("node1")
+        assert breakers.state("node1") == CircuitState.OPEN
+
+    def test_reset(self):
+        breakers = CircuitBreakers(failure_threshold=1)
+        breakers.record_failure("node1")
+        breakers.record_failure("node2")
+        breakers.reset("node1")
+        assert breakers.state("node1") == CircuitState.CLOSED
+        assert breakers.state("node2") == CircuitState.OPEN
+        breakers.reset()
+        assert breakers.state("node2") == CircuitState.CLOSED
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError, match="failure_threshold"):
+            CircuitBreakers(failure_threshold=0)
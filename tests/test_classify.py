@@ -0,0 +1,55 @@
+"""Tests for error classification."""
+
+from mm_result import Result
+
+from mm_web3 import ErrorClassifier, ErrorKind
+
+
+class TestErrorClassifier:
+    def test_builtin_rules(self):
+        classifier = ErrorClassifier()
+        assert classifier.classify(Result.err("Execution reverted: ERC20: transfer amount exceeds balance")) == ErrorKind.FATAL
+        assert classifier.classify(Result.err("invalid params")) == ErrorKind.FATAL
+        assert classifier.classify(Result.err("HTTP 429 Too Many Requests")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("timeout")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("something odd")) == ErrorKind.RETRY
+
+    def test_status_codes_need_http_context(self):
+        classifier = ErrorClassifier()
+        assert classifier.classify(Result.err("HTTP 429")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("bad status: status_code=503")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("502 Bad Gateway")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("transfer to 0x4290a1 failed")) == ErrorKind.RETRY
+        assert classifier.classify(Result.err("amount 429 is below the minimum")) == ErrorKind.RETRY
+
+    def test_patterns_match_whole_words(self):
+        classifier = ErrorClassifier()
+        assert classifier.classify(Result.err("connection refused")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("read timed out")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("rate limited")) == ErrorKind.SWITCH_NODE
+        assert classifier.classify(Result.err("connection pool is full")) == ErrorKind.RETRY
+        assert classifier.classify(Result.err("proxy error")) == ErrorKind.RETRY
+        assert classifier.classify(Result.err("timeouts_config missing")) == ErrorKind.RETRY
+
+    def test_exception_text_is_matched(self):
+        classifier = ErrorClassifier()
+        assert classifier.classify(Result.err(("rpc_error", ValueError("execution reverted")))) == ErrorKind.FATAL
+
+    def test_user_rules_take_precedence(self):
+        classifier = ErrorClassifier(rules={"Timeout": ErrorKind.RETRY, "bad token": ErrorKind.FATAL})
+        assert classifier.classify(Result.err("timeout")) == ErrorKind.RETRY
+        assert classifier.classify(Result.err("bad token")) == ErrorKind.FATAL
+
+    def test_user_func_takes_precedence(self):
+        def func(res: Result[object]) -> ErrorKind | None:
+            if res.context and res.context.get("code") == -32000:
+                return ErrorKind.FATAL
+            return None
+
+        classifier = ErrorClassifier(func=func)
+        assert classifier.classify(Result.err("server error", {"code": -32000})) == ErrorKind.FATAL
+        assert classifier.classify(Result.err("timeout", {"code": 1})) == ErrorKind.SWITCH_NODE
+
+    def test_without_builtin_rules(self):
+        classifier = ErrorClassifier(builtin_rules=False, default=ErrorKind.SWITCH_NODE)
+        assert classifier.classify(Result.err("execution reverted")) == ErrorKind.SWITCH_NODE
@@ -0,0 +1,131 @@
+"""Tests for AdaptiveLimiter."""
+
+import asyncio
+
+import pytest
+from mm_result import Result
+
+from mm_web3 import AdaptiveLimiter, retry_with_node_and_proxy
+from mm_web3.concurrency import is_overload_error
+
+
+class TestAdaptiveLimiter:
+    async def test_additive_increase_when_window_is_full(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        for _ in range(20):
+            slots = [await limiter.acquire("node1") for _ in range(limiter.limit("node1"))]
+            for acquired_at in slots:
+                limiter.release("node1", acquired_at, Result.ok(1))
+        assert limiter.limit("node1") == 4
+        assert limiter.in_flight("node1") == 0
+
+    async def test_no_increase_when_underused(self):
+        limiter = AdaptiveLimiter(initial=4)
+        for _ in range(50):
+            limiter.release("node1", await limiter.acquire("node1"), Result.ok(1))
+        assert limiter.limit("node1") == 4
+
+    async def test_multiplicative_decrease_once_per_window(self):
+        limiter = AdaptiveLimiter(initial=16)
+        slots = [await limiter.acquire("node1") for _ in range(8)]
+        for acquired_at in slots:
+            limiter.release("node1", acquired_at, Result.err("HTTP 429 Too Many Requests"))
+        assert limiter.limit("node1") == 8
+
+        limiter.release("node1", await limiter.acquire("node1"), Result.err("timeout"))
+        assert limiter.limit("node1") == 4
+
+        limiter.release("node1", await limiter.acquire("node1"), Result.err("execution reverted"))
+        assert limiter.limit("node1") == 4
+
+    async def test_waiters_get_slots_in_order(self):
+        limiter = AdaptiveLimiter(initial=1)
+        first = await limiter.acquire("node1")
+        order: list[int] = []
+
+        async def wait(n: int) -> None:
+            acquired_at = await limiter.acquire("node1")
+            order.append(n)
+            limiter.release("node1", acquired_at, None)
+
+        tasks = [asyncio.create_task(wait(n)) for n in range(3)]
+        await asyncio.sleep(0.01)
+        assert order == []
+        limiter.release("node1", first, None)
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        limiter = AdaptiveLimiter(initial=1)
+        acquired_at = await limiter.acquire("node1")
+        task = asyncio.create_task(limiter.acquire("node1"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        limiter.release("node1", acquired_at, None)
+        assert limiter.in_flight("node1") == 0
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(initial=0)
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(initial=8, max_limit=4)
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(decrease=1)
+
+
+class TestIsOverloadError:
+    @pytest.mark.parametrize(
+        "error",
+        [
+            "HTTP 429",
+            "status code: 429",
+            "429 Too Many Requests",
+            "rate limited",
+            "read timeout",
+            "timed out",
+            "deadline_exceeded",
+        ],
+    )
+    def test_overload(self, error):
+        assert is_overload_error(Result.err(error))
+
+    @pytest.mark.parametrize(
+        "error",
+        ["insufficient funds for 0x4290a1b2c3d4e5f60718293a4b5c6d7e8f901234", "block 0x9f429c not found", "execution reverted"],
+    )
+    def test_not_overload(self, error):
+        assert not is_overload_error(Result.err(error))
+
+
+class TestAdaptiveLimiterInRetry:
+    async def test_bounds_in_flight_calls_per_node(self):
+        limiter = AdaptiveLimiter(initial=2)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.005)
+            in_flight -= 1
+            return Result.err("429 too many requests")
+
+        await asyncio.gather(*(retry_with_node_and_proxy(1, "node1", None, func, adaptive_limiter=limiter) for _ in range(10)))
+        assert max_in_flight == 2
+        assert limiter.limit("node1") == 1
+        assert limiter.in_flight("node1") == 0
+
+    async def test_deadline_counts_as_overload(self):
+        limiter = AdaptiveLimiter(initial=4)
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            await asyncio.sleep(1)
+            return Result.ok("late")
+
+        res = await retry_with_node_and_proxy(1, "node1", None, func, adaptive_limiter=limiter, deadline=0.02)
+        assert res.unwrap_err() == "deadline_exceeded"
+        assert limiter.limit("node1") == 2
+        assert limiter.in_flight("node1") == 0
@@ -1,6 +1,9 @@
+import asyncio
+
 import pytest
+from mm_result import Result
 
-from mm_web3 import random_node
+from mm_web3 import HeadTracker, NodePool, random_node
 
 
 class TestRandomNode:
@@ -33,3 +36,149 @@ class TestRandomNode:
 
         with pytest.raises(ValueError, match="No nodes provided"):
             random_node(())
+
+
+class TestNodePool:
+    """Test cases for the NodePool class."""
+
+    def test_normalizes_and_deduplicates_urls(self):
+        """Should remove trailing slashes and duplicates."""
+        pool = NodePool(["https://node1.com/", "https://node1.com", "https://node2.com"])
+        assert pool.urls == ("https://node1.com", "https://node2.com")
+        assert "https://node2.com" in pool
+        assert len(pool) == 2
+
+        with pytest.raises(ValueError, match="No nodes provided"):
+            NodePool([])
+
+    def test_record_updates_stats(self):
+        """Should track EWMA latency of successes and error rate of all attempts."""
+        pool = NodePool("https://node.com", alpha=0.5)
+        pool.record("https://node.com", 1.0, ok=True)
+        pool.record("https://node.com", 3.0, ok=True)
+        pool.record("https://node.com", 0.01, ok=False)
+
+        stats = pool.stats("https://node.com")
+        assert stats.requests == 3
+        assert stats.failures == 1
+        assert stats.latency == 2.0
+        assert stats.error_rate == 0.5
+
+        pool.record("https://unknown.com", 1.0, ok=False)  # ignored
+
+    def test_prefers_fast_and_healthy_nodes(self):
+        """Should send most traffic to the fast, healthy node."""
+        pool = NodePool(["https://fast.com", "https://slow.com", "https://broken.com"])
+        for _ in range(20):
+            pool.record("https://fast.com", 0.05, ok=True)
+            pool.record("https://slow.com", 2.0, ok=True)
+            pool.record("https://broken.com", 0.05, ok=False)
+
+        picks = [random_node(pool) for _ in range(1000)]
+        assert picks.count("https://fast.com") > 900
+        assert "https://broken.com" in pool.urls  # still present, just rarely picked
+
+    def test_fast_failures_do_not_win_traffic(self):
+        """Should not favour a node that fails instantly over a slower healthy one."""
+        pool = NodePool(["https://dead.com", "https://healthy.com"])
+        for _ in range(20):
+            pool.record("https://dead.com", 0.005, ok=False)
+            pool.record("https://healthy.com", 0.3, ok=True)
+
+        assert pool.stats("https://dead.com").latency is None
+        assert pool.weight("https://dead.com") < pool.weight("https://healthy.com") / 10
+        picks = [random_node(pool) for _ in range(1000)]
+        assert picks.count("https://healthy.com") > 850
+
+    def test_pick_excludes_nodes(self):
+        """Should skip excluded nodes unless all are excluded."""
+        pool = NodePool(["https://node1.com", "https://node2.com"])
+        assert all(pool.pick(exclude={"https://node1.com"}) == "https://node2.com" for _ in range(50))
+        assert pool.pick(exclude=set(pool.urls)) in pool.urls
+
+    def test_disabled_nodes_are_not_picked(self):
+        """Should skip disabled nodes unless every node is disabled."""
+        pool = NodePool(["https://node1.com", "https://node2.com"])
+        pool.disable("https://node1.com")
+        assert pool.enabled_urls == ("https://node2.com",)
+        assert all(random_node(pool) == "https://node2.com" for _ in range(50))
+
+        pool.disable("https://node2.com")
+        assert pool.enabled_urls == pool.urls
+
+        pool.enable("https://node1.com")
+        assert pool.enabled_urls == ("https://node1.com",)
+
+
+class TestHeadTracker:
+    """Test cases for the HeadTracker class."""
+
+    async def test_poll_disables_lagging_nodes(self):
+        """Should disable nodes behind the best head by more than max_lag and enable them once synced."""
+        heads = {"https://a.com": 100, "https://b.com": 98, "https://c.com": 80}
+        pool = NodePool(list(heads))
+
+        async def probe(url: str) -> Result[int]:
+            if url not in heads:
+                return Result.err("unreachable")
+            return Result.ok(heads[url])
+
+        tracker = HeadTracker(pool, probe, max_lag=5)
+        await tracker.poll()
+        assert pool.enabled_urls == ("https://a.com", "https://b.com")
+        assert pool.stats("https://c.com").lag == 20
+        assert pool.stats("https://b.com").head == 98
+
+        heads["https://c.com"] = 100
+        del heads["https://b.com"]  # failed probe keeps the previous state
+        await tracker.poll()
+        assert pool.enabled_urls == pool.urls
+        assert pool.stats("https://b.com").lag == 2
+
+    async def test_slow_probe_times_out(self):
+        """Should treat a probe slower than timeout as failed."""
+        pool = NodePool(["https://a.com", "https://b.com"])
+
+        async def probe(url: str) -> Result[int]:
+            if url == "https://b.com":
+                await asyncio.sleep(10)
+            return Result.ok(100)
+
+        await HeadTracker(pool, probe, timeout=0.01).poll()
+        assert pool.stats("https://a.com").head == 100
+        assert pool.stats("https://b.com").head is None
+
+    async def test_raising_probe_is_a_failed_probe(self):
+        """Should keep tracking the other nodes and keep polling when a probe raises."""
+        pool = NodePool(["https://a.com", "https://b.com"])
+        polls = 0
+
+        async def probe(url: str) -> Result[int]:
+            nonlocal polls
+            if url == "https://b.com":
+                raise ConnectionError("boom")
+            polls += 1
+            return Result.ok(100)
+
+        async with HeadTracker(pool, probe, interval=0.01):
+            assert pool.stats("https://a.com").head == 100
+            assert pool.stats("https://b.com").head is None
+            await asyncio.sleep(0.05)
+        assert polls >= 3
+
+    async def test_background_polling(self):
+        """Should poll periodically while running as a context manager."""
+        pool = NodePool(["https://a.com"])
+        polls = 0
+
+        async def probe(_url: str) -> Result[int]:
+            nonlocal polls
+            polls += 1
+            return Result.ok(polls)
+
+        async with HeadTracker(pool, probe, interval=0.01):
+            await asyncio.sleep(0.05)
+        stopped_at = polls
+        await asyncio.sleep(0.03)
+        assert stopped_at >= 3
+        assert polls == stopped_at
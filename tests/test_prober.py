@@ -0,0 +1,119 @@
+"""Tests for ProxyProber."""
+
+import asyncio
+import socket
+
+import pytest
+from pytest_httpserver import HTTPServer
+
+from mm_web3 import ProxyPool, ProxyProber
+
+PROBE_URL = "http://probe.test/ping"
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class TestProxyProber:
+    """Test cases for the ProxyProber class."""
+
+    @pytest.fixture
+    def proxy_server(self):
+        """Local HTTP server standing in for a working proxy."""
+        server = HTTPServer(host="127.0.0.1", port=0)
+        server.expect_request("/ping").respond_with_data("pong")
+        server.start()
+        yield server
+        server.stop()
+
+    async def test_poll_publishes_live_proxies(self, proxy_server: HTTPServer):
+        """Should keep only proxies that pass both phases and record their latencies."""
+        good = f"http://127.0.0.1:{proxy_server.port}"
+        dead = f"http://127.0.0.1:{_closed_port()}"
+        prober = ProxyProber([good, dead, "not-a-proxy"], PROBE_URL, concurrency=2, timeout=2)
+
+        assert await prober.poll() == [good]
+        assert prober.live == [good]
+
+        check = prober.checks[good]
+        assert check.ok
+        assert check.connect_latency is not None
+        assert check.response_time is not None
+        assert check.error is None
+
+        assert not prober.checks[dead].ok
+        assert prober.checks[dead].connect_latency is None
+        assert prober.checks["not-a-proxy"].error == "invalid proxy url"
+
+    async def test_failed_probe_request(self, proxy_server: HTTPServer):
+        """Should mark a proxy dead when the probe URL fails through it."""
+        proxy = f"http://127.0.0.1:{proxy_server.port}"
+        prober = ProxyProber([proxy], "http://probe.test/missing", timeout=2)
+
+        assert await prober.poll() == []
+        check = prober.checks[proxy]
+        assert not check.ok
+        assert check.connect_latency is not None
+        assert check.error
+
+    async def test_records_outcomes_in_pool(self, proxy_server: HTTPServer):
+        """Should feed check outcomes into a ProxyPool."""
+        good = f"http://127.0.0.1:{proxy_server.port}"
+        dead = f"http://127.0.0.1:{_closed_port()}"
+        pool = ProxyPool([good, dead], failure_threshold=1)
+        prober = ProxyProber(pool, PROBE_URL, timeout=2)
+
+        await prober.poll()
+        assert pool.active == [good]
+        assert pool.quarantined == [dead]
+
+    async def test_refreshes_list_from_source(self, proxy_server: HTTPServer):
+        """Should re-fetch the proxy list before polling and keep the previous list when the source fails."""
+        proxy = f"http://127.0.0.1:{proxy_server.port}"
+        proxy_server.expect_request("/proxies").respond_with_data(proxy)
+        prober = ProxyProber([], PROBE_URL, proxies_url=proxy_server.url_for("/proxies"), timeout=2)
+
+        assert await prober.poll() == [proxy]
+
+        prober.proxies_url = proxy_server.url_for("/gone")
+        assert await prober.poll() == [proxy]
+
+    async def test_background_polling(self, proxy_server: HTTPServer):
+        """Should poll on enter and then periodically until exit."""
+        proxy = f"http://127.0.0.1:{proxy_server.port}"
+        async with ProxyProber([proxy], PROBE_URL, interval=0.05, timeout=2) as prober:
+            assert prober.running
+            assert prober.live == [proxy]
+            prober.proxies.append(f"http://127.0.0.1:{_closed_port()}")
+            await asyncio.sleep(0.3)
+            assert len(prober.checks) == 2
+        assert not prober.running
+
+    async def test_failed_cycle_keeps_polling(self):
+        """Should keep polling in the background after a cycle raises."""
+        prober = ProxyProber([], PROBE_URL, interval=0.01)
+        polls = 0
+
+        async def poll() -> list[str]:
+            nonlocal polls
+            polls += 1
+            if polls == 1:
+                raise RuntimeError("boom")
+            return []
+
+        prober.poll = poll  # type: ignore[method-assign]
+        prober.start()
+        await asyncio.sleep(0.05)
+        assert prober.running
+        assert polls >= 3
+        await prober.stop()
+
+    def test_invalid_parameters(self):
+        """Should reject invalid configuration."""
+        with pytest.raises(ValueError):
+            ProxyProber([], PROBE_URL, concurrency=0)
+        with pytest.raises(ValueError):
+            ProxyProber([], PROBE_URL, interval=0)
@@ -1,10 +1,20 @@
 """Tests for proxy utilities."""
 
+import time
+
 import pytest
 from pytest_httpserver import HTTPServer
 from werkzeug import Request, Response
 
-from mm_web3 import fetch_proxies, fetch_proxies_sync, is_valid_proxy_url, random_proxy
+from mm_web3 import (
+    ProxyListCache,
+    ProxyPool,
+    fetch_proxies,
+    fetch_proxies_sync,
+    fetch_proxy_lists_sync,
+    is_valid_proxy_url,
+    random_proxy,
+)
 
 
 class TestRandomProxy:
@@ -32,6 +42,65 @@ class TestRandomProxy:
         result = random_proxy([])
         assert result is None
 
+    def test_returns_active_proxy_from_pool(self):
+        """Should pick only active proxies from a ProxyPool."""
+        pool = ProxyPool(["http://proxy1.com:8080", "http://proxy2.com:8080"], failure_threshold=1)
+        pool.record("http://proxy1.com:8080", ok=False)
+        assert all(random_proxy(pool) == "http://proxy2.com:8080" for _ in range(20))
+
+
+class TestProxyPool:
+    """Test cases for the ProxyPool class."""
+
+    def test_quarantine_after_consecutive_failures(self):
+        """Should quarantine a proxy only after failure_threshold failures in a row."""
+        pool = ProxyPool(["p1", "p2", "p3"], failure_threshold=2)
+        pool.record("p1", ok=False)
+        pool.record("p1", ok=True)
+        pool.record("p1", ok=False)
+        assert pool.quarantined == []
+
+        pool.record("p1", ok=False)
+        assert pool.quarantined == ["p1"]
+        assert sorted(pool.active) == ["p2", "p3"]
+        assert all(pool.pick() != "p1" for _ in range(20))
+
+    def test_reinstated_after_cooldown_with_exponential_backoff(self):
+        """Should reinstate a proxy after its cooldown, doubling the cooldown on repeated quarantines."""
+        pool = ProxyPool(["p1", "p2"], failure_threshold=1, cooldown=0.05, max_cooldown=1)
+        pool.record("p1", ok=False)
+        assert pool.quarantined == ["p1"]
+        time.sleep(0.07)
+        assert sorted(pool.active) == ["p1", "p2"]
+
+        pool.record("p1", ok=False)  # second strike: 0.1s
+        time.sleep(0.06)
+        assert pool.quarantined == ["p1"]
+        time.sleep(0.06)
+        assert pool.quarantined == []
+
+    def test_pick_skips_excluded(self):
+        """Should never pick an excluded proxy while another one is active."""
+        pool = ProxyPool(["p1", "p2", "p3"])
+        assert all(pool.pick(exclude={"p1", "p2"}) == "p3" for _ in range(50))
+        assert pool.pick(exclude={"p1", "p2", "p3"}) in pool.urls
+
+    def test_all_quarantined_picks_soonest_released(self):
+        """Should never return None when all proxies are quarantined."""
+        pool = ProxyPool(["p1", "p2"], failure_threshold=1, cooldown=10, max_cooldown=100)
+        pool.record("p2", ok=False)
+        pool.record("p1", ok=False)
+        assert pool.active == []
+        assert pool.pick() == "p2"
+        assert pool.candidates() == ["p2"]
+
+    def test_invalid_parameters(self):
+        """Should reject empty proxy lists and bad parameters."""
+        with pytest.raises(ValueError, match="No proxies provided"):
+            ProxyPool([])
+        with pytest.raises(ValueError, match="cooldown"):
+            ProxyPool(["p1"], cooldown=10, max_cooldown=5)
+
 
 class TestIsValidProxyUrl:
     """Test cases for the is_valid_proxy_url function."""
@@ -249,3 +318,102 @@ class TestFetchProxiesSync:
 
         result = fetch_proxies_sync(url)
         assert result.is_err()
+
+
+class TestFetchProxyListsSync:
+    """Test cases for the fetch_proxy_lists_sync function."""
+
+    @pytest.fixture
+    def http_server(self):
+        """Create and start HTTP server for testing."""
+        server = HTTPServer(host="127.0.0.1", port=0)
+        server.start()
+        yield server
+        server.stop()
+
+    def test_fetches_concurrently_in_order(self, http_server: HTTPServer):
+        """Should fetch all lists at once and return results in input order."""
+
+        def slow(body: str):
+            def handler(_request: Request) -> Response:
+                time.sleep(0.3)
+                return Response(body, content_type="text/plain")
+
+            return handler
+
+        http_server.expect_request("/a").respond_with_handler(slow("http://a.com:8080"))
+        http_server.expect_request("/b").respond_with_handler(slow("http://b.com:8080"))
+        http_server.expect_request("/bad").respond_with_response(Response(status=500))
+
+        started_at = time.monotonic()
+        results = fetch_proxy_lists_sync([http_server.url_for(p) for p in ("/a", "/b", "/bad")])
+        assert time.monotonic() - started_at < 0.55
+        assert results[0].unwrap() == ["http://a.com:8080"]
+        assert results[1].unwrap() == ["http://b.com:8080"]
+        assert results[2].is_err()
+
+
+class TestProxyListCache:
+    """Test cases for the ProxyListCache class."""
+
+    @pytest.fixture
+    def http_server(self):
+        """Create and start HTTP server for testing."""
+        server = HTTPServer(host="127.0.0.1", port=0)
+        server.start()
+        yield server
+        server.stop()
+
+    def test_fresh_copy_skips_request(self, http_server: HTTPServer, tmp_path):
+        """Should serve a list younger than ttl from disk, across cache instances."""
+        requests: list[Request] = []
+
+        def handler(request: Request) -> Response:
+            requests.append(request)
+            return Response("http://a.com:8080", content_type="text/plain")
+
+        http_server.expect_request("/proxies").respond_with_handler(handler)
+        url = http_server.url_for("/proxies")
+
+        res = ProxyListCache(tmp_path).fetch_sync(url)
+        assert res.unwrap() == ["http://a.com:8080"]
+        assert res.context == {"cache": "miss"}
+
+        res = ProxyListCache(tmp_path).fetch_sync(url)
+        assert res.unwrap() == ["http://a.com:8080"]
+        assert res.context == {"cache": "fresh"}
+        assert len(requests) == 1
+
+    def test_revalidates_with_etag_and_last_modified(self, http_server: HTTPServer, tmp_path):
+        """Should send validators after ttl and reuse the cached list on 304."""
+        last_modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+        def handler(request: Request) -> Response:
+            if request.headers.get("If-None-Match") == '"v1"' and request.headers.get("If-Modified-Since") == last_modified:
+                return Response(status=304)
+            return Response("http://a.com:8080", headers={"ETag": '"v1"', "Last-Modified": last_modified})
+
+        http_server.expect_request("/proxies").respond_with_handler(handler)
+        url = http_server.url_for("/proxies")
+        cache = ProxyListCache(tmp_path, ttl=0)
+
+        assert cache.fetch_sync(url).context == {"cache": "miss"}
+        res = cache.fetch_sync(url)
+        assert res.unwrap() == ["http://a.com:8080"]
+        assert res.context == {"cache": "revalidated"}
+
+    def test_falls_back_to_last_good_copy(self, http_server: HTTPServer, tmp_path):
+        """Should return the cached list when the source fails, and the error when nothing is cached."""
+        http_server.expect_request("/proxies").respond_with_data("http://a.com:8080")
+        url = http_server.url_for("/proxies")
+        cache = ProxyListCache(tmp_path, ttl=0)
+        cache.fetch_sync(url)
+
+        http_server.expect_request("/proxies").respond_with_response(Response(status=500))
+        res = cache.fetch_sync(url)
+        assert res.unwrap() == ["http://a.com:8080"]
+        assert res.context["cache"] == "stale"
+        assert res.context["error"]
+
+        http_server.expect_request("/other").respond_with_data("not-a-proxy")
+        assert cache.fetch_sync(http_server.url_for("/other")).is_err()
@@ -0,0 +1,59 @@
+"""Tests for rate limiting."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mm_web3 import RateLimit, RateLimiter
+
+
+class TestRateLimit:
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError, match="rps"):
+            RateLimit(rps=0)
+        with pytest.raises(ValueError, match="burst"):
+            RateLimit(rps=1, burst=0)
+
+
+class TestRateLimiter:
+    def test_unlimited_endpoint(self):
+        limiter = RateLimiter()
+        assert all(limiter.try_acquire("node1") for _ in range(100))
+        assert limiter.limit("node1") is None
+
+    def test_burst_then_refuse(self):
+        limiter = RateLimiter(default=RateLimit(rps=1, burst=3))
+        assert [limiter.try_acquire("node1") for _ in range(4)] == [True, True, True, False]
+        assert limiter.try_acquire("node2")  # separate bucket
+
+    def test_per_endpoint_limit_overrides_default(self):
+        limiter = RateLimiter(default=RateLimit(rps=1), limits={"fast": RateLimit(rps=1, burst=10)})
+        assert limiter.limit("fast") == RateLimit(rps=1, burst=10)
+        limiter.set_limit("fast", None)
+        assert limiter.limit("fast") == RateLimit(rps=1)
+
+    async def test_acquire_paces_requests(self):
+        limiter = RateLimiter(default=RateLimit(rps=100, burst=1))
+        started_at = time.monotonic()
+        await asyncio.gather(*(limiter.acquire("node1") for _ in range(6)))
+        assert time.monotonic() - started_at >= 0.045
+
+    def test_acquire_sync_paces_threads(self):
+        limiter = RateLimiter(default=RateLimit(rps=100, burst=1))
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(limiter.acquire_sync, ["node1"] * 6))
+        assert time.monotonic() - started_at >= 0.045
+
+    async def test_cancelled_wait_returns_token(self):
+        limiter = RateLimiter(default=RateLimit(rps=10, burst=1))
+        await limiter.acquire("node1")
+        task = asyncio.create_task(limiter.acquire("node1"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        wait = await limiter.acquire("node1")
+        assert wait <= 0.1  # would be ~0.2 if the cancelled waiter kept its token
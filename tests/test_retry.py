@@ -1,8 +1,37 @@
 """Tests for retry utilities."""
 
+import asyncio
+import itertools
+import threading
+import time
+from collections.abc import Sequence
+from typing import override
+
 from mm_result import Result
 
-from mm_web3 import retry_with_node_and_proxy, retry_with_proxy
+from mm_web3 import (
+    AttemptLog,
+    CircuitBreakers,
+    CircuitState,
+    ConstantBackoff,
+    ErrorClassifier,
+    ErrorKind,
+    Hedge,
+    NodePool,
+    ProxyPool,
+    RandomBalancer,
+    RateLimit,
+    RateLimiter,
+    RetryLogMode,
+    remaining_time,
+    retry_as_completed,
+    retry_map,
+    retry_map_sync,
+    retry_with_node_and_proxy,
+    retry_with_node_and_proxy_sync,
+    retry_with_proxy,
+    retry_with_proxy_sync,
+)
 
 
 class TestRetryWithNodeAndProxy:
@@ -64,6 +93,500 @@ class TestRetryWithNodeAndProxy:
         assert "retry_logs" in result.context
         assert len(result.context["retry_logs"]) == 2
 
+    async def test_records_attempts_in_node_pool(self) -> None:
+        pool = NodePool(["node1", "node2"])
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            return Result.ok("success") if node == "node2" else Result.err("failure")
+
+        result = await retry_with_node_and_proxy(5, pool, None, func)
+        assert result.is_ok()
+        assert pool.stats("node2").requests == 1
+        assert pool.stats("node2").failures == 0
+        assert pool.stats("node1").failures == pool.stats("node1").requests
+
+    async def test_disabled_pool_nodes_are_skipped(self) -> None:
+        pool = NodePool(["node1", "node2"])
+        pool.disable("node1")
+        used = set()
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            used.add(node)
+            return Result.err("failure")
+
+        await retry_with_node_and_proxy(4, pool, None, func)
+        assert used == {"node2"}
+
+    async def test_attempts_draw_without_replacement(self) -> None:
+        pairs = []
+
+        async def func(node: str, proxy: str | None) -> Result[str]:
+            pairs.append((node, proxy))
+            return Result.err("failure")
+
+        for _ in range(20):
+            pairs.clear()
+            await retry_with_node_and_proxy(5, ["node1", "node2", "node3"], ["proxy1", "proxy2"], func)
+            nodes = [node for node, _ in pairs]
+            proxies = [proxy for _, proxy in pairs]
+            assert set(nodes[:3]) == {"node1", "node2", "node3"}
+            assert set(proxies[:2]) == {"proxy1", "proxy2"}
+            assert all(a != b for a, b in itertools.pairwise(nodes))
+            assert all(a != b for a, b in itertools.pairwise(proxies))
+
+
+class TestRetryErrorClassification:
+    async def test_fatal_error_stops_immediately(self) -> None:
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.err("execution reverted")
+
+        result = await retry_with_node_and_proxy(5, ["node1", "node2"], None, func, classifier=ErrorClassifier())
+        assert calls == 1
+        assert result.error == "execution reverted"
+        assert result.context["error_kind"] == "fatal"
+
+    async def test_fatal_error_does_not_hurt_node_health(self) -> None:
+        pool = NodePool(["node1"])
+        breakers = CircuitBreakers(failure_threshold=1)
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            return Result.err("execution reverted")
+
+        await retry_with_node_and_proxy(3, pool, None, func, classifier=ErrorClassifier(), breakers=breakers)
+        assert pool.stats("node1").failures == 0
+        assert breakers.is_available("node1")
+
+    async def test_switch_node_error_bans_node(self) -> None:
+        used = []
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            used.append(node)
+            return Result.err("429 too many requests" if node == "node1" else "flaky")
+
+        for _ in range(10):
+            used.clear()
+            await retry_with_node_and_proxy(6, ["node1", "node2", "node3"], None, func, classifier=ErrorClassifier())
+            assert used.count("node1") <= 1
+
+    async def test_switch_node_error_keeps_proxy(self) -> None:
+        pairs = []
+
+        async def func(node: str, proxy: str | None) -> Result[str]:
+            pairs.append((node, proxy))
+            return Result.err("header not found" if proxy == "proxy1" else "flaky")
+
+        nodes = ["node1", "node2", "node3"]
+        for _ in range(40):
+            pairs.clear()
+            await retry_with_node_and_proxy(3, nodes, ["proxy1", "proxy2"], func, classifier=ErrorClassifier())
+            if pairs[0][1] == "proxy1":
+                # Only the node is banned, so proxy1 is back in the next round of proxies
+                assert pairs[2][1] == "proxy1"
+                assert len({node for node, _ in pairs}) == 3
+                return
+        raise AssertionError("proxy1 was never picked first")
+
+    async def test_switch_node_error_bans_proxy_of_proxy_only_call(self) -> None:
+        used = []
+
+        async def func(proxy: str | None) -> Result[str]:
+            used.append(proxy)
+            return Result.err("header not found" if proxy == "proxy1" else "flaky")
+
+        for _ in range(10):
+            used.clear()
+            await retry_with_proxy(6, ["proxy1", "proxy2", "proxy3"], func, classifier=ErrorClassifier())
+            assert used.count("proxy1") <= 1
+
+    async def test_without_classifier_everything_is_retried(self) -> None:
+        calls = 0
+
+        async def func(_proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.err("execution reverted")
+
+        await retry_with_proxy(3, None, func)
+        assert calls == 3
+
+
+class TestRetryWithCircuitBreakers:
+    async def test_open_node_is_skipped(self) -> None:
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+        breakers.record_failure("node1")
+        used = set()
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            used.add(node)
+            return Result.ok(node)
+
+        for _ in range(20):
+            await retry_with_node_and_proxy(1, ["node1", "node2"], None, func, breakers=breakers)
+        assert used == {"node2"}
+
+    async def test_all_open_fails_without_calls(self) -> None:
+        breakers = CircuitBreakers(failure_threshold=2, reset_timeout=60)
+        calls = 0
+
+        async def func(_proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.err("failure")
+
+        result = await retry_with_proxy(5, ["proxy1"], func, breakers=breakers)
+        assert calls == 2
+        assert result.error == "circuit_open"
+        assert len(result.context["retry_logs"]) == 2
+
+        result = await retry_with_proxy(5, ["proxy1"], func, breakers=breakers)
+        assert calls == 2
+        assert result.error == "circuit_open"
+        assert result.context["retry_logs"] == []
+
+    async def test_cancelled_hedge_releases_half_open_trial(self) -> None:
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=0)
+        breakers.record_failure("slow")
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            await asyncio.sleep(10 if node == "slow" else 0.05)
+            return Result.ok(node)
+
+        for _ in range(3):
+            result = await retry_with_node_and_proxy(2, ["slow", "fast"], None, func, breakers=breakers, hedge=Hedge(delay=0.01))
+            assert result.unwrap() == "fast"
+            assert breakers.state("slow") == CircuitState.HALF_OPEN
+            assert breakers.is_available("slow")
+
+
+class TestRetryBackoffAndDeadline:
+    async def test_backoff_waits_between_attempts(self) -> None:
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            return Result.err("failure")
+
+        started_at = time.monotonic()
+        result = await retry_with_node_and_proxy(3, "node1", None, func, backoff=ConstantBackoff(0.05))
+        assert time.monotonic() - started_at >= 0.1
+        assert len(result.context["retry_logs"]) == 3
+
+    async def test_deadline_cancels_slow_attempt(self) -> None:
+        async def func(_proxy: str | None) -> Result[str]:
+            await asyncio.sleep(10)
+            return Result.ok("late")
+
+        started_at = time.monotonic()
+        result = await retry_with_proxy(3, "proxy1", func, deadline=0.05)
+        assert time.monotonic() - started_at < 1
+        assert result.error == "deadline_exceeded"
+        assert len(result.context["retry_logs"]) == 1
+
+    async def test_backoff_longer_than_deadline_stops_early(self) -> None:
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.err("failure")
+
+        result = await retry_with_node_and_proxy(5, "node1", None, func, backoff=ConstantBackoff(10), deadline=1)
+        assert calls == 1
+        assert result.error == "deadline_exceeded"
+
+    async def test_remaining_time_is_visible_to_func(self) -> None:
+        seen = []
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            seen.append(remaining_time())
+            return Result.ok("ok")
+
+        await retry_with_node_and_proxy(1, "node1", None, func, deadline=5)
+        await retry_with_node_and_proxy(1, "node1", None, func)
+        assert 4 < seen[0] <= 5
+        assert seen[1] is None
+        assert remaining_time() is None
+
+    async def test_hedged_mode_respects_deadline(self) -> None:
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            await asyncio.sleep(10)
+            return Result.ok("late")
+
+        result = await retry_with_node_and_proxy(5, ["node1", "node2"], None, func, hedge=Hedge(delay=0.01), deadline=0.1)
+        assert result.error == "deadline_exceeded"
+
+    async def test_rate_limiter_paces_attempts(self) -> None:
+        limiter = RateLimiter(limits={"proxy1": RateLimit(rps=50)})
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            return Result.err("failure")
+
+        started_at = time.monotonic()
+        await retry_with_node_and_proxy(4, ["node1", "node2"], "proxy1", func, rate_limiter=limiter)
+        assert time.monotonic() - started_at >= 0.055
+
+    async def test_deadline_while_waiting_for_limiter_is_not_recorded(self) -> None:
+        pool = NodePool("node1")
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=0.01)
+        limiter = RateLimiter(limits={"node1": RateLimit(rps=1)})
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.ok("ok")
+
+        breakers.record_failure("node1")
+        await asyncio.sleep(0.02)
+        assert breakers.state("node1") == CircuitState.HALF_OPEN
+        limiter.try_acquire("node1")  # the next token is a second away
+        result = await retry_with_node_and_proxy(1, pool, None, func, breakers=breakers, rate_limiter=limiter, deadline=0.05)
+        assert result.error == "deadline_exceeded"
+        assert calls == 0
+        assert pool.stats("node1").requests == 0
+        assert breakers.state("node1") == CircuitState.HALF_OPEN
+        assert breakers.allow("node1")  # the trial slot was given back
+
+
+class TestHedgedRetry:
+    async def test_hedge_wins_over_slow_node(self) -> None:
+        cancelled = []
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            if node == "slow":
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(node)
+                    raise
+            return Result.ok(node)
+
+        async def call() -> Result[str]:
+            # The first attempt goes to "slow" only half of the time, so repeat until it does
+            for _ in range(20):
+                result = await retry_with_node_and_proxy(3, ["slow", "fast"], None, func, hedge=Hedge(delay=0.01))
+                if result.context and result.context["retry_winner"] == 1:
+                    return result
+            raise AssertionError("slow node was never picked first")
+
+        result = await asyncio.wait_for(call(), timeout=5)
+        assert result.value == "fast"
+        assert cancelled == ["slow"]
+        logs = result.context["retry_logs"]
+        assert [(log["attempt"], log["node"]) for log in logs] == [(1, "fast"), (0, "slow")]
+        assert logs[1]["result"] == "cancelled"
+
+    async def test_no_hedge_when_attempt_is_fast(self) -> None:
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            return Result.ok(node)
+
+        result = await retry_with_node_and_proxy(3, ["node1", "node2"], None, func, hedge=Hedge(delay=1))
+        assert result.is_ok()
+        assert result.context["retry_winner"] == 0
+        assert len(result.context["retry_logs"]) == 1
+
+    async def test_failures_are_retried_up_to_retries(self) -> None:
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.err("failure")
+
+        result = await retry_with_node_and_proxy(3, ["node1", "node2"], None, func, hedge=Hedge(delay=0.01))
+        assert result.is_err()
+        assert result.error == "failure"
+        assert calls == 3
+        assert len(result.context["retry_logs"]) == 3
+
+    async def test_only_successes_are_observed(self) -> None:
+        hedge = Hedge(delay=1, percentile=50)
+
+        async def func(node: str, _proxy: str | None) -> Result[str]:
+            return Result.err("failure") if node == "broken" else Result.ok(node)
+
+        for _ in range(30):
+            await retry_with_node_and_proxy(2, "broken", None, func, hedge=hedge)
+        assert hedge.delay == 1  # failures are not latency samples
+        for _ in range(30):
+            await retry_with_node_and_proxy(1, "node1", None, func, hedge=hedge)
+        assert hedge.delay < 1
+
+    def test_percentile_delay(self) -> None:
+        hedge = Hedge(delay=5, percentile=90)
+        assert hedge.delay == 5  # not enough samples yet
+        for i in range(100):
+            hedge.observe(i / 100)
+        assert 0.85 < hedge.delay < 0.95
+
+
+class TestRetryLogModes:
+    @staticmethod
+    def fail_once():
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[str]:
+            nonlocal calls
+            calls += 1
+            return Result.ok("success") if calls == 2 else Result.err("failure")
+
+        return func
+
+    async def test_full_is_default(self) -> None:
+        res = await retry_with_node_and_proxy(2, "node1", "proxy1", self.fail_once())
+        assert res.context["retry_logs"] == [
+            {"node": "node1", "proxy": "proxy1", "result": Result.err("failure").to_dict()},
+            {"node": "node1", "proxy": "proxy1", "result": Result.ok("success").to_dict()},
+        ]
+
+    async def test_failures_only(self) -> None:
+        res = await retry_with_node_and_proxy(2, "node1", None, self.fail_once(), log_mode=RetryLogMode.FAILURES)
+        assert res.is_ok()
+        assert [log["result"] for log in res.context["retry_logs"]] == [Result.err("failure").to_dict()]
+
+    async def test_compact(self) -> None:
+        res = await retry_with_node_and_proxy(
+            2, "node1", None, self.fail_once(), log_mode=RetryLogMode.COMPACT, classifier=ErrorClassifier()
+        )
+        first, second = res.context["retry_logs"]
+        assert isinstance(first, AttemptLog)
+        assert (first.attempt, first.node, first.proxy, first.error, first.kind) == (0, "node1", None, "failure", "retry")
+        assert (second.attempt, second.error, second.kind) == (1, None, None)
+        assert first.elapsed >= 0
+
+    async def test_compact_hedged_and_proxy_only(self) -> None:
+        async def slow(node: str, _proxy: str | None) -> Result[str]:
+            await asyncio.sleep(0.2 if node == "node1" else 0.01)
+            return Result.ok(node)
+
+        res = await retry_with_node_and_proxy(2, ["node1"], None, slow, hedge=Hedge(delay=0.02), log_mode=RetryLogMode.COMPACT)
+        assert [log.error for log in res.context["retry_logs"]] in ([None, "cancelled"], [None])
+
+        async def func(proxy: str | None) -> Result[str | None]:
+            return Result.ok(proxy)
+
+        res = await retry_with_proxy(1, "proxy1", func, log_mode=RetryLogMode.COMPACT)
+        assert res.context["retry_logs"][0].node is None
+
+    async def test_off(self) -> None:
+        res = await retry_with_node_and_proxy(2, "node1", None, self.fail_once(), log_mode=RetryLogMode.OFF)
+        assert res.is_ok()
+        assert "retry_logs" not in res.context
+
+        res = await retry_with_node_and_proxy(
+            1, "node1", None, self.fail_once(), log_mode=RetryLogMode.OFF, classifier=ErrorClassifier(default=ErrorKind.FATAL)
+        )
+        assert res.context == {"error_kind": "fatal"}
+
+
+class TestRetryMap:
+    async def test_results_in_input_order_with_bounded_concurrency(self) -> None:
+        in_flight = 0
+        max_in_flight = 0
+
+        async def func(item: int, _node: str, _proxy: str | None) -> Result[int]:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.001 * (item % 5))
+            in_flight -= 1
+            return Result.ok(item * 2)
+
+        results = await retry_map(range(50), func, ["node1", "node2"], None, retries=2, concurrency=5)
+        assert [r.value for r in results] == [i * 2 for i in range(50)]
+        assert max_in_flight == 5
+
+    async def test_per_node_concurrency(self) -> None:
+        in_flight: dict[str, int] = {"node1": 0, "node2": 0}
+        max_in_flight = 0
+
+        async def func(_item: int, node: str, _proxy: str | None) -> Result[str]:
+            nonlocal max_in_flight
+            in_flight[node] += 1
+            max_in_flight = max(max_in_flight, in_flight[node])
+            await asyncio.sleep(0.001)
+            in_flight[node] -= 1
+            return Result.ok(node)
+
+        results = await retry_map(range(30), func, ["node1", "node2"], None, retries=1, concurrency=10, per_node_concurrency=2)
+        assert all(r.is_ok() for r in results)
+        assert max_in_flight == 2
+
+    async def test_per_node_queueing_is_not_latency(self) -> None:
+        pool = NodePool("node1", alpha=1)
+
+        async def func(_item: int, _node: str, _proxy: str | None) -> Result[str]:
+            await asyncio.sleep(0.02)
+            return Result.ok("ok")
+
+        await retry_map(range(5), func, pool, None, retries=1, concurrency=5, per_node_concurrency=1)
+        latency = pool.stats("node1").latency
+        assert latency is not None
+        assert latency < 0.05  # the last call waited for four others first
+
+    async def test_nested_call_ignores_per_node_limit(self) -> None:
+        async def inner(node: str, _proxy: str | None) -> Result[str]:
+            return Result.ok(node)
+
+        async def func(_item: int, node: str, _proxy: str | None) -> Result[str]:
+            return await retry_with_node_and_proxy(1, node, None, inner)
+
+        results = await asyncio.wait_for(retry_map(range(3), func, "node1", None, retries=1, per_node_concurrency=1), 1)
+        assert [r.value for r in results] == ["node1"] * 3
+
+    async def test_passes_retry_options(self) -> None:
+        async def func(_item: int, _node: str, _proxy: str | None) -> Result[str]:
+            return Result.err("failure")
+
+        results = await retry_map([1, 2], func, "node1", None, retries=3, backoff=ConstantBackoff(0))
+        assert all(len(r.context["retry_logs"]) == 3 for r in results)
+
+
+class TestRetryAsCompleted:
+    async def test_streams_lazy_items(self) -> None:
+        consumed = 0
+
+        def items():
+            nonlocal consumed
+            for i in range(100):
+                consumed += 1
+                yield i
+
+        async def func(item: int, _node: str, _proxy: str | None) -> Result[int]:
+            await asyncio.sleep(0)
+            return Result.ok(item)
+
+        seen = []
+        async for item, result in retry_as_completed(items(), func, "node1", None, retries=1, concurrency=4):
+            assert result.value == item
+            seen.append(item)
+            if len(seen) == 10:
+                break
+        assert consumed < 20
+
+    async def test_early_exit_cancels_in_flight_calls(self) -> None:
+        cancelled = 0
+
+        async def func(item: int, _node: str, _proxy: str | None) -> Result[int]:
+            nonlocal cancelled
+            if item == 0:
+                await asyncio.sleep(0.01)  # let the other calls start
+                return Result.ok(item)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+            return Result.ok(item)
+
+        stream = retry_as_completed(range(5), func, "node1", None, retries=1, concurrency=3)
+        async for item, _ in stream:
+            assert item == 0
+            break
+        await stream.aclose()
+        assert cancelled == 2
+
 
 class TestRetryWithProxy:
     async def test_success_on_first_try(self) -> None:
@@ -122,3 +645,211 @@ class TestRetryWithProxy:
         assert result.context is not None
         assert "retry_logs" in result.context
         assert len(result.context["retry_logs"]) == 2
+
+    async def test_outcomes_are_fed_back_to_proxy_pool(self) -> None:
+        pool = ProxyPool(["proxy1", "proxy2"], failure_threshold=2, cooldown=60)
+
+        async def func(proxy: str | None) -> Result[str]:
+            return Result.ok("success") if proxy == "proxy2" else Result.err("failure")
+
+        for _ in range(10):
+            await retry_with_proxy(2, pool, func)
+        assert pool.quarantined == ["proxy1"]
+
+    async def test_large_proxy_pool_is_not_copied_per_attempt(self) -> None:
+        class Pool(ProxyPool):
+            def candidates(self) -> list[str]:
+                raise AssertionError("the active set was copied")
+
+        pool = Pool([f"proxy{i}" for i in range(10_000)])
+        breakers = CircuitBreakers(failure_threshold=1)
+        used: list[str | None] = []
+
+        async def func(proxy: str | None) -> Result[str]:
+            used.append(proxy)
+            return Result.err("failure")
+
+        await retry_with_proxy(5, pool, func, breakers=breakers)
+        assert len(set(used)) == 5
+        await retry_with_proxy(5, pool, func, breakers=breakers)
+        assert len(set(used)) == 10  # the open breakers of the first call are skipped
+
+    async def test_failed_proxy_is_not_repeated(self) -> None:
+        used = []
+
+        async def func(proxy: str | None) -> Result[str]:
+            used.append(proxy)
+            return Result.err("failure")
+
+        for _ in range(20):
+            used.clear()
+            await retry_with_proxy(4, ["proxy1", "proxy2"], func)
+            assert used in (["proxy1", "proxy2"] * 2, ["proxy2", "proxy1"] * 2)
+
+
+class TestRetrySync:
+    def test_success_on_second_try(self) -> None:
+        calls = []
+
+        def func(node: str, proxy: str | None) -> Result[str]:
+            calls.append((node, proxy))
+            return Result.ok("success") if len(calls) == 2 else Result.err("failure")
+
+        result = retry_with_node_and_proxy_sync(3, ["node1", "node2"], ["proxy1", "proxy2"], func)
+        assert result.unwrap() == "success"
+        assert len(result.context["retry_logs"]) == 2
+        assert calls[0][0] != calls[1][0]
+        assert calls[0][1] != calls[1][1]
+
+    def test_policies_are_applied(self) -> None:
+        pool = NodePool(["node1", "node2"])
+        breakers = CircuitBreakers(failure_threshold=1)
+        breakers.record_failure("node1")
+
+        def func(_node: str, _proxy: str | None) -> Result[str]:
+            return Result.err("fatal: insufficient funds")
+
+        result = retry_with_node_and_proxy_sync(5, pool, None, func, breakers=breakers, classifier=ErrorClassifier())
+        assert result.context["error_kind"] == "fatal"
+        assert [log["node"] for log in result.context["retry_logs"]] == ["node2"]
+        assert pool.stats("node2").requests == 1
+
+    def test_deadline_and_backoff(self) -> None:
+        remaining = []
+
+        def func(_node: str, _proxy: str | None) -> Result[str]:
+            remaining.append(remaining_time())
+            return Result.err("failure")
+
+        started_at = time.monotonic()
+        result = retry_with_node_and_proxy_sync(10, "node1", None, func, backoff=ConstantBackoff(0.04), deadline=0.1)
+        assert result.unwrap_err() == "deadline_exceeded"
+        assert time.monotonic() - started_at < 0.1
+        assert len(remaining) == 3
+        assert all(r is not None and 0 < r <= 0.1 for r in remaining)
+
+    def test_rate_limiter_paces_attempts(self) -> None:
+        limiter = RateLimiter(RateLimit(rps=20))
+
+        def func(_node: str, _proxy: str | None) -> Result[str]:
+            return Result.err("failure")
+
+        started_at = time.monotonic()
+        retry_with_node_and_proxy_sync(3, "node1", None, func, rate_limiter=limiter)
+        assert time.monotonic() - started_at >= 0.09
+
+    def test_deadline_while_waiting_for_limiter_is_not_recorded(self) -> None:
+        pool = NodePool("node1")
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=0.01)
+        limiter = RateLimiter(limits={"node1": RateLimit(rps=10)})
+
+        def func(_node: str, _proxy: str | None) -> Result[str]:
+            return Result.ok("ok")
+
+        breakers.record_failure("node1")
+        time.sleep(0.02)
+        limiter.try_acquire("node1")  # the next token is 0.1 s away
+        result = retry_with_node_and_proxy_sync(1, pool, None, func, breakers=breakers, rate_limiter=limiter, deadline=0.05)
+        assert result.error == "deadline_exceeded"
+        assert pool.stats("node1").requests == 0
+        assert breakers.state("node1") == CircuitState.HALF_OPEN
+        assert breakers.allow("node1")
+
+    def test_retry_with_proxy_sync_feeds_proxy_pool(self) -> None:
+        pool = ProxyPool(["proxy1", "proxy2"], failure_threshold=2, cooldown=60)
+
+        def func(proxy: str | None) -> Result[str]:
+            return Result.ok("success") if proxy == "proxy2" else Result.err("failure")
+
+        for _ in range(10):
+            assert retry_with_proxy_sync(2, pool, func).is_ok()
+        assert pool.quarantined == ["proxy1"]
+
+
+class TestRetryMapSync:
+    def test_results_in_input_order_with_bounded_concurrency(self) -> None:
+        lock = threading.Lock()
+        in_flight = 0
+        max_in_flight = 0
+
+        def func(item: int, _node: str, _proxy: str | None) -> Result[int]:
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.002 * (item % 5))
+            with lock:
+                in_flight -= 1
+            return Result.ok(item * 2)
+
+        results = retry_map_sync(range(50), func, ["node1", "node2"], None, retries=2, concurrency=5)
+        assert [r.value for r in results] == [i * 2 for i in range(50)]
+        assert 1 < max_in_flight <= 5
+
+    def test_per_node_concurrency(self) -> None:
+        lock = threading.Lock()
+        in_flight: dict[str, int] = {"node1": 0, "node2": 0}
+        max_in_flight = 0
+
+        def func(_item: int, node: str, _proxy: str | None) -> Result[str]:
+            nonlocal max_in_flight
+            with lock:
+                in_flight[node] += 1
+                max_in_flight = max(max_in_flight, in_flight[node])
+            time.sleep(0.002)
+            with lock:
+                in_flight[node] -= 1
+            return Result.ok(node)
+
+        results = retry_map_sync(range(30), func, ["node1", "node2"], None, retries=1, concurrency=10, per_node_concurrency=2)
+        assert all(r.is_ok() for r in results)
+        assert max_in_flight == 2
+
+    def test_per_node_queueing_is_not_latency(self) -> None:
+        pool = NodePool("node1", alpha=1)
+
+        def func(_item: int, _node: str, _proxy: str | None) -> Result[str]:
+            time.sleep(0.02)
+            return Result.ok("ok")
+
+        retry_map_sync(range(5), func, pool, None, retries=1, concurrency=5, per_node_concurrency=1)
+        latency = pool.stats("node1").latency
+        assert latency is not None
+        assert latency < 0.05
+
+    def test_half_open_node_gets_one_trial_across_threads(self) -> None:
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=0.01, half_open_max_calls=1)
+        lock = threading.Lock()
+        calls = 0
+
+        class SlowBalancer(RandomBalancer):
+            """Widen the gap between filtering the candidates and reserving the pick."""
+
+            @override
+            def choose(self, candidates: Sequence[str], key: str | None = None) -> str:
+                time.sleep(0.01)
+                return super().choose(candidates, key)
+
+        def func(_item: int, _node: str, _proxy: str | None) -> Result[str]:
+            nonlocal calls
+            with lock:
+                calls += 1
+            time.sleep(0.02)
+            return Result.err("failure")
+
+        breakers.record_failure("node1")
+        time.sleep(0.02)
+        results = retry_map_sync(
+            range(10), func, ["node1"], None, retries=1, concurrency=10, breakers=breakers, balancer=SlowBalancer()
+        )
+        assert calls == 1
+        assert sorted(r.error or "" for r in results) == ["circuit_open"] * 9 + ["failure"]
+
+    def test_shared_pool_state(self) -> None:
+        pool = NodePool(["node1", "node2"])
+
+        def func(item: int, _node: str, _proxy: str | None) -> Result[int]:
+            return Result.ok(item)
+
+        retry_map_sync(range(100), func, pool, None, retries=1, concurrency=8)
+        assert pool.stats("node1").requests + pool.stats("node2").requests == 100
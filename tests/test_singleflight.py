@@ -0,0 +1,68 @@
+"""Tests for single-flight coalescing."""
+
+import asyncio
+
+import pytest
+from mm_result import Result
+
+from mm_web3 import SingleFlight, retry_with_node_and_proxy
+
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_flight(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def func(_node: str, _proxy: str | None) -> Result[int]:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return Result.ok(18)
+
+        def fetch():
+            return flights.do(("decimals", "usdt"), lambda: retry_with_node_and_proxy(3, "node1", None, func))
+
+        results = await asyncio.gather(*(fetch() for _ in range(50)))
+        assert calls == 1
+        assert all(r is results[0] for r in results)
+        assert (flights.calls, flights.shared, flights.in_flight) == (1, 49, 0)
+
+        await fetch()  # key is released after completion
+        assert calls == 2
+
+    async def test_different_keys_run_separately(self):
+        flights = SingleFlight()
+
+        async def func(key: str) -> Result[str]:
+            await asyncio.sleep(0)
+            return Result.ok(key)
+
+        results = await asyncio.gather(flights.do("a", lambda: func("a")), flights.do("b", lambda: func("b")))
+        assert [r.value for r in results] == ["a", "b"]
+        assert flights.calls == 2
+
+    async def test_exception_is_shared(self):
+        flights = SingleFlight()
+
+        async def func() -> Result[str]:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(flights.do("k", func), flights.do("k", func), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flights.in_flight == 0
+
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        flights = SingleFlight()
+
+        async def func() -> Result[str]:
+            await asyncio.sleep(0.02)
+            return Result.ok("done")
+
+        first = asyncio.create_task(flights.do("k", func))
+        second = asyncio.create_task(flights.do("k", func))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert (await second).value == "done"
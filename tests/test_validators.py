@@ -2,8 +2,10 @@ from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from pytest_httpserver import HTTPServer
 
 from mm_web3.account import PrivateKeyMap
+from mm_web3.calcs import UnitTable
 from mm_web3.validators import ConfigValidators, Transfer
 
 from .common import TEST_ETH_PRIVATE_KEYS, eth_is_valid_address, eth_private_to_address
@@ -172,6 +174,42 @@ class TestConfigValidatorsProxies:
         with pytest.raises(ValueError, match="missing env var: MISSING_VAR"):
             validator(input_str)
 
+    def test_proxies_from_urls(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test proxies validator fetches url and env_url sources and keeps line order."""
+        server = HTTPServer(host="127.0.0.1", port=0)
+        server.expect_request("/a").respond_with_data("http://a.com:8080")
+        server.expect_request("/b").respond_with_data("http://b.com:8080\nhttp://a.com:8080")
+        server.start()
+        try:
+            monkeypatch.setenv("PROXIES_URL", server.url_for("/b"))
+            validator = ConfigValidators.proxies()
+            result = validator(f"url:{server.url_for('/a')}\nhttp://c.com:8080\nenv_url:PROXIES_URL")
+        finally:
+            server.stop()
+
+        assert result == ["http://a.com:8080", "http://c.com:8080", "http://b.com:8080"]
+
+    def test_proxies_url_fetch_error(self) -> None:
+        """Test proxies validator raises when a source fails and nothing is cached."""
+        validator = ConfigValidators.proxies()
+
+        with pytest.raises(ValueError, match="Can't get proxies"):
+            validator("url:http://127.0.0.1:1/proxies")
+
+    def test_proxies_cache_fallback(self, tmp_path: Path) -> None:
+        """Test proxies validator uses the last good copy when the source is down."""
+        server = HTTPServer(host="127.0.0.1", port=0)
+        server.expect_request("/proxies").respond_with_data("http://a.com:8080")
+        server.start()
+        url = server.url_for("/proxies")
+        try:
+            validator = ConfigValidators.proxies(cache_dir=tmp_path, cache_ttl=0)
+            assert validator(f"url:{url}") == ["http://a.com:8080"]
+        finally:
+            server.stop()
+
+        assert validator(f"url:{url}") == ["http://a.com:8080"]
+
 
 class TestConfigValidatorsLogFile:
     """Test ConfigValidators.log_file method."""
@@ -439,6 +477,15 @@ class TestConfigValidatorsExpressionWithVars:
 
         assert result == expression
 
+    def test_expression_with_vars_unit_table(self) -> None:
+        """Test expression validator with a prebuilt UnitTable."""
+        validator = ConfigValidators.expression_with_vars(var_name="balance", unit_decimals=UnitTable({"wei": 0, "gwei": 9}))
+
+        expression = "0.5balance - 1gwei + 1wei"
+        assert validator(expression) == expression
+        with pytest.raises(ValueError, match="unknown unit: eth"):
+            validator("1eth")
+
     def test_expression_with_vars_invalid(self) -> None:
         """Test expression validator with invalid expression."""
         validator = ConfigValidators.expression_with_vars()